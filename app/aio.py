@@ -0,0 +1,143 @@
+"""This module contains the asyncio versions of the engines.
+
+Every coroutine runs its engine on a bounded pool of worker threads, so the
+event loop is never blocked and many templates can be cloned or created at
+the same time. The engines keep spreading the file I/O of one operation
+over their own pool of `jobs` threads. The coroutines return the same
+status dicts as the engines.
+
+Cancelling async_create_template or async_clone_template stops the engine
+at the next completed file (see app.journal.cancellable) and re-raises
+asyncio.CancelledError once the engine has stopped. The partial output is
+journaled, so the operation can be resumed with resume=True, or removed
+when cleanup is truthy. Operations that keep no journal, such as saving
+an archive template, run to completion before the error is raised.
+
+- async_create_template: Creates a template without blocking the loop
+- async_clone_template: Clones a template without blocking the loop
+- async_get_templates: Lists the templates without blocking the loop
+- async_get_template_details: Lists the templates with their details
+- async_remove_template: Deletes a template without blocking the loop
+
+Attributes:
+    ASYNC_WORKERS (int): the number of engine calls that run at the same
+        time, further calls wait for a worker
+
+"""
+
+import asyncio
+import functools
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from app.engines import (create_template, clone_template, get_templates,
+                         get_template_details, remove_template)
+from app.journal import OperationCancelled, cancellable, get_journal_path
+
+
+ASYNC_WORKERS = 8
+
+_executor = None
+
+
+def get_executor():
+    """Returns the pool of worker threads the engines run on"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS,
+                                       thread_name_prefix='scaffold-async')
+    return _executor
+
+async def run_engine(function, *args, **kwargs):
+    """Runs an engine on the worker pool and returns its status"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(function, *args, **kwargs))
+
+def remove_output(dest, is_tree):
+    """Removes the partial output and the journal of a cancelled operation"""
+    if is_tree and os.path.isdir(dest):
+        shutil.rmtree(dest, ignore_errors=True)
+    if os.path.exists(get_journal_path(dest)):
+        os.remove(get_journal_path(dest))
+
+async def run_cancellable(dest, cleanup, is_tree, function, *args, **kwargs):
+    """Runs an engine writing to dest so that it can be cancelled
+
+    Parameters:
+        dest (str): the path the engine writes to
+        cleanup (bool): if truthy remove the partial output when cancelled
+        is_tree (bool): if truthy dest is removed with the journal, the
+            output of a create is a manifest that is only written when the
+            create completes
+        function (func): the engine to run
+
+    Returns:
+        dict: the status of the engine
+
+    Raises:
+        asyncio.CancelledError: when the coroutine was cancelled
+
+    """
+
+    with cancellable(dest) as cancel_event:
+
+        def run():
+            if cancel_event.is_set():
+                raise OperationCancelled(dest)
+            return function(*args, **kwargs)
+
+        future = asyncio.ensure_future(run_engine(run))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            try:
+                await future
+            except OperationCancelled:
+                if cleanup:
+                    remove_output(dest, is_tree)
+            raise
+
+async def async_create_template(src, name, clone_function, force,
+                                template_folder, cleanup=False, **options):
+    """Creates a template like app.engines.create_template
+
+    Parameters:
+        cleanup (bool): if truthy remove the journal when cancelled instead
+            of keeping it to resume the create, the blobs already added to
+            the store are collected with the store's garbage
+
+    """
+
+    return await run_cancellable(
+        os.path.join(template_folder, name), cleanup, False, create_template,
+        src, name, clone_function, force, template_folder, **options)
+
+async def async_clone_template(dest, name, clone_name, path_function,
+                               template_folder, cleanup=False, **options):
+    """Clones a template like app.engines.clone_template
+
+    Parameters:
+        cleanup (bool): if truthy remove the partially cloned directory and
+            its journal when cancelled instead of keeping them to resume
+            the clone
+
+    """
+
+    return await run_cancellable(
+        os.path.join(dest, clone_name), cleanup, True, clone_template, dest,
+        name, clone_name, path_function, template_folder, **options)
+
+async def async_get_templates(template_folder, *args, **kwargs):
+    """Lists the templates like app.engines.get_templates"""
+    return await run_engine(get_templates, template_folder, *args, **kwargs)
+
+async def async_get_template_details(template_folder, *args, **kwargs):
+    """Lists the templates like app.engines.get_template_details"""
+    return await run_engine(get_template_details, template_folder, *args,
+                            **kwargs)
+
+async def async_remove_template(template_name, template_folder):
+    """Deletes a template like app.engines.remove_template"""
+    return await run_engine(remove_template, template_name, template_folder)
@@ -0,0 +1,352 @@
+"""This module contains the compressed archive template format.
+
+An archive template is a single gzip or lzma compressed tarfile saved in
+place of the template in the template folder. The first member of every
+archive is an index of the other members (their paths, types, modes, sizes
+and modification times), so a template can be described without reading
+the whole archive. The last member records the sha256 hash of every file,
+computed while the files are compressed, so that an archive can be
+verified (see app.verify) without being read twice when it is created.
+
+- archive_directory: Saves a directory as an archive template
+- archive_file: Saves a single file as an archive template
+- extract_archive: Streams an archive template into a new directory
+- read_members: Returns the member index of an archive template
+- read_hashes: Returns the file hashes recorded in an archive template
+
+Attributes:
+    MEMBERS_NAME (str): the name of the member index inside an archive
+    HASHES_NAME (str): the name of the file hashes inside an archive
+    INDEX_NAMES (tuple): the names of the members that are not part of the
+        template
+    COMPRESSIONS (tuple): the supported compressions
+
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+import uuid
+from app.fileops import ChecksumError, copy_hashed
+from app.ignore import load_ignore_rules
+from app.journal import Journal, prepare_path
+from app.manifest import MANIFEST_FORMAT, list_entries, compare_manifests
+from app.timings import phase, add_file
+
+
+MEMBERS_NAME = '.ace-scaffold-members.json'
+HASHES_NAME = '.ace-scaffold-hashes.json'
+INDEX_NAMES = (MEMBERS_NAME, HASHES_NAME)
+COMPRESSIONS = ('gz', 'xz')
+
+
+class HashingReader():
+    """Hashes the contents of a file while tarfile reads them
+
+    Arguments:
+        file_ (file): the file being read
+
+    """
+
+    def __init__(self, file_):
+        self.file = file_
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.digest.update(data)
+        return data
+
+
+def build_tarinfo(entry):
+    """Returns the tarfile member for a manifest entry"""
+    tarinfo = tarfile.TarInfo(entry['path'])
+    tarinfo.mode = entry['mode']
+
+    if entry['type'] == 'directory':
+        tarinfo.type = tarfile.DIRTYPE
+        tarinfo.mtime = time.time()
+    elif entry['type'] == 'symlink':
+        tarinfo.type = tarfile.SYMTYPE
+        tarinfo.linkname = entry['target']
+        tarinfo.mtime = time.time()
+    else:
+        tarinfo.size = entry['size']
+        tarinfo.mtime = entry['mtime'] / 1e9
+    return tarinfo
+
+def read_members(template_path):
+    """Returns the member index of the archive template at template_path
+
+    Only the first member of the archive is decompressed.
+
+    Returns:
+        dict: the template's manifest, whose entries have no hashes
+
+    """
+
+    with tarfile.open(template_path, 'r|*') as archive:
+        member = archive.next()
+        if member is None or member.name != MEMBERS_NAME:
+            raise ValueError(f'{template_path} has no member index.')
+        return json.load(archive.extractfile(member))
+
+def read_hashes(template_path):
+    """Returns the file hashes recorded at the end of an archive template
+
+    The whole archive is decompressed to reach its last member.
+
+    Returns:
+        dict: the sha256 hash of every file by path, empty for archives
+            created before hashes were recorded
+
+    """
+
+    with tarfile.open(template_path, 'r|*') as archive:
+        for member in archive:
+            if member.name == HASHES_NAME:
+                return json.load(archive.extractfile(member))
+    return {}
+
+def add_json_member(archive, name, contents):
+    """Adds a JSON document to an archive as the member name"""
+    data = json.dumps(contents).encode()
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.size = len(data)
+    tarinfo.mtime = time.time()
+    archive.addfile(tarinfo, io.BytesIO(data))
+
+def write_archive(src, dest, template_type, compression='gz', excludes=()):
+    """Saves a file or directory as the archive template at dest
+
+    The archive is written to a hidden temporary file and then replaces
+    dest atomically. The entries of a directory matched by its
+    `.scaffoldignore` file or by excludes are left out (see app.ignore).
+
+    Returns:
+        dict: indicates whether the archive operation threw an error, with
+            the counts of added, changed and removed entries
+
+    """
+
+    if compression not in COMPRESSIONS:
+        raise ValueError(f'{compression} is not a valid compression.')
+
+    folder, name = os.path.split(dest)
+    temp_path = os.path.join(folder, f'.{name}.{uuid.uuid4().hex}.tmp')
+
+    try:
+        previous = read_members(dest) if os.path.isfile(dest) else None
+    except (OSError, ValueError, tarfile.TarError):
+        previous = None
+
+    try:
+        ignore = load_ignore_rules(src, excludes) \
+            if template_type == 'directory' else None
+        entries = list_entries(src, template_type, ignore)
+        manifest = dict(format=MANIFEST_FORMAT, type=template_type,
+                        created=time.time(),
+                        entries=[entry for entry, _ in entries])
+        hashes = {}
+
+        with tarfile.open(temp_path, f'w:{compression}') as archive:
+            add_json_member(archive, MEMBERS_NAME, manifest)
+
+            for entry, path in entries:
+                tarinfo = build_tarinfo(entry)
+                if entry['type'] == 'file':
+                    with phase('compress'), open(path, 'rb') as file_:
+                        reader = HashingReader(file_)
+                        archive.addfile(tarinfo, reader)
+                    hashes[entry['path']] = reader.digest.hexdigest()
+                    add_file(path)
+                else:
+                    archive.addfile(tarinfo)
+
+            add_json_member(archive, HASHES_NAME, hashes)
+
+        os.replace(temp_path, dest)
+        return dict(is_successful=True,
+                    **compare_manifests(previous, manifest))
+
+    except (OSError, tarfile.TarError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return {'is_successful': False}
+
+def archive_directory(src, dest, jobs=None, mode='copy', resume=False,
+                      compression='gz', excludes=()):
+    """Saves a directory as the archive template at dest
+
+    Parameters:
+        jobs (int): accepted for compatibility with the store functions
+        mode (str): accepted for compatibility with the store functions
+        resume (bool): accepted for compatibility with the store functions,
+            a compressed archive is always written from the start
+        compression (str): one of COMPRESSIONS
+        excludes (iterable): gitignore-style patterns of the entries to
+            leave out
+
+    Returns:
+        dict: indicates whether the archive operation threw an error
+
+    """
+
+    return write_archive(src, dest, 'directory', compression, excludes)
+
+def archive_file(src, dest, jobs=None, mode='copy', resume=False,
+                 compression='gz', excludes=()):
+    """Saves a file as the archive template at dest
+
+    Parameters:
+        jobs (int): accepted for compatibility with the store functions
+        mode (str): accepted for compatibility with the store functions
+        resume (bool): accepted for compatibility with the store functions,
+            a compressed archive is always written from the start
+        compression (str): one of COMPRESSIONS
+        excludes (iterable): accepted for compatibility with
+            archive_directory
+
+    Returns:
+        dict: indicates whether the archive operation threw an error
+
+    """
+
+    return write_archive(src, dest, 'file', compression)
+
+def get_member_path(dest, name, symlinks=()):
+    """Returns the path of a member inside dest
+
+    Parameters:
+        dest (str): the directory the archive is extracted to
+        name (str): the name of the member
+        symlinks (set): the normalized names of the symlink members
+            extracted so far
+
+    Raises:
+        ValueError: when the member would be written outside of dest, at
+            one of the symlinks or through one
+
+    """
+
+    path = os.path.normpath(os.path.join(dest, name))
+    if os.path.isabs(name) or not path.startswith(
+            os.path.join(os.path.normpath(dest), '')):
+        raise ValueError(f'{name} is outside of the template.')
+    parts = os.path.relpath(path, dest).split(os.sep)
+    if any(os.sep.join(parts[:index]) in symlinks
+           for index in range(1, len(parts) + 1)):
+        raise ValueError(f'{name} goes through a symlink of the template.')
+    return path
+
+def extract_archive(src, dest, jobs=None, mode='copy', resume=False,
+                    selection=None, verify=False):
+    """Streams the archive template at src into dest
+
+    Members are written straight into dest while the archive is read, no
+    temporary directory is used. Like shutil.copytree, dest must not exist
+    yet. Files are always copied since archive members can't be linked.
+
+    Completed files are recorded in a journal next to dest (see
+    app.journal). With resume an existing dest is accepted and the members
+    the journal verifies are skipped instead of written again.
+
+    With a selection only the selected members are written (see
+    app.selection), the other members are skipped while they are read.
+
+    Members are never written outside of dest, nor through the symlinks
+    the archive holds.
+
+    With verify every file is hashed while it is written, and the hashes
+    are checked against the ones recorded in the archive's last member
+    once it is reached, so the archive is decompressed only once. When a
+    file doesn't match its hash, dest and its journal are removed.
+    Archives created before hashes were recorded are only checked by
+    their compression's checksums.
+
+    Parameters:
+        jobs (int): accepted for compatibility with restore_template
+        mode (str): accepted for compatibility with restore_template
+        resume (bool): if truthy continue an interrupted extract
+        selection (app.selection.Selection): the part of the template to
+            extract, all of it if None
+        verify (bool): if truthy check the hash of every file written
+
+    Returns:
+        dict: indicates whether the extract operation threw an error, and
+            the path of the first file that doesn't match its hash
+
+    """
+
+    try:
+        os.makedirs(dest, exist_ok=resume)
+        directories = []
+        identity = f'{os.path.abspath(src)}:{os.stat(src).st_mtime_ns}'
+
+        symlinks = set()
+        digests, recorded = {}, {}
+
+        with Journal(dest, identity, resume) as journal, \
+                tarfile.open(src, 'r|*') as archive:
+
+            def read_members():
+                for member in archive:
+                    if member.name == HASHES_NAME and verify:
+                        recorded.update(
+                            json.load(archive.extractfile(member)))
+                    elif member.name not in INDEX_NAMES:
+                        yield member.name, member
+
+            members = read_members()
+            if selection:
+                members = selection.select(
+                    (member.name, member.isdir(), member)
+                    for _, member in members)
+            for name, member in members:
+                path = get_member_path(dest, name, symlinks)
+
+                if member.isdir():
+                    os.makedirs(path, exist_ok=resume)
+                    directories.append((path, member.mode))
+                elif member.issym():
+                    prepare_path(path, resume)
+                    os.symlink(member.linkname, path)
+                    symlinks.add(os.path.relpath(path, dest))
+                elif member.isfile() and \
+                        not journal.is_complete(name, path):
+                    prepare_path(path, resume)
+                    with phase('copy_data'), open(path, 'wb') as file_:
+                        if verify:
+                            digests[name] = copy_hashed(
+                                archive.extractfile(member), file_)
+                        else:
+                            shutil.copyfileobj(archive.extractfile(member),
+                                               file_)
+                    with phase('copy_metadata'):
+                        os.chmod(path, member.mode)
+                        os.utime(path, (member.mtime, member.mtime))
+                    add_file(path)
+                    journal.record_file(name, path)
+
+            corrupted = [name for name, digest in digests.items()
+                         if recorded and recorded.get(name) != digest]
+            if corrupted:
+                journal.finish()
+                shutil.rmtree(dest, ignore_errors=True)
+                raise ChecksumError(corrupted[0])
+
+            for path, directory_mode in reversed(directories):
+                os.chmod(path, directory_mode)
+
+        journal.finish()
+        return {'is_successful': True}
+
+    except ChecksumError as error:
+        return {'is_successful': False, 'corrupted': error.path}
+
+    except (OSError, ValueError, EOFError, tarfile.TarError):
+        return {'is_successful': False}
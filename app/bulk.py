@@ -0,0 +1,103 @@
+"""This module reads the bulk import files of `create --from-manifest`.
+
+A bulk import file lists the templates to create, each with a name, the
+path to create it from and whether an existing template is overwritten.
+JSON, CSV and YAML files are supported, YAML only when PyYAML is
+installed. JSON and YAML files hold a list of mappings, or a mapping
+with a `templates` list, and CSV files have a name,path,force header.
+Relative paths are resolved from the directory of the import file. An
+entry without a name or a path is returned with an error message instead,
+so that it fails on its own and the other templates are still created.
+
+- read_bulk_manifest: Returns the entries of a bulk import file
+
+Attributes:
+    BULK_FORMATS (dict): the format of every supported file extension
+    TRUE_VALUES (tuple): the strings read as a truthy force value
+
+"""
+
+import csv
+import json
+import os
+from app.messages import ErrorMessage
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+BULK_FORMATS = {'.json': 'json', '.csv': 'csv', '.yaml': 'yaml',
+                '.yml': 'yaml'}
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on')
+
+
+def parse_force(value):
+    """Returns the force value of an entry as a bool"""
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+def load_rows(path, bulk_format):
+    """Returns the rows of a bulk import file as mappings
+
+    Raises:
+        ValueError: when the file can't be parsed
+
+    """
+
+    with open(path, newline='') as file_:
+        if bulk_format == 'csv':
+            return list(csv.DictReader(file_))
+        if bulk_format == 'json':
+            rows = json.load(file_)
+        elif yaml is None:
+            raise ValueError('Reading YAML files requires PyYAML.')
+        else:
+            try:
+                rows = yaml.safe_load(file_)
+            except yaml.YAMLError as error:
+                raise ValueError(f'{path} is not valid YAML.') from error
+
+    if isinstance(rows, dict):
+        rows = rows.get('templates')
+    if not isinstance(rows, list):
+        raise ValueError(f'{path} does not list any templates.')
+    return rows
+
+def read_bulk_manifest(path):
+    """Returns the entries of a bulk import file
+
+    Parameters:
+        path (str): the path of a JSON, CSV or YAML file
+
+    Returns:
+        list: a dict with the name, path and force of every template, or
+            with the error message of an entry without a name or a path
+
+    Raises:
+        ValueError: when the file's format is not supported or the file
+            can't be parsed
+
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in BULK_FORMATS:
+        raise ValueError(f'{extension or path} is not a supported format.')
+
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    for number, row in enumerate(load_rows(path, BULK_FORMATS[extension])):
+        if not isinstance(row, dict) or not row.get('name') or \
+                not row.get('path'):
+            name = row.get('name') if isinstance(row, dict) else None
+            message = ErrorMessage('bulk_entry_invalid', entry=number + 1)
+            entries.append(dict(name=str(name or '').strip(), path=None,
+                                force=False, error=message.get_message()))
+            continue
+        entries.append(dict(
+            name=str(row['name']).strip(),
+            path=os.path.join(base, os.path.expanduser(str(row['path']))),
+            force=parse_force(row.get('force', False))))
+    return entries
@@ -0,0 +1,297 @@
+"""This module contains the in-memory content cache of small templates.
+
+Long-running processes, such as the `scaffold serve` daemon, can keep the
+contents of the stored templates they clone in memory with
+enable_content_cache. The first clone of a template reads its manifest and
+blobs into the cache, later clones write every file straight from memory
+without reading the template folder. Only stored templates in copy mode
+are cached: their manifest is replaced by a new file whenever the
+template changes and their blobs are never modified in place.
+
+The cache is bounded by a total byte budget and evicts the least recently
+cloned templates first, templates larger than the per-template limit are
+never cached. Creating a template with force or deleting it invalidates
+its entry, and a cached template whose manifest was replaced is loaded
+again.
+
+- ContentCache: The contents of the cached templates
+- enable_content_cache: Caches the templates cloned by this process
+- get_cached_template: Returns the cached contents of a template to clone
+- write_cached_template: Writes a cached template to a directory
+- invalidate_template: Drops a template from the cache
+
+Attributes:
+    DEFAULT_MAX_BYTES (int): the total byte budget of the cache
+    DEFAULT_MAX_TEMPLATE_BYTES (int): the size of the largest template
+        that is cached
+
+"""
+
+import collections
+import os
+import threading
+from app.manifest import read_manifest
+from app.store import get_blob_path
+from app.timings import phase, add_file
+from app.utils import run_parallel
+from app.variables import Variables
+from app.versions import get_template_folder
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_TEMPLATE_BYTES = 4 * 1024 * 1024
+
+_content_cache = None
+
+
+class CachedTemplate():
+    """The contents of a cached template
+
+    Attributes:
+        version (tuple): the inode, modification time and size of the
+            template's manifest when it was loaded
+        entries (list): every manifest entry and the contents of the files
+        size (int): the number of bytes of file contents
+        scanned (bool): whether the manifest lists the placeholders of its
+            files (see app.variables)
+
+    """
+
+    def __init__(self, version, entries, size, scanned=True):
+        self.version = version
+        self.entries = entries
+        self.size = size
+        self.scanned = scanned
+
+class ContentCache():
+    """The contents of the cached templates, evicted least recently used
+
+    Attributes:
+        max_bytes (int): the total byte budget of the cache
+        max_template_bytes (int): the size of the largest cached template
+        hits (int): the lookups answered from memory
+        misses (int): the lookups that had to read the template folder
+        evictions (int): the templates dropped to stay within max_bytes
+        size (int): the number of bytes cached
+
+    Arguments:
+        max_bytes (int): the total byte budget of the cache
+        max_template_bytes (int): the size of the largest cached template,
+            at most max_bytes
+
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES,
+                 max_template_bytes=DEFAULT_MAX_TEMPLATE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_template_bytes = min(max_template_bytes, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self.templates = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, template_path):
+        """Returns the cached contents of the stored template at template_path
+
+        Templates that are not cached yet are loaded, unless they are
+        larger than max_template_bytes.
+
+        Returns:
+            CachedTemplate: the template's contents, or None when the
+                template is too large to be cached
+
+        Raises:
+            OSError: when the template or one of its blobs can't be read
+            ValueError: when the template is not a stored template
+
+        """
+
+        key = os.path.abspath(template_path)
+        template_stat = os.stat(key)
+        version = (template_stat.st_ino, template_stat.st_mtime_ns,
+                   template_stat.st_size)
+
+        with self.lock:
+            cached = self.templates.get(key)
+            if cached is not None and cached.version == version:
+                self.templates.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        cached = self.load(key, version)
+        if cached is not None:
+            self.put(key, cached)
+        return cached
+
+    def load(self, template_path, version):
+        """Reads the manifest and the blobs of a template into memory"""
+        manifest = read_manifest(template_path)
+        size = sum(entry['size'] for entry in manifest['entries']
+                   if entry['type'] == 'file')
+        if size > self.max_template_bytes:
+            return None
+
+        template_folder = get_template_folder(template_path)
+        entries = []
+        with phase('cache_load'):
+            for entry in manifest['entries']:
+                contents = None
+                if entry['type'] == 'file':
+                    with open(get_blob_path(template_folder, entry['hash']),
+                              'rb') as file_:
+                        contents = file_.read()
+                entries.append((entry, contents))
+        return CachedTemplate(version, entries, size,
+                              'placeholders' in manifest)
+
+    def put(self, template_path, cached):
+        """Caches a template, evicting the least recently used ones"""
+        with self.lock:
+            previous = self.templates.pop(template_path, None)
+            if previous is not None:
+                self.size -= previous.size
+            self.templates[template_path] = cached
+            self.size += cached.size
+
+            while self.size > self.max_bytes:
+                _, evicted = self.templates.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, template_path):
+        """Drops the template at template_path from the cache"""
+        with self.lock:
+            cached = self.templates.pop(os.path.abspath(template_path), None)
+            if cached is not None:
+                self.size -= cached.size
+
+    def get_stats(self):
+        """Returns the counters and the size of the cache as a dict"""
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses,
+                        evictions=self.evictions, size=self.size,
+                        templates=len(self.templates),
+                        max_bytes=self.max_bytes)
+
+def enable_content_cache(max_bytes=DEFAULT_MAX_BYTES,
+                         max_template_bytes=DEFAULT_MAX_TEMPLATE_BYTES):
+    """Caches the contents of the templates cloned by this process
+
+    A max_bytes of 0 disables the cache.
+
+    Returns:
+        ContentCache: the new cache, or None when it is disabled
+
+    """
+
+    global _content_cache
+    _content_cache = ContentCache(max_bytes, max_template_bytes) \
+        if max_bytes else None
+    return _content_cache
+
+def get_content_cache():
+    """Returns the process' ContentCache, or None when it is disabled"""
+    return _content_cache
+
+def get_cached_template(template_path, mode='copy', resume=False, **options):
+    """Returns the cached contents of a stored template about to be cloned
+
+    Parameters:
+        template_path (str): the path of the stored template
+        mode (str): how the clone materializes files, only copies are
+            written from the cache
+        resume (bool): resumed clones are never written from the cache
+        options: the other options of the clone, which are ignored
+
+    Returns:
+        CachedTemplate: the template's contents, or None when the cache is
+            disabled or doesn't apply to the clone
+
+    """
+
+    cache = _content_cache
+    if cache is None or mode != 'copy' or resume:
+        return None
+    try:
+        return cache.get(template_path)
+    except (OSError, ValueError):
+        return None
+
+def write_cached_template(cached, dest, jobs=None, variables=None,
+                          selection=None):
+    """Writes a cached template to dest, which must not exist yet
+
+    Parameters:
+        cached (CachedTemplate): the template to write
+        dest (str): the directory to write the template to
+        jobs (int): the number of threads writing files
+        variables (dict): the value of every variable to replace in paths
+            and contents, see app.variables
+        selection (app.selection.Selection): the part of the template to
+            write, all of it if None
+
+    Returns:
+        dict: indicates whether the write operation threw an error
+
+    """
+
+    variables = Variables(variables) if variables else None
+
+    def write(path, entry, contents):
+        if variables is not None and \
+                variables.applies_to(entry, cached.scanned):
+            with phase('render'):
+                contents = variables.render_bytes(contents)
+        with phase('copy_data'):
+            with open(path, 'wb') as file_:
+                file_.write(contents)
+        with phase('copy_metadata'):
+            os.chmod(path, entry['mode'])
+            os.utime(path, ns=(entry['mtime'], entry['mtime']))
+        add_file(path)
+
+    try:
+        os.makedirs(dest)
+        directories = []
+        files = []
+        entries = cached.entries
+        if selection:
+            entries = ((dict(entry, path=path), contents)
+                       for path, (entry, contents) in selection.select(
+                           (entry['path'], entry['type'] == 'directory',
+                            (entry, contents))
+                           for entry, contents in cached.entries))
+        with phase('scan'):
+            for entry, contents in entries:
+                path = os.path.join(dest, entry['path'] if variables is None
+                                    else variables.render_path(entry['path']))
+                if entry['type'] == 'directory':
+                    with phase('mkdir'):
+                        os.mkdir(path)
+                    directories.append((path, entry['mode']))
+                elif entry['type'] == 'symlink':
+                    os.symlink(entry['target'] if variables is None
+                               else variables.render_text(entry['target']),
+                               path)
+                else:
+                    files.append((path, entry, contents))
+
+        with phase('copy'):
+            run_parallel(write, files, jobs)
+
+        with phase('directory_metadata'):
+            for path, directory_mode in reversed(directories):
+                os.chmod(path, directory_mode)
+        return {'is_successful': True}
+
+    except (OSError, ValueError):
+        return {'is_successful': False}
+
+def invalidate_template(template_path):
+    """Drops the template at template_path from the cache, if enabled"""
+    cache = _content_cache
+    if cache is not None:
+        cache.invalidate(template_path)
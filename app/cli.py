@@ -1,96 +1,148 @@
 """
 This module contains the command-line engine to parse incoming requests
 
+The commands live in the app.commands package and are only imported when
+they are invoked, so that `scaffold list` and `scaffold --help` don't pay
+for importing the storage engines.
+
 Attributes:
     CONTEXT_SETTINGS (dict): Contains global settings for the app's context
+    COMMANDS (dict): the module, attribute and short help of every command
 """
 
-import os
+import contextlib
+import importlib
+import json
+import sys
 import click
 from app import Config
-from app.utils import get_clone_function
-from app.engines import (create_template, clone_template, get_templates,
-                         remove_template)
 
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+COMMANDS = {
+    'create': ('app.commands.create', 'create',
+               'Creates a new template.'),
+    'clone': ('app.commands.clone', 'clone',
+              'Clones a template to a directory.'),
+    'delete': ('app.commands.delete', 'delete', 'Deletes a template.'),
+    'diff': ('app.commands.diff', 'diff',
+             'Compares a directory with a template.'),
+    'gc': ('app.commands.gc', 'gc',
+           'Reclaims the space of deleted templates.'),
+    'list': ('app.commands.list', 'list_', 'Lists all templates.'),
+    'registry': ('app.commands.registry', 'registry',
+                 'Serves the templates as a stand-in remote registry.'),
+    'rollback': ('app.commands.rollback', 'rollback',
+                 'Rolls a template back to one of its versions.'),
+    'search': ('app.commands.search', 'search',
+               'Finds templates by their file names and contents.'),
+    'serve': ('app.commands.serve', 'serve',
+              'Serves the templates from a background daemon.'),
+    'verify': ('app.commands.verify', 'verify',
+               'Checks templates for corrupted or missing files.'),
+}
+
+
+class LazyGroup(click.Group):
+    """A command group that imports its commands when they are invoked
+
+    Commands added with add_command are used as is, the commands of
+    COMMANDS are imported from their module the first time they are
+    looked up.
 
-@click.group(context_settings=CONTEXT_SETTINGS)
-@click.pass_context
-def interface(ctx):
-    """SetupEnv: A simple templating program"""
-    ctx.obj = Config()
+    """
 
-@click.command(short_help="Creates a new template.")
-@click.option('--name', '-n', required=True,
-              help='The name to save the template as.')
-@click.option('--path', '-p', required=False,
-              default=os.getcwd(), type=click.Path(exists=True, readable=True),
-              help='The directory to create the template from.')
-@click.option('--force/--no-force', '-f', default=False,
-              help='Overwrite a template if one exists.')
-@click.pass_obj
-def create(ctx, name, path, force):
-    """Creates a template from the supplied path.
-
-    \b
-    - If no path is supplied the template is saved from the current working directory.
-    - If force is supplied, and a template with that name exists it will be
-        overwritten.
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(COMMANDS))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in COMMANDS:
+            module, attribute, short_help = COMMANDS[cmd_name]
+            command = getattr(importlib.import_module(module), attribute)
+            command.short_help = short_help
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def invoke(self, ctx):
+        """Reports the failures of the daemon a command was forwarded to"""
+        from app.daemon import DaemonError
+
+        try:
+            return super().invoke(ctx)
+        except DaemonError as error:
+            raise click.ClickException(str(error))
+
+    def format_commands(self, ctx, formatter):
+        """Lists the commands without importing them"""
+        rows = [(cmd_name, COMMANDS[cmd_name][2] if cmd_name in COMMANDS
+                 else self.commands[cmd_name].get_short_help_str())
+                for cmd_name in self.list_commands(ctx)]
+        with formatter.section('Commands'):
+            formatter.write_dl(rows)
+
+def start_profile(ctx, profile_format, profile_dump):
+    """Records the timings of the invoked command until ctx is closed
+
+    The summary is written to stderr so that the command's output is left
+    untouched.
+
+    Parameters:
+        ctx (click.Context): the context of the command group
+        profile_format (str): `text` or `json`
+        profile_dump (str): the path to dump cProfile stats to, or None
 
     """
 
-    path_function = get_clone_function(path)
-    status = create_template(path, name, path_function, force,
-                             ctx.TEMPLATE_FOLDER)
-
-    click.echo(status["msg"])
-
-@click.command(short_help="Clones a template to a directory.")
-@click.option('--template', '-t', required=True,
-              help='The name of the template to clone.')
-@click.option('--name', '-n', required=False,
-              help='The name of the new directory.',
-              default='Untitled')
-@click.option('--path', '-p', required=False,
-              default=os.getcwd(),
-              type=click.Path(exists=False, writable=True, file_okay=False),
-              help='The path to clone the template to.')
-@click.pass_obj
-def clone(ctx, name, path, template):
-    """Clones a template to create a new environment.
-
-    \b
-    - If no name is supplied the default name "Untitled" will be used.
-    - If no path is supplied the template is saved to the current working directory.
-    """
+    from app.timings import recording
+
+    def report(timings):
+        if profile_format == 'json':
+            click.echo(json.dumps(timings.to_dict()), err=True)
+        else:
+            click.echo('\n'.join(timings.format_summary()), err=True)
+
+    stack = contextlib.ExitStack()
+    stack.enter_context(recording(report))
+
+    if profile_dump:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        stack.callback(profiler.dump_stats, profile_dump)
+        stack.callback(profiler.disable)
+
+    ctx.call_on_close(stack.close)
+
+def start_progress(ctx):
+    """Shows the progress of large file copies on stderr until ctx is closed"""
+
+    from app.progress import reporting
+
+    stack = contextlib.ExitStack()
+    stack.enter_context(reporting(click.get_text_stream('stderr')))
+    ctx.call_on_close(stack.close)
+
+@click.group(cls=LazyGroup, context_settings=CONTEXT_SETTINGS)
+@click.option('--profile/--no-profile', default=False,
+              help='Print the timings of the command\'s phases to stderr.')
+@click.option('--profile-format', default='text',
+              type=click.Choice(('text', 'json')),
+              help='Print the timings as a summary or as JSON.')
+@click.option('--profile-dump', required=False, type=click.Path(),
+              help='Dump cProfile stats of the command to this file.')
+@click.option('--daemon/--no-daemon', default=True,
+              help='Forward the command to a running `scaffold serve`.')
+@click.option('--progress/--no-progress', default=None,
+              help='Show the progress of large file copies on stderr, by '
+                   'default when stderr is a terminal.')
+@click.pass_context
+def interface(ctx, profile, profile_format, profile_dump, daemon, progress):
+    """SetupEnv: A simple templating program"""
+    ctx.obj = Config()
 
-    path_function = get_clone_function(path)
-    status = clone_template(path, template, name, path_function,
-                            ctx.TEMPLATE_FOLDER)
-    click.echo(status["msg"])
-
-@click.command(short_help="Deletes a template.")
-@click.option('--template', '-t', required=True,
-              help='The name of the template to delete.')
-@click.pass_obj
-def delete(ctx, template):
-    """Deletes the specified template."""
-    status = remove_template(template, ctx.TEMPLATE_FOLDER)
-    click.echo(status["msg"])
-
-@click.command(name='list', short_help="Lists all templates.")
-@click.option('--filter', '-f', 'filter_', required=False,
-              default='',
-              help='The filter for the list.')
-@click.pass_obj
-def list_(ctx, filter_):
-    """Displays all templates."""
-    for index, template in enumerate(
-            get_templates(ctx.TEMPLATE_FOLDER, filter_)):
-        click.echo(f'{index + 1} {template}')
-
-interface.add_command(create)
-interface.add_command(clone)
-interface.add_command(delete)
-interface.add_command(list_)
+    if profile or profile_dump:
+        start_profile(ctx, profile_format, profile_dump)
+    if progress or (progress is None and sys.stderr.isatty()):
+        start_progress(ctx)
+    if not daemon or profile or profile_dump:
+        ctx.obj.USE_DAEMON = False
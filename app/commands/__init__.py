@@ -0,0 +1,6 @@
+"""
+This package contains the app's commands, one module per command
+
+The modules are only imported by app.cli.LazyGroup when their command is
+invoked, so each command only pays for the engines it uses.
+"""
@@ -0,0 +1,159 @@
+"""
+This module contains the clone command
+"""
+
+import os
+import click
+from app.daemon import forward_request
+from app.fileops import COPY_MODES
+from app.utils import get_clone_function
+from app.variables import read_variables
+from app.engines import clone_template, clone_template_to_many
+
+
+def get_destinations(names, paths, destinations_file):
+    """Returns the (path, name) pair of every destination of a clone
+
+    Names are paired with paths in order, a single name is used in every
+    path. Every line of the destinations file is a destination directory,
+    whose last component is the name of the clone. The current working
+    directory and the name "Untitled" are used when neither is supplied.
+
+    Raises:
+        click.UsageError: when names and paths can't be paired
+
+    """
+
+    destinations = []
+    if paths or names or destinations_file is None:
+        paths = paths or (os.getcwd(),)
+        names = names or ('Untitled',)
+        if len(names) == 1:
+            names = names * len(paths)
+        if len(names) != len(paths):
+            raise click.UsageError('Supply one name or a name per path.')
+        destinations.extend(zip(paths, names))
+
+    if destinations_file is not None:
+        for line in destinations_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                destinations.append(os.path.split(
+                    os.path.normpath(os.path.expanduser(line))))
+
+    return destinations
+
+def get_remote_options(ctx, template):
+    """Returns the clone options of a template of a registry
+
+    Returns:
+        dict: the registries and the size of their cache when the
+            template's name starts with a remote, an empty dict otherwise
+
+    """
+
+    remote = template.partition(':')[0]
+    if ':' not in template or remote not in getattr(ctx, 'REMOTES', {}):
+        return {}
+    return dict(remotes=ctx.REMOTES, remote_cache_size=ctx.REMOTE_CACHE_SIZE)
+
+@click.command()
+@click.option('--template', '-t', required=True,
+              help='The name of the template to clone.')
+@click.option('--name', '-n', 'names', required=False, multiple=True,
+              help='The name of the new directory, once per path.')
+@click.option('--path', '-p', 'paths', required=False, multiple=True,
+              type=click.Path(exists=False, writable=True, file_okay=False),
+              help='The path to clone the template to, can be repeated.')
+@click.option('--destinations', '-d', 'destinations_file', required=False,
+              type=click.File('r'),
+              help='A file listing a destination directory per line.')
+@click.option('--jobs', '-j', required=False, type=click.IntRange(min=1),
+              help='The number of threads copying files.')
+@click.option('--mode', '-m', default='copy', type=click.Choice(COPY_MODES),
+              help='How files are materialized in the new directory.')
+@click.option('--resume/--no-resume', default=False,
+              help='Continue an interrupted clone into the same path.')
+@click.option('--var', '-v', 'variables', required=False, multiple=True,
+              metavar='NAME=VALUE',
+              help='Replace the {{NAME}} placeholders with VALUE.')
+@click.option('--vars-file', required=False,
+              type=click.Path(exists=True, dir_okay=False),
+              help='A JSON or NAME=VALUE file of variables to replace.')
+@click.option('--include', '-i', 'includes', required=False, multiple=True,
+              metavar='PATTERN',
+              help='Only clone the paths matching PATTERN, can be repeated.')
+@click.option('--subpath', required=False, metavar='DIR',
+              help='Only clone the contents of the directory DIR.')
+@click.option('--verify/--no-verify', default=False,
+              help='Check every file against its hash while it is copied.')
+@click.pass_obj
+def clone(ctx, names, paths, destinations_file, template, jobs, mode,
+          resume, variables, vars_file, includes, subpath, verify):
+    """Clones a template to create a new environment.
+
+    \b
+    - If no name is supplied the default name "Untitled" will be used.
+    - If no path is supplied the template is saved to the current working directory.
+    - Files are copied on a pool of threads, set its size with jobs.
+    - The hardlink and symlink modes share the template's files and are
+        meant for read-only use, reflink and auto fall back to copying.
+    - Completed files are journaled, with resume an interrupted clone only
+        copies the files that are missing or were left incomplete.
+    - Repeat path (and name) or list destination directories in a file to
+        clone the template to all of them, reading it only once.
+    - With var the {{NAME}} placeholders in the file contents and paths of
+        a stored template are replaced while it is cloned, only the files
+        that hold placeholders are rewritten.
+    - With include or subpath only part of the template is walked and
+        cloned, e.g. `-i 'ci/' -i 'docker/*'` or `--subpath docker`.
+    - A template named `<remote>:<name>` is fetched from the registry of
+        remote (see REMOTES in the configuration) and cached in the
+        template folder, only the files missing from the cache are
+        downloaded.
+    - With verify every file of a stored or archive template is hashed
+        while it is copied and the clone fails on the first file that
+        doesn't match the hash recorded when the template was created.
+    - When `scaffold serve` runs the template is cloned by the daemon.
+    """
+
+    destinations = [(os.path.abspath(path), name) for path, name
+                    in get_destinations(names, paths, destinations_file)]
+    try:
+        variables = read_variables(variables, vars_file)
+    except (OSError, ValueError) as error:
+        raise click.BadParameter(str(error), param_hint="'--var'")
+    remote_options = get_remote_options(ctx, template)
+
+    if len(destinations) == 1:
+        path, name = destinations[0]
+        options = dict(jobs=jobs, mode=mode, resume=resume,
+                       **remote_options)
+        if variables:
+            options.update(variables=variables)
+        if includes or subpath:
+            options.update(includes=list(includes), subpath=subpath)
+        if verify:
+            options.update(verify=True)
+        status = forward_request(ctx, 'clone', path=path, template=template,
+                                 name=name, options=options)
+        if status is None:
+            path_function = get_clone_function(path)
+            status = clone_template(path, template, name, path_function,
+                                    ctx.TEMPLATE_FOLDER, **options)
+        click.echo(status["msg"])
+        return
+
+    if resume or variables or includes or subpath or verify:
+        raise click.UsageError('--resume, --var, --include, --subpath and '
+                               '--verify can only be used with a single '
+                               'destination.')
+
+    options = dict(jobs=jobs, mode=mode, **remote_options)
+    statuses = forward_request(
+        ctx, 'clone_many', destinations=destinations, template=template,
+        options=options)
+    if statuses is None:
+        statuses = clone_template_to_many(destinations, template,
+                                          ctx.TEMPLATE_FOLDER, **options)
+    click.echo('\n'.join(status["msg"] for status in statuses))
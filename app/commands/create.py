@@ -0,0 +1,144 @@
+"""
+This module contains the create command
+"""
+
+import os
+import click
+from app.archive import COMPRESSIONS
+from app.store import get_store_function, STORE_MODES
+from app.bulk import read_bulk_manifest
+from app.daemon import forward_request
+from app.engines import create_template, create_templates, preview_template
+from app.messages import InfoMessage
+from app.trash import start_reclaim
+from app.utils import format_size
+
+
+def create_from_manifest(ctx, bulk_manifest, force, template_format,
+                         workers, options):
+    """Creates the templates of a bulk import file and echoes the results
+
+    Parameters:
+        ctx (Config): the app's configuration
+        bulk_manifest (str): the path of the bulk import file
+        force (bool): if truthy overwrite every existing template, not only
+            the ones whose entry sets force
+        template_format (str): `store` or `archive`
+        workers (int): the number of templates created at the same time
+        options (dict): keyword arguments forwarded to the store functions
+
+    """
+
+    try:
+        bulk_entries = read_bulk_manifest(bulk_manifest)
+    except (OSError, ValueError) as error:
+        raise click.BadParameter(str(error), param_hint="'--from-manifest'")
+
+    entries = [(entry['path'], entry['name'],
+                {'is_successful': False, 'msg': entry['error']}
+                if 'error' in entry else
+                get_store_function(entry['path'], template_format),
+                entry['force'] or force) for entry in bulk_entries]
+    statuses = create_templates(entries, ctx.TEMPLATE_FOLDER, workers,
+                                **options)
+    if any(force for *_, force in entries) and ctx.RECLAIM_IN_BACKGROUND:
+        start_reclaim(ctx.TEMPLATE_FOLDER)
+    created = sum(status['is_successful'] for status in statuses)
+
+    for status in statuses:
+        click.echo(status["msg"])
+    click.echo(InfoMessage('templates_created', created=created,
+                           failed=len(statuses) - created,
+                           total=len(statuses)).get_message())
+
+
+@click.command()
+@click.option('--name', '-n', required=False,
+              help='The name to save the template as.')
+@click.option('--path', '-p', required=False,
+              type=click.Path(exists=True, readable=True),
+              help='The directory to create the template from.')
+@click.option('--force/--no-force', '-f', default=False,
+              help='Overwrite a template if one exists.')
+@click.option('--jobs', '-j', required=False, type=click.IntRange(min=1),
+              help='The number of threads copying files.')
+@click.option('--mode', '-m', default='copy', type=click.Choice(STORE_MODES),
+              help='How files are added to the template store.')
+@click.option('--format', 'template_format', default='store',
+              type=click.Choice(('store', 'archive')),
+              help='Save the template in the store or as an archive.')
+@click.option('--compression', default='gz', type=click.Choice(COMPRESSIONS),
+              help='The compression of an archive template.')
+@click.option('--resume/--no-resume', default=False,
+              help='Continue an interrupted create.')
+@click.option('--from-manifest', 'bulk_manifest', required=False,
+              type=click.Path(exists=True, dir_okay=False),
+              help='Create every template listed in a JSON, CSV or YAML file.')
+@click.option('--workers', '-w', required=False, type=click.IntRange(min=1),
+              help='The number of templates created at the same time.')
+@click.option('--exclude', '-e', 'excludes', required=False, multiple=True,
+              metavar='PATTERN',
+              help='Leave out the paths matching a .gitignore-style pattern.')
+@click.option('--dry-run', is_flag=True, default=False,
+              help='List the files that would be saved without saving them.')
+@click.pass_obj
+def create(ctx, name, path, force, jobs, mode, template_format,
+           compression, resume, bulk_manifest, workers, excludes, dry_run):
+    """Creates a template from the supplied path.
+
+    \b
+    - If no path is supplied the template is saved from the current working directory.
+    - If force is supplied, and a template with that name exists it will be
+        overwritten, the space it no longer uses is reclaimed in the
+        background.
+    - File contents are kept once in the template store and shared between
+        templates.
+    - With the hardlink mode the store shares the source files' inodes, so
+        the source must not be edited in place afterwards.
+    - With the archive format the template is saved as a single compressed
+        archive instead.
+    - With resume the files an interrupted create already added to the
+        store are not hashed again.
+    - With from-manifest every template listed in the file (its name, path
+        and force) is created, several at a time, and a summary is shown.
+    - Paths matching the patterns of a .scaffoldignore file in the path or
+        of exclude are left out, ignored directories are never read.
+    - With dry-run the files that would be saved and their total size are
+        listed and nothing is saved.
+    - When `scaffold serve` runs the template is created by the daemon.
+
+    """
+
+    options = dict(jobs=jobs, mode=mode, resume=resume)
+    if template_format == 'archive':
+        options.update(compression=compression)
+    if excludes:
+        options.update(excludes=list(excludes))
+
+    if dry_run:
+        status = preview_template(os.path.abspath(path or os.getcwd()),
+                                  excludes)
+        for relative_path, size in status.get('files', []):
+            click.echo(f'{relative_path} {format_size(size)}')
+        click.echo(status["msg"])
+        return
+
+    if bulk_manifest:
+        create_from_manifest(ctx, bulk_manifest, force, template_format,
+                             workers, options)
+        return
+    if not name:
+        raise click.UsageError("Missing option '--name' / '-n'.")
+
+    path = os.path.abspath(path or os.getcwd())
+    status = forward_request(ctx, 'create', path=path, name=name,
+                             force=force, template_format=template_format,
+                             options=options)
+    if status is None:
+        path_function = get_store_function(path, template_format)
+        status = create_template(path, name, path_function, force,
+                                 ctx.TEMPLATE_FOLDER, **options)
+        if force and ctx.RECLAIM_IN_BACKGROUND:
+            start_reclaim(ctx.TEMPLATE_FOLDER)
+
+    click.echo(status["msg"])
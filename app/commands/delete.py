@@ -0,0 +1,28 @@
+"""
+This module contains the delete command
+"""
+
+import click
+from app.daemon import forward_request
+from app.engines import remove_template
+from app.trash import start_reclaim
+
+
+@click.command()
+@click.option('--template', '-t', required=True,
+              help='The name of the template to delete.')
+@click.pass_obj
+def delete(ctx, template):
+    """Deletes the specified template.
+
+    \b
+    - The template is moved to the trash right away and its space is
+        reclaimed in the background, or by `scaffold gc`.
+    """
+
+    status = forward_request(ctx, 'delete', template=template)
+    if status is None:
+        status = remove_template(template, ctx.TEMPLATE_FOLDER)
+        if ctx.RECLAIM_IN_BACKGROUND and status['is_successful']:
+            start_reclaim(ctx.TEMPLATE_FOLDER)
+    click.echo(status["msg"])
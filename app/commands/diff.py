@@ -0,0 +1,37 @@
+"""
+This module contains the diff command
+"""
+
+import os
+import click
+from app.engines import diff_template
+
+
+@click.command()
+@click.option('--template', '-t', required=True,
+              help='The name of the template to compare with.')
+@click.option('--path', '-p', required=False, type=click.Path(exists=False),
+              help='The directory to compare, the current one if not '
+                   'supplied.')
+@click.option('--patch/--no-patch', '-u', default=False,
+              help='Print the unified diffs of the changed text files.')
+@click.option('--jobs', '-j', required=False, type=click.IntRange(min=1),
+              help='The number of threads hashing files.')
+@click.pass_obj
+def diff(ctx, template, path, patch, jobs):
+    """Lists the files a directory added, removed and modified.
+
+    \b
+    - Compares a clone with the template it was cloned from, or a source
+        directory with the template it would re-create.
+    - The entries left out by the directory's .scaffoldignore are skipped.
+    - Files with the same size and modification time as in the template
+        are unchanged, only the other files of the same size are hashed,
+        on a pool of threads.
+    - With patch the unified diffs of the changed text files are printed
+        after the summary.
+    """
+
+    status = diff_template(template, os.path.abspath(path or os.getcwd()),
+                           ctx.TEMPLATE_FOLDER, jobs, patch)
+    click.echo(status['msg'])
@@ -0,0 +1,26 @@
+"""
+This module contains the gc command
+"""
+
+import click
+from app.engines import reclaim_space
+from app.trash import RECLAIM_GRACE
+
+
+@click.command()
+@click.option('--grace', default=RECLAIM_GRACE,
+              type=click.FloatRange(min=0),
+              help='Keep unused files younger than this many seconds.')
+@click.pass_obj
+def gc(ctx, grace):
+    """Reclaims the space of deleted and replaced templates.
+
+    \b
+    - Empties the trash that deleted templates are moved to.
+    - Removes the stored files that no template uses anymore. Files added
+        less than grace seconds ago are kept, since a template being
+        created may not reference them yet.
+    """
+
+    status = reclaim_space(ctx.TEMPLATE_FOLDER, grace)
+    click.echo(status["msg"])
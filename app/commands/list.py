@@ -0,0 +1,81 @@
+"""
+This module contains the list command
+
+It is the command called most often, by scripts and shell completion. It
+imports the template index and app.engines, which only imports the
+template store, archive and search modules in the engines that use them.
+"""
+
+import time
+import click
+from app.index import SORT_FIELDS
+from app.daemon import forward_request
+from app.utils import format_size
+from app.engines import (get_templates, get_template_details,
+                         get_template_versions)
+
+
+def format_versions(template_name, template_folder):
+    """Returns a line per version of a template"""
+    lines = []
+    for version in get_template_versions(template_name, template_folder):
+        created = time.strftime('%Y-%m-%d %H:%M',
+                                time.localtime(version['created']))
+        lines.append(f'    v{version["version"]} '
+                     f'{format_size(version["size"])} '
+                     f'{version["files"]} files '
+                     f'(+{format_size(version["added"])}) {created}'
+                     + (' current' if version['current'] else ''))
+    return lines
+
+
+@click.command(name='list')
+@click.option('--filter', '-f', 'filter_', required=False,
+              default='',
+              help='The filter for the list.')
+@click.option('--prefix', '-p', required=False, default='',
+              help='Only list templates starting with the prefix.')
+@click.option('--sort', '-s', 'sort_by', default='name',
+              type=click.Choice(SORT_FIELDS),
+              help='The field to sort the list by.')
+@click.option('--reverse/--no-reverse', '-r', default=False,
+              help='Sort in descending order.')
+@click.option('--long/--no-long', '-l', 'long_', default=False,
+              help='Display the size and file count of each template.')
+@click.option('--versions/--no-versions', default=False,
+              help='Display the versions of each template.')
+@click.pass_obj
+def list_(ctx, filter_, prefix, sort_by, reverse, long_, versions):
+    """Displays all templates.
+
+    \b
+    - Templates are read from the template folder's index, which is only
+        rebuilt when the template folder changed.
+    - When `scaffold serve` runs the templates are listed from its memory.
+    - With versions every version of each template is listed with its
+        size, the size of the files it added and when it was created.
+    """
+
+    templates = forward_request(
+        ctx, 'list', search_term=filter_, prefix=prefix, sort_by=sort_by,
+        reverse=reverse, details=long_)
+    if templates is None:
+        list_function = get_template_details if long_ else get_templates
+        templates = list_function(ctx.TEMPLATE_FOLDER, filter_, prefix,
+                                  sort_by, reverse)
+
+    lines = []
+    for index, template in enumerate(templates):
+        if long_:
+            name = template['name']
+            lines.append(f'{index + 1} {name} '
+                         f'{format_size(template["size"])} '
+                         f'{template["files"]} files')
+        else:
+            name = template
+            lines.append(f'{index + 1} {name}')
+        if versions:
+            lines.extend(format_versions(name, ctx.TEMPLATE_FOLDER))
+
+    if lines:
+        click.echo('\n'.join(lines))
@@ -0,0 +1,48 @@
+"""
+This module contains the registry command
+"""
+
+import os
+import signal
+import sys
+import click
+from app.messages import InfoMessage
+from app.registry import RegistryServer, DEFAULT_PORT
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1',
+              help='The address the registry listens on.')
+@click.option('--port', default=DEFAULT_PORT,
+              type=click.IntRange(min=0, max=65535),
+              help='The port the registry listens on.')
+@click.option('--verbose/--quiet', default=False,
+              help='Log every request to stderr.')
+@click.pass_obj
+def registry(ctx, host, port, verbose):
+    """Serves the templates as a registry until it is interrupted.
+
+    \b
+    - A stand-in for a remote registry: other template folders clone its
+        stored templates as `remote:name` when REMOTES in their
+        configuration points `remote` at its URL.
+    - Only stored templates and their versions are served.
+    - The registry stops on Ctrl+C or SIGTERM.
+    """
+
+    os.makedirs(ctx.TEMPLATE_FOLDER, exist_ok=True)
+    try:
+        server = RegistryServer(ctx.TEMPLATE_FOLDER, host, port, verbose)
+    except OSError as error:
+        raise click.ClickException(str(error))
+
+    click.echo(InfoMessage('registry_started',
+                           template_folder=ctx.TEMPLATE_FOLDER,
+                           url=server.url).get_message())
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
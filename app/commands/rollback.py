@@ -0,0 +1,27 @@
+"""
+This module contains the rollback command
+"""
+
+import click
+from app.engines import rollback_template
+
+
+@click.command()
+@click.option('--template', '-t', required=True,
+              help='The name of the template to roll back.')
+@click.option('--version', '-v', required=False, type=click.IntRange(min=1),
+              help='The version to roll back to, the previous one if not '
+                   'supplied.')
+@click.pass_obj
+def rollback(ctx, template, version):
+    """Rolls a template back to one of its versions.
+
+    \b
+    - Every create of a stored or archive template records a version,
+        list them with `scaffold list --versions`.
+    - Rolling back only points the template at the version, nothing is
+        copied, and the newer versions are kept.
+    """
+
+    status = rollback_template(template, ctx.TEMPLATE_FOLDER, version)
+    click.echo(status["msg"])
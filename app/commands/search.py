@@ -0,0 +1,46 @@
+"""
+This module contains the search command
+"""
+
+import click
+from app.engines import search_templates
+
+
+@click.command()
+@click.argument('text', required=False, default='')
+@click.option('--path', '-p', 'path_pattern', required=False,
+              help='A glob the file names, or paths if it has a slash, '
+                   'must match.')
+@click.option('--files/--no-files', '-f', default=False,
+              help='Display every matching file instead of the templates.')
+@click.pass_obj
+def search(ctx, text, path_pattern, files):
+    """Finds the templates whose files contain TEXT.
+
+    \b
+    - TEXT is matched ignoring case, e.g. `scaffold search python:3.12`.
+    - With path only the files whose name matches the glob are searched,
+        a glob holding a slash is matched against the path inside the
+        template, e.g. `-p Dockerfile` or `-p 'ci/*.yml'`.
+    - Templates are searched from an index that create and delete keep up
+        to date, only text files of up to 1 MB are indexed by contents.
+    """
+
+    if not text and not path_pattern:
+        raise click.UsageError('Supply a text, a path or both.')
+
+    status = search_templates(ctx.TEMPLATE_FOLDER, text, path_pattern)
+    if not status['is_successful']:
+        click.echo(status['msg'])
+        return
+
+    if files:
+        lines = [f'{match["template"]}: {match["path"]}'
+                 for match in status['matches']]
+    else:
+        templates = sorted({match['template'] for match in status['matches']})
+        lines = [f'{index + 1} {template}'
+                 for index, template in enumerate(templates)]
+
+    if lines:
+        click.echo('\n'.join(lines))
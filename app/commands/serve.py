@@ -0,0 +1,51 @@
+"""
+This module contains the serve command
+"""
+
+import os
+import signal
+import sys
+import click
+from app.cache import DEFAULT_MAX_BYTES
+from app.messages import InfoMessage
+from app.server import DaemonServer, WATCH_INTERVAL
+
+
+@click.command()
+@click.option('--watch-interval', default=WATCH_INTERVAL,
+              type=click.FloatRange(min=0.1),
+              help='The seconds between two checks of the template folder.')
+@click.option('--cache-size', default=DEFAULT_MAX_BYTES // 1024 // 1024,
+              type=click.IntRange(min=0),
+              help='The megabytes of template contents kept in memory.')
+@click.pass_obj
+def serve(ctx, watch_interval, cache_size):
+    """Serves the templates from a daemon until it is interrupted.
+
+    \b
+    - The daemon keeps the template index and the manifests of the
+        templates it reads in memory, as well as the contents of the small
+        templates it clones, up to cache-size megabytes (0 disables it).
+    - The create, clone, delete and list commands are forwarded to it over
+        a Unix socket that only the current user can use, run them with
+        --no-daemon to bypass it.
+    - The index is reloaded whenever the template folder changes.
+    - The daemon stops on Ctrl+C or SIGTERM and removes its socket.
+    """
+
+    os.makedirs(ctx.TEMPLATE_FOLDER, exist_ok=True)
+    try:
+        server = DaemonServer(ctx.TEMPLATE_FOLDER)
+    except OSError as error:
+        raise click.ClickException(str(error))
+
+    click.echo(InfoMessage('daemon_started',
+                           template_folder=ctx.TEMPLATE_FOLDER,
+                           socket_path=server.socket_path).get_message())
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        server.serve(watch_interval, cache_size * 1024 * 1024)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
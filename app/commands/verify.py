@@ -0,0 +1,36 @@
+"""
+This module contains the verify command
+"""
+
+import click
+from app.engines import verify_templates
+
+
+@click.command()
+@click.option('--template', '-t', 'templates', required=False, multiple=True,
+              help='The name of a template to verify, can be repeated.')
+@click.option('--deep/--no-deep', default=False,
+              help='Hash every file, even those unchanged since they were '
+                   'last verified.')
+@click.option('--jobs', '-j', required=False, type=click.IntRange(min=1),
+              help='The number of processes hashing files.')
+@click.pass_obj
+def verify(ctx, templates, deep, jobs):
+    """Checks templates against the hashes recorded when they were created.
+
+    \b
+    - Every template is verified when no template is supplied.
+    - Lists the missing and changed files of every corrupted template and
+        exits with status 1.
+    - Files are hashed on a pool of processes, set its size with jobs.
+    - Files whose size, mtime and inode didn't change since they were last
+        found intact are not hashed again, unless deep is supplied.
+    - Directory templates, which predate the template store, record no
+        hashes and are skipped.
+    """
+
+    status = verify_templates(ctx.TEMPLATE_FOLDER, templates, deep, jobs)
+    if status['msg']:
+        click.echo(status['msg'])
+    if not status['is_successful']:
+        click.get_current_context().exit(1)
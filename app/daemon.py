@@ -0,0 +1,186 @@
+"""This module contains the client of the `scaffold serve` daemon.
+
+The daemon (see app.server) keeps a template folder's index and the
+manifests of its hot templates in memory and runs the engines for the
+command-line interface. Requests and responses are single lines of JSON
+sent over a Unix socket. Commands forward their request to the daemon of
+their template folder when one is running and run the engines in-process
+otherwise, so this module only imports the socket module when a daemon's
+socket exists.
+
+Sockets are kept in a folder of the user's that no one else can enter,
+and requests are only sent to a socket that the user owns in a folder
+that only the user can write to. A command runs in-process when the
+daemon's socket is missing or refuses the connection. Once the daemon
+accepted a request, it may have partly run the operation, so its
+failures are raised as DaemonError instead.
+
+- DaemonError: Raised when a daemon fails to answer a request
+- get_socket_path: Returns the socket of a template folder's daemon
+- make_socket_folder: Creates the folder of the user's daemon sockets
+- is_trusted: Returns whether a socket belongs to the user
+- send_request: Sends a request to a daemon and returns its response
+- forward_request: Forwards a command's request when a daemon is running
+
+Attributes:
+    SOCKET_PREFIX (str): the start of the name of the sockets folder
+    CONNECT_TIMEOUT (float): the seconds to wait for a daemon to accept
+        a connection
+    FALLBACK_ERRORS (set): the errnos of the connections that no daemon
+        accepted, the command then runs in-process
+
+"""
+
+import errno
+import json
+import os
+import stat
+import zlib
+from app.messages import ErrorMessage
+
+
+SOCKET_PREFIX = 'ace-scaffold'
+CONNECT_TIMEOUT = 1.0
+FALLBACK_ERRORS = {errno.ENOENT, errno.ECONNREFUSED}
+
+
+class DaemonError(Exception):
+    """Raised when a daemon accepted a request but failed to answer it
+
+    The daemon may have partly run the operation, so the command must not
+    run it again in-process.
+
+    Arguments:
+        operation (str): the operation of the request
+        reason: the error of the daemon or of the connection
+
+    """
+
+    def __init__(self, operation, reason):
+        super().__init__(ErrorMessage('daemon_request', operation=operation,
+                                      reason=reason).get_message())
+
+
+def get_uid():
+    """Returns the user's id, or None on platforms without one"""
+    return os.getuid() if hasattr(os, 'getuid') else None
+
+def get_socket_folder():
+    """Returns the folder of the user's daemon sockets
+
+    The folder is kept in the user's runtime directory, or the temporary
+    directory, since the path of a Unix socket is limited in length.
+
+    """
+
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or \
+        os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(runtime_dir, f'{SOCKET_PREFIX}-{get_uid() or 0}')
+
+def get_socket_path(template_folder):
+    """Returns the path of the socket of the template folder's daemon"""
+    folder = os.path.abspath(os.path.expanduser(template_folder)).encode()
+    digest = f'{zlib.crc32(folder):08x}{zlib.adler32(folder):08x}'
+    return os.path.join(get_socket_folder(), f'{digest}.sock')
+
+def is_private_folder(folder_stat):
+    """Returns whether a folder is the user's and no one else can write it"""
+    uid = get_uid()
+    return (uid is None or folder_stat.st_uid == uid) and \
+        not folder_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def make_socket_folder(socket_path):
+    """Creates the folder of a socket, which only the user can enter
+
+    Raises:
+        PermissionError: when the folder exists and belongs to another
+            user or others can write to it
+
+    """
+
+    folder = os.path.dirname(socket_path)
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    if not is_private_folder(os.stat(folder)):
+        raise PermissionError(f'{folder} is not private to the user.')
+
+def is_trusted(socket_path):
+    """Returns whether a socket belongs to the user
+
+    The socket must be owned by the user and its folder must be private to
+    the user (see is_private_folder), so that no one else can replace it.
+
+    """
+
+    try:
+        folder_stat = os.stat(os.path.dirname(socket_path))
+        socket_stat = os.lstat(socket_path)
+    except OSError:
+        return False
+    uid = get_uid()
+    return stat.S_ISSOCK(socket_stat.st_mode) and \
+        (uid is None or socket_stat.st_uid == uid) and \
+        is_private_folder(folder_stat)
+
+def send_request(socket_path, operation, arguments):
+    """Sends a request to the daemon listening on socket_path
+
+    Returns:
+        dict: the daemon's response, with the result of the operation or
+            an error
+
+    Raises:
+        OSError: when no daemon accepts the connection, with an errno of
+            FALLBACK_ERRORS, or when the connection fails afterwards
+        ValueError: when the response is not valid
+
+    """
+
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(CONNECT_TIMEOUT)
+        client.connect(socket_path)
+        client.settimeout(None)
+        client.sendall(json.dumps(dict(
+            operation=operation, arguments=arguments)).encode() + b'\n')
+        with client.makefile('rb') as response:
+            return json.loads(response.readline())
+
+def forward_request(config, operation, **arguments):
+    """Runs a command's operation on the daemon when one is running
+
+    Parameters:
+        config (Config): the app's configuration, requests are only
+            forwarded when its USE_DAEMON is truthy
+        operation (str): one of app.server.OPERATIONS
+        arguments: the arguments of the operation, paths must be absolute
+
+    Returns:
+        dict: the result of the operation, or None when no daemon runs,
+            its socket isn't trusted (see is_trusted) or it refused the
+            connection, and the command must run in-process
+
+    Raises:
+        DaemonError: when the daemon accepted the request but failed to
+            run it or to answer
+
+    """
+
+    if not getattr(config, 'USE_DAEMON', False):
+        return None
+
+    socket_path = get_socket_path(config.TEMPLATE_FOLDER)
+    if not is_trusted(socket_path):
+        return None
+
+    try:
+        response = send_request(socket_path, operation, arguments)
+    except OSError as error:
+        if error.errno in FALLBACK_ERRORS:
+            return None
+        raise DaemonError(operation, error)
+    except ValueError as error:
+        raise DaemonError(operation, error)
+    if 'error' in response:
+        raise DaemonError(operation, response['error'])
+    return response.get('result')
@@ -0,0 +1,243 @@
+"""This module contains the comparison of a template with a directory.
+
+A diff lists the files that a directory added, removed and modified
+compared to a template, which shows how a clone drifted from its template
+or what re-creating the template from the directory would change. The
+directory is walked like create walks it (see app.manifest.list_entries),
+leaving out the entries its `.scaffoldignore` file ignores, and the
+entries of the template are read from its manifest or from the member
+index of its archive, so only directory templates are walked too.
+
+Entries are compared by their metadata first. Entries whose type changed,
+symlinks whose target changed and files whose size changed are modified,
+and files with the same size and mtime are unchanged, which is what a
+clone restores. Only the files left are hashed, on a thread pool, and
+compared with the hash that the manifest of a stored template records,
+or with the hash of the template's file.
+
+- diff_tree: Returns the paths a directory added, removed and modified
+- format_patch: Returns the unified diffs of the modified text files
+
+"""
+
+import hashlib
+import os
+import tarfile
+from app.archive import read_members
+from app.fileops import BUFFER_SIZE
+from app.ignore import load_ignore_rules
+from app.manifest import list_entries, read_manifest
+from app.store import hash_file
+from app.timings import phase
+from app.utils import get_template_format, run_parallel
+
+
+def read_template_entries(template_path):
+    """Returns the format, type and entries of a template
+
+    Returns:
+        tuple: the template's format, its type (`file` or `directory`) and
+            its entries by path
+
+    """
+
+    template_format = get_template_format(template_path)
+    if template_format == 'store':
+        manifest = read_manifest(template_path)
+    elif template_format == 'archive':
+        manifest = read_members(template_path)
+    else:
+        manifest = dict(type='directory', entries=[
+            entry for entry, _ in list_entries(template_path, 'directory')])
+    return template_format, manifest['type'], {
+        entry['path']: entry for entry in manifest['entries']}
+
+def read_directory_entries(path, template_type, template_entries):
+    """Returns the entries of the directory compared with a template
+
+    The file compared with a file template keeps the template's name.
+
+    Returns:
+        dict: the entry and its path on disk by relative path
+
+    """
+
+    if template_type == 'file':
+        entries = list_entries(path, 'file')
+        return {name: (entries[0][0], path) for name in template_entries}
+    return {entry['path']: (entry, entry_path) for entry, entry_path
+            in list_entries(path, 'directory', load_ignore_rules(path))}
+
+def compare_entries(template_entry, entry, template_format):
+    """Compares a template's entry with the entry of the same path
+
+    Archive members keep their mtimes as floating point seconds, so the
+    mtimes of their clones are only compared to the microsecond.
+
+    Returns:
+        str: `modified`, `unchanged`, or `candidate` for files whose
+            contents must be hashed
+
+    """
+
+    if template_entry['type'] != entry['type']:
+        return 'modified'
+    if entry['type'] == 'symlink':
+        return 'unchanged' if template_entry['target'] == entry['target'] \
+            else 'modified'
+    if entry['type'] == 'directory':
+        return 'unchanged'
+
+    if template_entry['size'] != entry['size']:
+        return 'modified'
+    tolerance = 1000 if template_format == 'archive' else 0
+    return 'unchanged' if abs(template_entry['mtime'] - entry['mtime']) \
+        <= tolerance else 'candidate'
+
+def hash_members(template_path, paths):
+    """Returns the hash of the archive members at paths
+
+    The archive is read once, only the members at paths are hashed.
+
+    """
+
+    from app.archive import INDEX_NAMES
+
+    digests = {}
+    with tarfile.open(template_path, 'r|*') as archive:
+        for member in archive:
+            if member.name in INDEX_NAMES or member.name not in paths:
+                continue
+            digest = hashlib.sha256()
+            file_ = archive.extractfile(member)
+            for chunk in iter(lambda: file_.read(BUFFER_SIZE), b''):
+                digest.update(chunk)
+            digests[member.name] = digest.hexdigest()
+    return digests
+
+def diff_tree(template_path, path, jobs=None):
+    """Compares the directory at path with the template at template_path
+
+    Parameters:
+        template_path (str): the path of the template
+        path (str): the directory, or the file of a file template, to
+            compare with the template
+        jobs (int): the number of threads hashing files
+
+    Returns:
+        dict: the sorted paths of the files and symlinks that path added,
+            removed and modified compared to the template
+
+    Raises:
+        OSError: when either tree can't be read
+        ValueError: when the template's manifest is invalid
+        tarfile.TarError: when the archive of the template is invalid
+
+    """
+
+    with phase('scan'):
+        template_format, template_type, template_entries = \
+            read_template_entries(template_path)
+        entries = read_directory_entries(path, template_type,
+                                         template_entries)
+
+    added = [relative_path for relative_path, (entry, _) in entries.items()
+             if relative_path not in template_entries
+             and entry['type'] != 'directory']
+    removed = [relative_path for relative_path, entry
+               in template_entries.items()
+               if relative_path not in entries
+               and entry['type'] != 'directory']
+    modified, candidates = [], []
+    with phase('compare'):
+        for relative_path, (entry, entry_path) in entries.items():
+            template_entry = template_entries.get(relative_path)
+            if template_entry is None:
+                continue
+            state = compare_entries(template_entry, entry, template_format)
+            if state == 'modified':
+                modified.append(relative_path)
+            elif state == 'candidate':
+                candidates.append((relative_path, entry_path))
+
+    digests, template_digests = {}, {}
+
+    def hash_candidate(relative_path, entry_path):
+        digests[relative_path] = hash_file(entry_path)
+        if template_format == 'directory':
+            template_digests[relative_path] = hash_file(
+                os.path.join(template_path, relative_path))
+
+    with phase('hash'):
+        run_parallel(hash_candidate, candidates, jobs)
+        if template_format == 'store':
+            template_digests = {
+                relative_path: template_entries[relative_path]['hash']
+                for relative_path, _ in candidates}
+        elif template_format == 'archive' and candidates:
+            template_digests = hash_members(
+                template_path, {relative_path for relative_path, _
+                                in candidates})
+
+    modified.extend(relative_path for relative_path, _ in candidates
+                    if digests[relative_path] !=
+                    template_digests.get(relative_path))
+    return dict(added=sorted(added), removed=sorted(removed),
+                modified=sorted(modified))
+
+def format_patch(template_path, path, changes):
+    """Returns the unified diffs of the changed text files
+
+    Text files of at most app.search.MAX_INDEXED_SIZE bytes are compared
+    line by line, other files are only reported as different and the
+    symlinks and the entries whose type changed are left out.
+
+    Parameters:
+        template_path (str): the path of the template
+        path (str): the directory compared with the template
+        changes (dict): the added, removed and modified paths (see
+            diff_tree)
+
+    Returns:
+        list: the lines of the diffs, in the order of the paths
+
+    """
+
+    import difflib
+    from app.search import read_files, BINARY_PROBE, MAX_INDEXED_SIZE
+
+    def decode(contents):
+        if contents is None or b'\0' in contents[:BINARY_PROBE]:
+            return None
+        return contents.decode('utf-8', 'replace').splitlines()
+
+    def read(entry_path):
+        if os.path.getsize(entry_path) > MAX_INDEXED_SIZE:
+            return None
+        with open(entry_path, 'rb') as file_:
+            return file_.read()
+
+    wanted = set(changes['removed']) | set(changes['modified'])
+    template_files = dict(read_files(template_path, wanted))
+
+    lines = []
+    for relative_path in sorted(set(changes['added']) | wanted):
+        entry_path = path if os.path.isfile(path) and \
+            not os.path.islink(path) else os.path.join(path, relative_path)
+        is_added = relative_path in changes['added']
+        is_removed = relative_path in changes['removed']
+        if not is_added and relative_path not in template_files or \
+                not is_removed and (os.path.islink(entry_path) or
+                                    not os.path.isfile(entry_path)):
+            continue
+
+        old = [] if is_added else decode(template_files[relative_path])
+        new = [] if is_removed else decode(read(entry_path))
+        if old is None or new is None:
+            lines.append(f'Binary files a/{relative_path} and '
+                         f'b/{relative_path} differ')
+            continue
+        lines.extend(difflib.unified_diff(
+            old, new, fromfile=f'a/{relative_path}',
+            tofile=f'b/{relative_path}', lineterm=''))
+    return lines
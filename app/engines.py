@@ -1,23 +1,126 @@
 """This module contains the engines that the app uses to operate.
 
 - create_template: Creates a new template in the template_folder
+- create_templates: Creates many templates concurrently
 - clone_template: Clones a template to the specified path
+- clone_template_to_many: Clones a template to many paths in a single pass
+- preview_template: Lists the files a template would be created from
+- get_templates: Lists the templates in the template_folder
+- get_template_details: Lists the templates with their size and file count
+- search_templates: Finds the files of the templates by path and contents
+- get_template_versions: Lists the versions of a template
+- rollback_template: Makes an earlier version the current template
+- remove_template: Moves a template to the trash
+- reclaim_space: Empties the trash and removes unreferenced blobs
+
+The template store and archive modules are imported by the engines that
+use them, listing templates only needs the index.
+
+Attributes:
+    DEFAULT_WORKERS (int): the number of templates create_templates saves
+        at the same time when no worker count is supplied
 
 """
 
 import os
-from app.utils import get_template, delete_template
+from app.index import update_index, query_index, row_to_dict
+from app.utils import (get_template, delete_template, get_template_format,
+                       format_size)
 from app.messages import ErrorMessage, InfoMessage
+from app.timings import timed
 
 
-def create_template(src, name, clone_function, force, template_folder):
+DEFAULT_WORKERS = 4
+
+
+def check_template(name, clone_function, force, template_folder):
+    """Checks whether a template can be saved under name
+
+    An existing template is moved to the trash when force is truthy, unless
+    it can be synced in place (see create_template).
+
+    Returns:
+        tuple: whether the existing template is updated in place and an
+            ErrorMessage when the template can't be saved, None otherwise
+
+    """
+
+    dest = os.path.join(template_folder, name)
+    message_kwargs = dict(template_name=name)
+
+    if not get_template(name, template_folder):
+        return False, None
+
+    template_format = get_template_format(dest)
+    if force and template_format != 'directory' and \
+            template_format == clone_function.get('format'):
+        return True, None
+    if force:
+        delete_status = delete_template(name, template_folder)
+
+        if not delete_status['is_successful']:
+            return False, ErrorMessage('delete_template', **message_kwargs)
+        return False, None
+    return False, ErrorMessage('template_exists', **message_kwargs)
+
+def save_template(src, name, clone_function, is_update, template_folder,
+                  **options):
+    """Executes the clone function to save src as the template name
+
+    An updated template is dropped from the content cache (see app.cache).
+    The saved template is recorded as a new version, and so is the
+    template it replaces if it predates versions (see app.versions).
+
+    Returns:
+        dict: indicates the status of the operation and a result message
+
+    """
+
+    from app.cache import invalidate_template
+    from app.versions import record_version
+
+    dest = os.path.join(template_folder, name)
+    if is_update:
+        try:
+            record_version(template_folder, name)
+        except OSError:
+            pass
+    clone_status = clone_function['execute'](src, dest, **options)
+    if is_update:
+        invalidate_template(dest)
+    if clone_status['is_successful']:
+        try:
+            record_version(template_folder, name)
+        except OSError:
+            pass
+
+    if clone_status['is_successful'] and is_update:
+        message = InfoMessage(
+            'template_updated', added=clone_status['added'],
+            changed=clone_status['changed'],
+            removed=clone_status['removed'], template_name=name)
+    elif clone_status['is_successful']:
+        message = InfoMessage('template_created', template_name=name)
+    else:
+        message = ErrorMessage('create_template', template_name=name)
+
+    return dict(is_successful=clone_status['is_successful'],
+                msg=message.get_message())
+
+@timed
+def create_template(src, name, clone_function, force, template_folder,
+                    **options):
     """Creates a template
 
-    Executes the proper clone_function with the scr and dest to create
-    a template for a file or a directory. For directories the contents are
-    copied to the new template folder, while files themselves are copied to
-    the new template folder. Overwriting an existing template is possible with
-    the force (-f) option.
+    Executes the proper clone_function with the src and dest to save a file
+    or a directory as a template. The clone functions from
+    app.store.get_store_function add the contents to the template store and
+    save the template's manifest at dest. Overwriting an existing template
+    is possible with the force (-f) option: a stored template is synced
+    with src so that only new or changed files are added to the store and
+    an archive template is replaced by a new archive, while a template in
+    another format is moved to the trash and saved again. The blobs the
+    replaced template no longer references are removed by reclaim_space.
 
     Parameters:
         src (str): the path to create the template from
@@ -26,115 +129,529 @@ def create_template(src, name, clone_function, force, template_folder):
             call the create the template with the correct parameters
         force (bool): if truthy overwrite the existing template if one exists
         template_folder (str): folder that templates currently live
+        options: keyword arguments forwarded to the clone function, such as
+            jobs (the number of threads copying files)
 
     Returns:
         dict: indicates the status of the operation and a result message
 
     """
 
-    message = None
-    is_successful = None
-    message_kwargs = dict(template_name=name)
+    from app.search import update_search_index
 
-    new_template_dir = os.path.join(template_folder, name) \
-        if clone_function['type'] == 'file' \
-        else template_folder
+    is_update, message = check_template(name, clone_function, force,
+                                        template_folder)
+    if message is not None:
+        return dict(is_successful=False, msg=message.get_message())
 
-    if get_template(name, template_folder):
-        if force:
-            delete_status = delete_template(name, template_folder)
+    status = save_template(src, name, clone_function, is_update,
+                           template_folder, **options)
 
-            if not delete_status['is_successful']:
-                message = ErrorMessage('delete_template', **message_kwargs)
-                is_successful = False
-        else:
-            message = ErrorMessage('template_exists', **message_kwargs)
-            is_successful = False
+    update_index(template_folder)
+    update_search_index(template_folder)
 
-    if is_successful is not False:
+    return status
 
-        if clone_function['type'] == 'file':
-            filename = os.path.basename(src)
-            dest = os.path.join(new_template_dir, filename)
-            os.mkdir(new_template_dir)
-        else:
-            dest = os.path.join(new_template_dir, name)
+@timed
+def create_templates(entries, template_folder, workers=None, **options):
+    """Creates many templates concurrently
 
-        clone_status = clone_function['execute'](src, dest)
-        if clone_status['is_successful']:
+    The templates are saved on a pool of workers, a failed template doesn't
+    stop the others. The index and the search index are updated once,
+    after every template was saved.
 
-            message = InfoMessage('template_created', template_name=name)
-            is_successful = True
+    Parameters:
+        entries (list): a (src, name, clone_function, force) tuple per
+            template, see create_template
+        template_folder (str): folder that templates currently live
+        workers (int): the number of templates saved at the same time,
+            DEFAULT_WORKERS if None
+        options: keyword arguments forwarded to every clone function
+
+    Returns:
+        list: the status of the operation and a message for every entry,
+            in the order of entries
+
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+    from app.search import update_search_index
+
+    results = [None] * len(entries)
+    pending = []
+    names = set()
+
+    for index, (src, name, clone_function, force) in enumerate(entries):
+        if not clone_function['is_successful']:
+            results[index] = dict(is_successful=False,
+                                  msg=clone_function['msg'])
+            continue
+        if name in names:
+            message = ErrorMessage('template_exists', template_name=name)
+            results[index] = dict(is_successful=False,
+                                  msg=message.get_message())
+            continue
+        names.add(name)
+
+        is_update, message = check_template(name, clone_function, force,
+                                            template_folder)
+        if message is not None:
+            results[index] = dict(is_successful=False,
+                                  msg=message.get_message())
         else:
-            message = ErrorMessage('create_template', template_name=name)
-            is_successful = False
+            pending.append((index, (src, name, clone_function, is_update,
+                                    template_folder)))
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) \
+            as executor:
+        futures = [(index, executor.submit(save_template, *args, **options))
+                   for index, args in pending]
+        for index, future in futures:
+            try:
+                results[index] = future.result()
+            except (OSError, ValueError, KeyError):
+                message = ErrorMessage('create_template',
+                                       template_name=entries[index][1])
+                results[index] = dict(is_successful=False,
+                                      msg=message.get_message())
+
+    update_index(template_folder)
+    update_search_index(template_folder)
+
+    return results
+
+def fetch_remote(src, name, template_folder, remotes, jobs=None,
+                 cache_size=None):
+    """Fetches the template of a registry that a clone names
+
+    Local templates, including those whose name holds the separator of
+    remote templates, are cloned as is.
 
-    return dict(is_successful=is_successful, msg=message.get_message())
+    Parameters:
+        src (str): the path of the template in the template folder
+        name (str): the name of the template
+        template_folder (str): the path of the templates directory
+        remotes (dict): the URL of every registry by remote name
+        jobs (int): the number of threads downloading files
+        cache_size (int): the bytes of blobs the cached remote templates
+            may reference, app.remote.DEFAULT_CACHE_SIZE if None
+
+    Returns:
+        tuple: the path of the template to clone and an error message, or
+            None when the template can be cloned
+
+    """
+
+    if not remotes or os.path.exists(src):
+        return src, None
+
+    from app.remote import (fetch_remote_template, split_remote_name,
+                            DEFAULT_CACHE_SIZE)
+
+    if split_remote_name(name, remotes) is None:
+        return src, None
+
+    fetch_status = fetch_remote_template(
+        template_folder, name, remotes, jobs,
+        DEFAULT_CACHE_SIZE if cache_size is None else cache_size)
+    if fetch_status['is_successful']:
+        return fetch_status['path'], None
+    if fetch_status['is_missing']:
+        return src, ErrorMessage('template_missing', template_name=name)
+    return src, ErrorMessage('fetch_template', template_name=name)
 
-def clone_template(dest, name, clone_name, path_function, template_folder):
+@timed
+def clone_template(dest, name, clone_name, path_function, template_folder,
+                   **options):
     """Clones a template
 
     Clones a template to the specified directory with the specified name.
     Then builds the template's leaf node (which is the directory's leaf
     node for a directory or the file if it's a file) and clones the source
-    directory to the leaf node.
+    directory to the leaf node. Stored templates are rebuilt from the
+    store's blobs, or written from memory when the content cache is
+    enabled (see app.cache), archive templates are streamed into the leaf
+    node and directory templates are copied with the path_function.
+    The placeholders of variables can only be replaced in stored templates
+    (see app.variables). A clone can be limited to a directory of the
+    template and to the paths matched by include patterns, the rest of the
+    template is never walked (see app.selection). A version of a template
+    is cloned with the name `name@v<N>` (see app.versions) and a template
+    of a registry with the name `<remote>:<name>` (see app.remote).
 
     Parameters:
         dest (str): the path to clone the template to
-        name (str): the name of the template
+        name (str): the name of the template, `name@v<N>` for one of its
+            versions or `<remote>:<name>` for a template of a registry
         clone_name (str): the name to call the new template
         path_function (str): a reference to the correct path function to
             execute.
         template_folder (str): the path of the templates directory
+        options: keyword arguments forwarded to the path function or the
+            store, such as jobs (the number of threads copying files) and
+            variables (the value of every placeholder to replace by name),
+            plus includes (gitignore-style patterns of the paths to clone),
+            subpath (the directory of the template to clone), remotes (the
+            URL of every registry by remote name), remote_cache_size (the
+            bytes of blobs the cached remote templates may reference) and
+            verify (checks every file against its recorded hash while it
+            is copied, see app.verify)
 
     Returns:
         dict: indicates the status of the clone operation and a message
 
     """
 
+    from app.archive import extract_archive
+    from app.cache import get_cached_template, write_cached_template
+    from app.selection import Selection, has_directory
+    from app.store import restore_template
+    from app.versions import resolve_template
+
     message = None
     is_successful = None
     message_kwargs = dict(template_name=name)
+    remotes = options.pop('remotes', None)
+    remote_cache_size = options.pop('remote_cache_size', None)
+    subpath = options.pop('subpath', None)
+    try:
+        selection = Selection(options.pop('includes', ()), subpath)
+    except ValueError:
+        selection = Selection()
+        message = ErrorMessage('subpath_missing', subpath=subpath,
+                               **message_kwargs)
+        is_successful = False
+    if selection:
+        options.update(selection=selection)
 
-    src = os.path.join(template_folder, name)
+    src = resolve_template(template_folder, name)
     dest = os.path.join(dest, clone_name)
 
-    if not get_template(name, template_folder):
+    if is_successful is not False:
+        src, message = fetch_remote(src, name, template_folder, remotes,
+                                    options.get('jobs'), remote_cache_size)
+        if message is not None:
+            is_successful = False
+
+    if is_successful is not False and \
+            not get_template(os.path.basename(src), os.path.dirname(src)):
         message = ErrorMessage('template_missing', **message_kwargs)
         is_successful = False
 
     if is_successful is not False:
-        clone_status = path_function["execute"](src, dest)
+        template_format = get_template_format(src)
+        if options.get('variables') and template_format != 'store':
+            message = ErrorMessage('variables_unsupported', **message_kwargs)
+            is_successful = False
+        elif options.get('verify') and template_format == 'directory':
+            message = ErrorMessage('verify_unsupported', **message_kwargs)
+            is_successful = False
+
+    if is_successful is not False and selection.subpath is not None:
+        try:
+            has_subpath = has_directory(src, template_format,
+                                        selection.subpath)
+        except (OSError, ValueError):
+            has_subpath = False
+        if not has_subpath:
+            message = ErrorMessage('subpath_missing', subpath=subpath,
+                                   **message_kwargs)
+            is_successful = False
+
+    if is_successful is not False:
+        cached = get_cached_template(src, **options) \
+            if template_format == 'store' and not options.get('verify') \
+            else None
+        if cached is not None:
+            clone_status = write_cached_template(
+                cached, dest, options.get('jobs'), options.get('variables'),
+                options.get('selection'))
+        elif template_format == 'store':
+            clone_status = restore_template(src, dest, **options)
+        elif template_format == 'archive':
+            clone_status = extract_archive(src, dest, **options)
+        else:
+            clone_status = path_function["execute"](src, dest, **options)
         if clone_status['is_successful']:
             message = InfoMessage('template_cloned', path=dest,
                                   **message_kwargs)
             is_successful = True
 
+        elif clone_status.get('corrupted'):
+            message = ErrorMessage('template_corrupted',
+                                   path=clone_status['corrupted'],
+                                   **message_kwargs)
+            is_successful = False
         else:
             message = ErrorMessage('clone_template', **message_kwargs)
             is_successful = False
 
     return dict(is_successful=is_successful, msg=message.get_message())
 
+@timed
+def clone_template_to_many(destinations, name, template_folder, **options):
+    """Clones a template to many destinations
+
+    The template is read once for all destinations (see app.fanout)
+    instead of once per clone_template call. A destination that fails
+    doesn't stop the others.
+
+    Parameters:
+        destinations (list): a (path, clone_name) tuple per destination
+        name (str): the name of the template, `name@v<N>` or
+            `<remote>:<name>`
+        template_folder (str): the path of the templates directory
+        options: keyword arguments forwarded to app.fanout.fan_out_template,
+            such as jobs and mode, plus remotes and remote_cache_size (see
+            clone_template)
+
+    Returns:
+        list: the status of the clone operation and a message for every
+            destination, in the order of destinations
+
+    """
+
+    from app.fanout import fan_out_template
+    from app.versions import resolve_template
+
+    message_kwargs = dict(template_name=name)
+    remotes = options.pop('remotes', None)
+    remote_cache_size = options.pop('remote_cache_size', None)
+    src = resolve_template(template_folder, name)
+    dests = [os.path.join(path, clone_name)
+             for path, clone_name in destinations]
+
+    src, message = fetch_remote(src, name, template_folder, remotes,
+                                options.get('jobs'), remote_cache_size)
+    if message is not None:
+        return [dict(is_successful=False, msg=message.get_message())
+                for _ in dests]
+
+    if not get_template(os.path.basename(src), os.path.dirname(src)):
+        message = ErrorMessage('template_missing', **message_kwargs)
+        return [dict(is_successful=False, msg=message.get_message())
+                for _ in dests]
+
+    statuses = fan_out_template(src, dests, **options)
+    results = []
+    for dest, status in zip(dests, statuses):
+        if status['is_successful']:
+            message = InfoMessage('template_cloned', path=dest,
+                                  **message_kwargs)
+        else:
+            message = ErrorMessage('clone_template', path=dest,
+                                   **message_kwargs)
+        results.append(dict(is_successful=status['is_successful'],
+                            msg=message.get_message()))
+    return results
 
+@timed
+def preview_template(src, excludes=()):
+    """Lists the files a template created from src would hold
 
-def get_templates(template_folder, search_term=''):
+    Nothing is saved. The entries ignored by the `.scaffoldignore` file of
+    src or by excludes are left out, like create_template leaves them out
+    (see app.ignore).
+
+    Parameters:
+        src (str): the path to create the template from
+        excludes (iterable): gitignore-style patterns of the entries to
+            leave out
+
+    Returns:
+        dict: indicates the status of the operation, the relative path and
+            size of every file and a summary message
+
+    """
+
+    from app.ignore import load_ignore_rules
+    from app.manifest import list_entries
+
+    template_type = 'file' if os.path.isfile(src) else 'directory'
+    try:
+        ignore = load_ignore_rules(src, excludes) \
+            if template_type == 'directory' else None
+        files = [(entry['path'], entry['size']) for entry, _
+                 in list_entries(src, template_type, ignore)
+                 if entry['type'] == 'file']
+    except OSError:
+        message = ErrorMessage('directory_missing', path=src)
+        return dict(is_successful=False, msg=message.get_message())
+
+    message = InfoMessage('template_preview', files=len(files),
+                          size=format_size(sum(size for _, size in files)))
+    return dict(is_successful=True, files=files, msg=message.get_message())
+
+@timed
+def get_templates(template_folder, search_term='', prefix='', sort_by='name',
+                  reverse=False):
     """Returns all templates filtered by the search term
 
+    The templates are read from the template folder's index (see
+    app.index), which is only rebuilt when the template folder changed.
+
     Parameters:
         template_folder (str): the path of the templates directory
         search_term (str): filters the templates if the the term is present
+        prefix (str): filters the templates that start with the prefix
+        sort_by (str): the field to sort by, one of app.index.SORT_FIELDS
+        reverse (bool): if truthy sort in descending order
 
     Returns:
         list: represents the filtered templates
 
     """
-    return [template for template in os.listdir(template_folder)
-            if search_term in template]
+    return query_index(template_folder, search_term, prefix, sort_by, reverse)
+
+@timed
+def get_template_details(template_folder, search_term='', prefix='',
+                         sort_by='name', reverse=False):
+    """Returns the index details of the templates filtered by the search term
+
+    Takes the same parameters as get_templates.
+
+    Returns:
+        list: a dict per template with its name, format, type, size in
+            bytes, file count and creation time
+
+    """
+    return [row_to_dict(row) for row in query_index(
+        template_folder, search_term, prefix, sort_by, reverse, details=True)]
+
+@timed
+def search_templates(template_folder, text='', path_pattern=None):
+    """Returns the files of the templates that match a path and a text
+
+    The files are looked up in the template folder's search index (see
+    app.search), which create and delete keep up to date.
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        text (str): the text the files must contain, ignoring case, which
+            must hold a word of two letters or more
+        path_pattern (str): a glob matching the file's name, or its path
+            inside the template when the pattern holds a slash
+
+    Returns:
+        dict: indicates the status of the search, the template name and
+            path of every matching file and an error message on failure
+
+    """
+
+    import sqlite3
+    from app.search import search
+
+    try:
+        matches = search(template_folder, text, path_pattern)
+    except ValueError:
+        message = ErrorMessage('search_text_invalid', text=text)
+        return dict(is_successful=False, matches=[],
+                    msg=message.get_message())
+    except (OSError, sqlite3.Error):
+        message = ErrorMessage('search_templates')
+        return dict(is_successful=False, matches=[],
+                    msg=message.get_message())
+    return dict(is_successful=True, matches=[
+        dict(template=template, path=path) for template, path in matches])
+
+@timed
+def get_template_versions(template_name, template_folder):
+    """Returns the versions of a template, oldest first (see app.versions)
+
+    Parameters:
+        template_name (str): the name of the template
+        template_folder (str): the path of the templates directory
+
+    Returns:
+        list: a dict per version with its number, size in bytes, file
+            count, creation time, the size of the files it added to the
+            previous version and whether it is the current version
+
+    """
 
+    from app.archive import read_members
+    from app.manifest import read_manifest
+    from app.versions import list_versions
+
+    versions = []
+    previous = {}
+    for version in list_versions(template_folder, template_name):
+        try:
+            template_format = get_template_format(version['path'])
+            manifest = read_manifest(version['path']) \
+                if template_format == 'store' \
+                else read_members(version['path'])
+        except (OSError, ValueError):
+            continue
+
+        files = {entry['path']: entry for entry in manifest['entries']
+                 if entry['type'] == 'file'}
+        added = sum(entry['size'] for path, entry in files.items()
+                    if path not in previous or entry.get('hash') is None
+                    or previous[path].get('hash') != entry['hash'])
+        versions.append(dict(
+            version=version['version'], format=template_format,
+            size=sum(entry['size'] for entry in files.values()),
+            files=len(files), created=manifest['created'], added=added,
+            current=version['current']))
+        previous = files
+    return versions
+
+@timed
+def rollback_template(template_name, template_folder, version=None):
+    """Makes a version of a template its current version
+
+    The rollback only swaps the template's file for a link to the version,
+    however large the template is (see app.versions.rollback). A current
+    template saved before versions existed is recorded as a version first
+    so it isn't lost.
+
+    Parameters:
+        template_name (str): the name of the template
+        template_folder (str): the path of the templates directory
+        version (int): the version to roll back to, the version before the
+            current one if None
+
+    Returns:
+        dict: indicates the status of the rollback and a message
+
+    """
+
+    from app.cache import invalidate_template
+    from app.search import update_search_index
+    from app.versions import record_version, rollback
+
+    message_kwargs = dict(template_name=template_name)
+
+    if not get_template(template_name, template_folder):
+        message = ErrorMessage('template_missing', **message_kwargs)
+        return dict(is_successful=False, msg=message.get_message())
+
+    try:
+        record_version(template_folder, template_name)
+        version = rollback(template_folder, template_name, version)
+    except LookupError:
+        message = ErrorMessage('version_missing', version=version,
+                               **message_kwargs)
+        return dict(is_successful=False, msg=message.get_message())
+    except OSError:
+        message = ErrorMessage('rollback_template', **message_kwargs)
+        return dict(is_successful=False, msg=message.get_message())
+
+    invalidate_template(os.path.join(template_folder, template_name))
+    update_index(template_folder)
+    update_search_index(template_folder)
+    message = InfoMessage('template_rolled_back', version=version,
+                          **message_kwargs)
+    return dict(is_successful=True, msg=message.get_message())
+
+@timed
 def remove_template(template_name, template_folder):
     """Deletes the specified template
 
+    The template is moved to the trash, which is never listed. Its space
+    and the blobs only it referenced are reclaimed by reclaim_space.
+
     Parameters:
         template_name (str): The name of the template to delete
         template_folder (str): the path of the templates directory
@@ -144,14 +661,20 @@ def remove_template(template_name, template_folder):
 
     """
 
+    from app.cache import invalidate_template
+    from app.search import update_search_index
+
     is_successful = None
     message = None
     message_kwargs = dict(template_name=template_name)
 
     if get_template(template_name, template_folder):
         delete_status = delete_template(template_name, template_folder)
+        invalidate_template(os.path.join(template_folder, template_name))
 
         if delete_status['is_successful']:
+            update_index(template_folder)
+            update_search_index(template_folder)
             message = InfoMessage('template_deleted', **message_kwargs)
             is_successful = True
         else:
@@ -162,3 +685,157 @@ def remove_template(template_name, template_folder):
         is_successful = False
 
     return dict(is_successful=is_successful, msg=message.get_message())
+
+@timed
+def reclaim_space(template_folder, grace=None):
+    """Reclaims the space of deleted and replaced templates
+
+    Empties the trash and removes the blobs that no template references
+    (see app.trash.reclaim).
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        grace (float): the age in seconds under which unreferenced blobs
+            are kept, app.trash.RECLAIM_GRACE if None
+
+    Returns:
+        dict: indicates the status of the operation and a message
+
+    """
+
+    from app.trash import reclaim, RECLAIM_GRACE
+
+    if not os.path.isdir(template_folder):
+        status = dict(is_successful=True, templates=0, blobs=0)
+    else:
+        status = reclaim(template_folder,
+                         RECLAIM_GRACE if grace is None else grace)
+
+    if status['is_successful']:
+        message = InfoMessage('space_reclaimed', templates=status['templates'],
+                              blobs=status['blobs'])
+    else:
+        message = ErrorMessage('reclaim_space')
+    return dict(is_successful=status['is_successful'],
+                msg=message.get_message())
+
+@timed
+def verify_templates(template_folder, template_names=(), deep=False,
+                     jobs=None):
+    """Verifies templates against the hashes recorded when they were created
+
+    The files are hashed on a pool of processes and the files that were
+    found intact with the same size, mtime and inode are skipped unless
+    deep is truthy (see app.verify).
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        template_names (iterable): the names of the templates to verify,
+            or `name@v<N>` for a version, every template if empty
+        deep (bool): if truthy hash every file again
+        jobs (int): the number of processes hashing files
+
+    Returns:
+        dict: indicates whether every template is intact, the report of
+            every template and a message per template
+
+    """
+
+    from app.verify import verify
+    from app.versions import resolve_template
+
+    names = list(template_names)
+    if not names and os.path.isdir(template_folder):
+        names = sorted(name for name in os.listdir(template_folder)
+                       if not name.startswith('.'))
+
+    for name in names:
+        if not os.path.exists(resolve_template(template_folder, name)):
+            message = ErrorMessage('template_missing', template_name=name)
+            return dict(is_successful=False, templates=[],
+                        msg=message.get_message())
+
+    try:
+        reports = verify(template_folder, names, deep, jobs)
+    except (OSError, ValueError):
+        message = ErrorMessage('verify_templates')
+        return dict(is_successful=False, templates=[],
+                    msg=message.get_message())
+
+    lines = []
+    for report in reports:
+        message_kwargs = dict(template_name=report['template'])
+        if report['is_intact'] is None:
+            lines.append(InfoMessage('template_unverified',
+                                     **message_kwargs).get_message())
+        elif report['is_intact']:
+            lines.append(InfoMessage(
+                'template_verified', files=report['files'],
+                hashed=report['hashed'], **message_kwargs).get_message())
+        else:
+            lines.append(ErrorMessage(
+                'template_corrupted', missing=len(report['missing']),
+                changed=len(report['changed']),
+                **message_kwargs).get_message())
+            lines.extend(f'    missing: {path}' for path in report['missing'])
+            lines.extend(f'    changed: {path}' for path in report['changed'])
+
+    return dict(is_successful=all(report['is_intact'] is not False
+                                  for report in reports),
+                templates=reports, msg='\n'.join(lines))
+
+@timed
+def diff_template(template_name, path, template_folder, jobs=None,
+                  patch=False):
+    """Compares a directory with a template (see app.diff)
+
+    Parameters:
+        template_name (str): the name of the template, or `name@v<N>`
+        path (str): the directory to compare with the template, such as
+            a clone of it or the source it was created from
+        template_folder (str): the path of the templates directory
+        jobs (int): the number of threads hashing files
+        patch (bool): if truthy add the unified diffs of the changed text
+            files to the message
+
+    Returns:
+        dict: indicates the status of the diff, the paths that the
+            directory added, removed and modified and a message
+
+    """
+
+    import tarfile
+    from app.diff import diff_tree, format_patch
+    from app.versions import resolve_template
+
+    message_kwargs = dict(template_name=template_name)
+    changes = dict(added=[], removed=[], modified=[])
+    template_path = resolve_template(template_folder, template_name)
+
+    if not os.path.exists(template_path):
+        message = ErrorMessage('template_missing', **message_kwargs)
+        return dict(is_successful=False, msg=message.get_message(),
+                    **changes)
+    if not os.path.exists(path):
+        message = ErrorMessage('directory_missing', path=path)
+        return dict(is_successful=False, msg=message.get_message(),
+                    **changes)
+
+    try:
+        changes = diff_tree(template_path, path, jobs)
+        lines = [InfoMessage(
+            'template_diff', path=path, added=len(changes['added']),
+            removed=len(changes['removed']),
+            modified=len(changes['modified']),
+            **message_kwargs).get_message()]
+        for change in ('added', 'removed', 'modified'):
+            lines.extend(f'    {change}: {changed_path}'
+                         for changed_path in changes[change])
+        if patch:
+            lines.extend(format_patch(template_path, path, changes))
+    except (OSError, ValueError, tarfile.TarError):
+        message = ErrorMessage('diff_template', **message_kwargs)
+        return dict(is_successful=False, msg=message.get_message(),
+                    added=[], removed=[], modified=[])
+
+    return dict(is_successful=True, msg='\n'.join(lines), **changes)
@@ -0,0 +1,258 @@
+"""This module contains the fan-out clone of a template to many destinations.
+
+The template is walked once and every file is read once. In copy mode the
+contents of a file are written to every destination while they are read,
+in the other modes (see app.fileops) every destination is linked or
+reflinked to the template's file without reading it. A destination that
+fails is dropped and reported as failed while the others are completed.
+
+- fan_out_template: Clones a template to many destinations
+
+Attributes:
+    CHUNK_SIZE (int): the number of bytes read from a file at a time
+
+"""
+
+import os
+import tarfile
+import threading
+from app.archive import INDEX_NAMES, get_member_path
+from app.fileops import materialize_file, LINK_MODES
+from app.manifest import list_entries, read_manifest
+from app.store import get_blob_path
+from app.timings import phase, add_file
+from app.utils import run_parallel, get_template_format
+from app.versions import get_template_folder
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class Destinations():
+    """The destination directories of a fan-out clone
+
+    Attributes:
+        paths (list): every destination directory
+        failed (set): the destinations that failed
+
+    Arguments:
+        paths (list): the destination directories, which must not exist
+
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.failed = set()
+        self.lock = threading.Lock()
+
+    def active(self):
+        """Returns the destinations that have not failed"""
+        with self.lock:
+            return [path for path in self.paths if path not in self.failed]
+
+    def fail(self, path):
+        """Drops a destination after an error"""
+        with self.lock:
+            self.failed.add(path)
+
+    def apply(self, function, relative_path):
+        """Calls function with relative_path inside every destination
+
+        Destinations whose call raised an OSError are dropped.
+
+        """
+
+        for dest in self.active():
+            try:
+                function(os.path.join(dest, relative_path))
+            except OSError:
+                self.fail(dest)
+
+def set_metadata(path, entry):
+    """Restores the mode and modification time of a file entry"""
+    os.chmod(path, entry['mode'])
+    os.utime(path, ns=(entry['mtime'], entry['mtime']))
+
+def copy_to_all(source_file, entry, destinations):
+    """Writes the contents of source_file to the entry in every destination
+
+    The contents are read once, a chunk at a time.
+
+    """
+
+    files = []
+    for dest in destinations.active():
+        path = os.path.join(dest, entry['path'])
+        try:
+            files.append((dest, path, open(path, 'wb')))
+        except OSError:
+            destinations.fail(dest)
+
+    try:
+        with phase('copy_data'):
+            for chunk in iter(lambda: source_file.read(CHUNK_SIZE), b''):
+                for dest, _, file_ in files:
+                    if dest in destinations.failed:
+                        continue
+                    try:
+                        file_.write(chunk)
+                    except OSError:
+                        destinations.fail(dest)
+    finally:
+        for _, _, file_ in files:
+            file_.close()
+
+    with phase('copy_metadata'):
+        for dest, path, _ in files:
+            if dest in destinations.failed:
+                continue
+            try:
+                set_metadata(path, entry)
+                add_file(path)
+            except OSError:
+                destinations.fail(dest)
+
+def materialize_to_all(src, entry, destinations, mode):
+    """Creates the entry in every destination from the file at src
+
+    In copy mode src is read once, otherwise every destination is
+    materialized with mode, falling back to a copy where it fails.
+
+    """
+
+    if mode == 'copy':
+        with open(src, 'rb') as source_file:
+            copy_to_all(source_file, entry, destinations)
+        return
+
+    def materialize(path):
+        with phase('copy_data'):
+            materialized_mode = materialize_file(src, path, mode)
+        if materialized_mode not in LINK_MODES:
+            with phase('copy_metadata'):
+                set_metadata(path, entry)
+        add_file(path)
+
+    destinations.apply(materialize, entry['path'])
+
+def fan_out_entries(entries, destinations, jobs=None, mode='copy'):
+    """Clones manifest entries to every destination
+
+    Parameters:
+        entries (list): a manifest entry and the path of its contents for
+            every entry, the path is only used for files
+        destinations (Destinations): the destinations to clone to
+        jobs (int): the number of threads copying files
+        mode (str): how each file is materialized, see app.fileops
+
+    """
+
+    directories = []
+    files = []
+
+    with phase('scan'):
+        for entry, path in entries:
+            if entry['type'] == 'directory':
+                with phase('mkdir'):
+                    destinations.apply(os.mkdir, entry['path'])
+                directories.append(entry)
+            elif entry['type'] == 'symlink':
+                destinations.apply(
+                    lambda target, entry=entry: os.symlink(
+                        entry['target'], target), entry['path'])
+            else:
+                files.append((path, entry, destinations, mode))
+
+    with phase('copy'):
+        run_parallel(materialize_to_all, files, jobs)
+
+    with phase('directory_metadata'):
+        for entry in reversed(directories):
+            destinations.apply(
+                lambda path, entry=entry: os.chmod(path, entry['mode']),
+                entry['path'])
+
+def fan_out_archive(src, destinations):
+    """Streams the archive template at src into every destination once
+
+    Like app.archive.extract_archive, members are never written outside
+    of the destinations, nor at or through the symlinks the archive holds.
+
+    """
+
+    directories = []
+    symlinks = set()
+    root = destinations.paths[0]
+
+    with tarfile.open(src, 'r|*') as archive:
+        for member in archive:
+            if member.name in INDEX_NAMES:
+                continue
+            name = os.path.relpath(
+                get_member_path(root, member.name, symlinks), root)
+
+            if member.isdir():
+                destinations.apply(os.mkdir, name)
+                directories.append((name, member.mode))
+            elif member.issym():
+                destinations.apply(
+                    lambda path, member=member: os.symlink(
+                        member.linkname, path), name)
+                symlinks.add(name)
+            elif member.isfile():
+                mtime = int(member.mtime * 1e9)
+                copy_to_all(archive.extractfile(member),
+                            dict(path=name, mode=member.mode,
+                                 mtime=mtime), destinations)
+
+    for name, directory_mode in reversed(directories):
+        destinations.apply(
+            lambda path, directory_mode=directory_mode: os.chmod(
+                path, directory_mode), name)
+
+def fan_out_template(src, dests, jobs=None, mode='copy'):
+    """Clones the template at src to every destination in a single pass
+
+    Like clone_template every destination must not exist yet.
+
+    Parameters:
+        src (str): the path of the template in the template folder
+        dests (list): the destination directories
+        jobs (int): the number of threads copying files
+        mode (str): how each file is materialized, see app.fileops, the
+            files of archive templates are always copied
+
+    Returns:
+        list: a dict per destination indicating whether its clone threw
+            an error
+
+    """
+
+    destinations = Destinations(dests)
+    for dest in dests:
+        try:
+            os.makedirs(dest)
+        except OSError:
+            destinations.fail(dest)
+
+    try:
+        template_format = get_template_format(src)
+        if template_format == 'archive':
+            fan_out_archive(src, destinations)
+        else:
+            if template_format == 'store':
+                template_folder = get_template_folder(src)
+                entries = [(entry, get_blob_path(template_folder,
+                                                 entry['hash'])
+                            if entry['type'] == 'file' else None)
+                           for entry in read_manifest(src)['entries']]
+            else:
+                entries = list_entries(src, 'directory')
+            fan_out_entries(entries, destinations, jobs, mode)
+
+    except (OSError, ValueError, tarfile.TarError):
+        for dest in dests:
+            destinations.fail(dest)
+
+    return [{'is_successful': dest not in destinations.failed}
+            for dest in dests]
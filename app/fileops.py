@@ -0,0 +1,344 @@
+"""This module contains the functions that materialize a single file.
+
+Besides a regular copy a file can be hardlinked, reflinked (a copy-on-write
+clone of its blocks) or symlinked to its source. Whenever the fast path is
+not supported for a file, for example because the source and destination
+are on different filesystems, the file is copied instead.
+
+- copy: copies the file's contents
+- hardlink: links the destination to the source's inode, changes to one
+    are visible in the other so it is meant for read-only use
+- reflink: shares the source's blocks until either file is written
+- symlink: points the destination at the source, meant for read-only use
+- auto: reflinks when the filesystem supports it and copies otherwise,
+    a source and destination device pair that doesn't support reflinks is
+    not asked again
+
+Files of at least LARGE_FILE_THRESHOLD bytes are copied by
+copy_large_file instead of shutil.copyfile: the destination is
+preallocated, the data is copied inside the kernel in large chunks, the
+holes of sparse files are kept and the bytes copied are reported to the
+progress indicator (see app.progress). Each kernel copy falls back to the
+next one, and finally to reading and writing the data, on filesystems
+that don't support it.
+
+copy_verified copies a file through userspace and hashes its contents on
+the way, so a clone can check every file against the hash recorded when
+the template was created without reading it a second time.
+
+Attributes:
+    COPY_MODES (tuple): the supported modes
+    LINK_MODES (tuple): the modes whose destination shares the source's
+        inode, so the destination's metadata must not be changed
+    FICLONE (int): the Linux ioctl request that reflinks a file
+    LARGE_FILE_THRESHOLD (int): the size in bytes from which files are
+        copied by copy_large_file
+    LARGE_CHUNK_SIZE (int): the number of bytes a kernel copy is asked to
+        copy at a time
+    BUFFER_SIZE (int): the number of bytes read at a time when the data
+        is copied through userspace
+    UNSUPPORTED_ERRORS (set): the errnos of a kernel copy that the file's
+        filesystems don't support
+    DENIED_ERRORS (set): the errnos of a copy_file_range that a seccomp
+        filter denied, which some container runtimes do
+
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+from app.progress import start_copy, add_progress
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+COPY_MODES = ('copy', 'hardlink', 'reflink', 'symlink', 'auto')
+LINK_MODES = ('hardlink', 'symlink')
+FICLONE = 0x40049409
+LARGE_FILE_THRESHOLD = 64 * 1024 * 1024
+LARGE_CHUNK_SIZE = 64 * 1024 * 1024
+BUFFER_SIZE = 1024 * 1024
+UNSUPPORTED_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                      errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+DENIED_ERRORS = {errno.EPERM}
+
+_NO_REFLINK_DEVICES = set()
+
+
+class ChecksumError(ValueError):
+    """Raised when the contents of a file don't match their recorded hash
+
+    Attributes:
+        path (str): the path of the file inside its template
+
+    """
+
+    def __init__(self, path):
+        super().__init__(f'{path} does not match its recorded hash.')
+        self.path = path
+
+
+def reflink_file(src, dest):
+    """Reflinks src to dest with the FICLONE ioctl
+
+    Raises:
+        OSError: when the platform or the filesystem does not support it
+
+    """
+
+    if fcntl is None:
+        raise OSError('Reflinks are not supported on this platform.')
+
+    with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+
+def copy_file_range(src, dest):
+    """Copies src to dest inside the kernel with os.copy_file_range
+
+    Filesystems that support it may share blocks instead of copying them.
+
+    Raises:
+        OSError: when the platform or the filesystem does not support it
+
+    """
+
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError('copy_file_range is not supported on this platform.')
+
+    with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+        remaining = os.fstat(src_file.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(
+                src_file.fileno(), dest_file.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+def is_large_file(path):
+    """Returns whether the file at path is copied by copy_large_file"""
+    try:
+        return os.stat(path).st_size >= LARGE_FILE_THRESHOLD
+    except OSError:
+        return False
+
+def find_data_extents(fd, size):
+    """Yields the (offset, length) of the data regions of a file
+
+    The holes of a sparse file are found with SEEK_DATA and SEEK_HOLE, a
+    file that isn't sparse or whose filesystem can't find its holes is a
+    single data region.
+
+    """
+
+    if not hasattr(os, 'SEEK_DATA') or \
+            os.fstat(fd).st_blocks * 512 >= size:
+        yield 0, size
+        return
+
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+            end = os.lseek(fd, start, os.SEEK_HOLE)
+        except OSError as error:
+            if error.errno == errno.ENXIO:
+                return
+            if offset == 0:
+                yield 0, size
+                return
+            raise
+        yield start, min(end, size) - start
+        offset = end
+
+def preallocate(fd, size):
+    """Reserves size bytes for a file so it is written contiguously
+
+    Filesystems that can't preallocate are left to allocate the file as
+    it is written.
+
+    """
+
+    if hasattr(os, 'posix_fallocate') and size:
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass
+
+def copy_range(src_fd, dest_fd, offset, count, methods):
+    """Copies count bytes at offset from src_fd to dest_fd
+
+    The first of methods is used, a method the filesystems don't support
+    is removed from methods and the next one is tried. A kernel copy that
+    copies nothing is not trusted to have reached the end of src, the
+    next method is tried too. EPERM only means unsupported for
+    copy_file_range, which seccomp filters deny with it, a real permission
+    error is raised again by sendfile.
+
+    Parameters:
+        methods (list): the names of the remaining copy methods,
+            `copy_file_range`, `sendfile` and `read`
+
+    Returns:
+        int: the number of bytes copied, 0 at the end of src
+
+    """
+
+    while methods[0] != 'read':
+        try:
+            if methods[0] == 'copy_file_range':
+                copied = os.copy_file_range(src_fd, dest_fd, count,
+                                            offset, offset)
+            else:
+                os.lseek(dest_fd, offset, os.SEEK_SET)
+                copied = os.sendfile(dest_fd, src_fd, offset, count)
+        except OSError as error:
+            if error.errno not in UNSUPPORTED_ERRORS and not (
+                    methods[0] == 'copy_file_range'
+                    and error.errno in DENIED_ERRORS):
+                raise
+            copied = 0
+        if copied:
+            return copied
+        methods.pop(0)
+
+    data = os.pread(src_fd, min(count, BUFFER_SIZE), offset)
+    written = 0
+    while written < len(data):
+        written += os.pwrite(dest_fd, data[written:], offset + written)
+    return len(data)
+
+def copy_large_file(src, dest, chunk_size=LARGE_CHUNK_SIZE):
+    """Copies a large file from src to dest without reading it in Python
+
+    The data is copied inside the kernel with os.copy_file_range, or with
+    os.sendfile where it isn't supported, chunk_size bytes at a time, and
+    through userspace when neither works. A dense file is preallocated,
+    only the data regions of a sparse file are copied so its holes stay
+    holes. The bytes copied are reported to app.progress.
+
+    Parameters:
+        src (str): the file to copy
+        dest (str): the file to create or overwrite
+        chunk_size (int): the number of bytes a kernel copy is asked to
+            copy at a time
+
+    """
+
+    methods = [method for method in ('copy_file_range', 'sendfile')
+               if hasattr(os, method)] + ['read']
+
+    with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+        src_fd, dest_fd = src_file.fileno(), dest_file.fileno()
+        size = os.fstat(src_fd).st_size
+        extents = list(find_data_extents(src_fd, size))
+        if sum(length for _, length in extents) == size:
+            preallocate(dest_fd, size)
+
+        start_copy(size)
+        for offset, length in extents:
+            end = offset + length
+            while offset < end:
+                copied = copy_range(src_fd, dest_fd, offset,
+                                    min(chunk_size, end - offset), methods)
+                if copied == 0:
+                    break
+                offset += copied
+                add_progress(copied)
+        add_progress(size - sum(length for _, length in extents))
+        os.ftruncate(dest_fd, size)
+
+def copy_contents(src, dest):
+    """Copies the contents of src to dest, large files with copy_large_file"""
+    if is_large_file(src):
+        copy_large_file(src, dest)
+    else:
+        shutil.copyfile(src, dest)
+
+def copy_hashed(src, dest):
+    """Copies a file object into another and returns the contents' hash
+
+    Returns:
+        str: the sha256 hex digest of the contents copied
+
+    """
+
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: src.read(BUFFER_SIZE), b''):
+        digest.update(chunk)
+        dest.write(chunk)
+    return digest.hexdigest()
+
+def copy_verified(src, dest, digest, name=None):
+    """Copies src to dest and checks that the contents hash to digest
+
+    Raises:
+        ChecksumError: when the contents don't match digest, dest is
+            written anyway
+        OSError: when the file can't be copied
+
+    """
+
+    with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+        copied = copy_hashed(src_file, dest_file)
+    if copied != digest:
+        raise ChecksumError(name or src)
+
+def materialize_file(src, dest, mode='copy'):
+    """Creates dest from src with the supplied mode
+
+    Falls back to a regular copy when the mode's fast path fails.
+
+    Parameters:
+        src (str): the file to materialize
+        dest (str): the path to create
+        mode (str): one of COPY_MODES
+
+    Returns:
+        str: the mode that was used
+
+    """
+
+    if mode not in COPY_MODES:
+        raise ValueError(f'{mode} is not a valid copy mode.')
+
+    try:
+        if mode == 'hardlink':
+            os.link(src, dest)
+            return mode
+
+        if mode == 'symlink':
+            os.symlink(os.path.abspath(src), dest)
+            return mode
+
+        if mode == 'reflink':
+            try:
+                reflink_file(src, dest)
+                return mode
+            except OSError:
+                if is_large_file(src):
+                    copy_large_file(src, dest)
+                else:
+                    copy_file_range(src, dest)
+                return 'copy'
+
+        if mode == 'auto':
+            devices = (os.stat(src).st_dev, os.stat(
+                os.path.dirname(os.path.abspath(dest))).st_dev)
+            if devices not in _NO_REFLINK_DEVICES:
+                try:
+                    reflink_file(src, dest)
+                    return 'reflink'
+                except OSError as error:
+                    if error.errno is None or error.errno in \
+                            UNSUPPORTED_ERRORS - {errno.EXDEV}:
+                        _NO_REFLINK_DEVICES.add(devices)
+
+    except OSError:
+        pass
+
+    copy_contents(src, dest)
+    return 'copy'
@@ -0,0 +1,136 @@
+"""This module contains the ignore rules of template sources.
+
+A `.scaffoldignore` file at the root of a source directory lists the paths
+that are left out of templates created from it, with the syntax of a
+`.gitignore` file:
+
+- blank lines and lines starting with # are skipped
+- `*` matches anything but a slash, `?` a single character and `**`
+    any number of directories
+- a pattern ending with a slash only matches directories
+- a pattern holding a slash elsewhere is relative to the source's root,
+    otherwise it matches at any depth
+- a pattern starting with ! includes the paths an earlier pattern
+    ignored, the last matching pattern wins
+
+The rules are applied while the source is walked (see
+app.utils.scan_tree), so ignored directories are never descended into
+and a path inside an ignored directory can't be included again.
+
+- IgnoreRules: Decides whether a path of a source is ignored
+- load_ignore_rules: Returns the ignore rules of a source
+
+Attributes:
+    IGNORE_FILE (str): the name of the ignore file of a source
+
+"""
+
+import os
+import re
+
+
+IGNORE_FILE = '.scaffoldignore'
+
+
+def translate(pattern):
+    """Returns the regular expression of a gitignore-style glob"""
+    parts = []
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith('**/', index):
+            parts.append('(?:.*/)?')
+            index += 3
+        elif pattern.startswith('**', index):
+            parts.append('.*')
+            index += 2
+        elif pattern[index] == '*':
+            parts.append('[^/]*')
+            index += 1
+        elif pattern[index] == '?':
+            parts.append('[^/]')
+            index += 1
+        elif pattern[index] == '[' and ']' in pattern[index + 2:]:
+            end = pattern.index(']', index + 2)
+            characters = pattern[index + 1:end]
+            if characters.startswith('!'):
+                characters = '^' + characters[1:]
+            parts.append(f'[{characters}]')
+            index = end + 1
+        else:
+            parts.append(re.escape(pattern[index]))
+            index += 1
+    return ''.join(parts)
+
+class IgnoreRules():
+    """Decides whether a path of a source is ignored
+
+    Arguments:
+        patterns (iterable): the lines of an ignore file or the patterns of
+            --exclude options, in order
+
+    """
+
+    def __init__(self, patterns):
+        self.rules = []
+        for pattern in patterns:
+            pattern = pattern.rstrip('\n')
+            if not pattern.strip() or pattern.startswith('#'):
+                continue
+            pattern = pattern.rstrip(' ')
+
+            negate = pattern.startswith('!')
+            if negate or pattern.startswith('\\'):
+                pattern = pattern[1:]
+            directory_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if not pattern:
+                continue
+
+            regex = translate(pattern.lstrip('/'))
+            if '/' not in pattern:
+                regex = f'(?:.*/)?{regex}'
+            self.rules.append((re.compile(f'{regex}\\Z', re.DOTALL),
+                               negate, directory_only))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def is_ignored(self, relative_path, is_dir=False):
+        """Returns whether a path relative to the source's root is ignored
+
+        The parent directories of the path are not checked, the walk never
+        reaches the contents of an ignored directory.
+
+        """
+
+        path = relative_path.replace(os.sep, '/')
+        ignored = False
+        for regex, negate, directory_only in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if ignored == negate and regex.match(path):
+                ignored = not negate
+        return ignored
+
+def load_ignore_rules(src, excludes=()):
+    """Returns the ignore rules of the source directory at src
+
+    Parameters:
+        src (str): the source directory
+        excludes (iterable): patterns added after the ones of the source's
+            ignore file
+
+    Returns:
+        IgnoreRules: the rules, or None when nothing is ignored
+
+    """
+
+    patterns = []
+    ignore_path = os.path.join(src, IGNORE_FILE)
+    if os.path.isfile(ignore_path):
+        with open(ignore_path) as file_:
+            patterns.extend(file_)
+    patterns.extend(excludes or ())
+
+    rules = IgnoreRules(patterns)
+    return rules if rules else None
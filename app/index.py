@@ -0,0 +1,299 @@
+"""This module contains the persistent template index.
+
+The index is kept in the template store as two text files with one line
+per template, sorted by name: the names file lists the templates' names and
+the details file holds the rest of each template's row as tab separated
+fields, i.e. its storage format, type, size in bytes, file count, creation
+time and the mtime of the template's entry in the template folder. Listing
+names only needs the small names file. The index records the template
+folder's mtime when it is written: while the folder's mtime is unchanged
+templates are listed from the index alone, otherwise the rows of added,
+removed or replaced templates are rebuilt before the index is used.
+
+Listing templates from a current index is the most frequent operation of
+the app, so the storage modules this module needs to describe templates
+are only imported when a row is rebuilt.
+
+Attributes:
+    STORE_FOLDER (str): the hidden folder in the template folder holding
+        the template store and the index
+    INDEX_FILE (str): the name of the index inside the store folder
+    DETAILS_SUFFIX (str): the suffix of the index's details file
+    INDEX_HEADER (str): identifies a file as a template index
+    INDEX_FIELDS (tuple): the fields of an index row
+    SORT_FIELDS (tuple): the fields the templates can be sorted by
+
+"""
+
+import bisect
+import os
+from app.timings import phase
+
+
+STORE_FOLDER = '.store'
+INDEX_FILE = 'index'
+DETAILS_SUFFIX = '-details'
+INDEX_HEADER = 'ace-scaffold-index'
+INDEX_FIELDS = ('name', 'format', 'type', 'size', 'files', 'created', 'mtime')
+SORT_FIELDS = ('name', 'size', 'files', 'created')
+
+
+def get_index_path(template_folder):
+    """Returns the path of the template folder's index"""
+    return os.path.join(template_folder, STORE_FOLDER, INDEX_FILE)
+
+def describe_template(template_path, template_stat):
+    """Returns the index row of a template
+
+    Parameters:
+        template_path (str): the path of the template
+        template_stat (os.stat_result): the stat of the template's path
+
+    Returns:
+        list: the row's fields as strings, in the order of INDEX_FIELDS
+
+    """
+
+    from app.archive import read_members
+    from app.manifest import read_manifest
+    from app.utils import get_template_format, scan_tree
+
+    template_format = get_template_format(template_path)
+    name = os.path.basename(template_path)
+
+    if template_format != 'directory':
+        manifest = read_manifest(template_path) \
+            if template_format == 'store' else read_members(template_path)
+        files = [entry for entry in manifest['entries']
+                 if entry['type'] == 'file']
+        template_type = manifest['type']
+        size = sum(entry['size'] for entry in files)
+        created = manifest['created']
+    else:
+        files = [entry.stat(follow_symlinks=False).st_size
+                 for _, entry in scan_tree(template_path)
+                 if entry.is_file(follow_symlinks=False)]
+        template_type = 'directory'
+        size = sum(files)
+        created = template_stat.st_mtime
+
+    return [name, template_format, template_type, str(size), str(len(files)),
+            str(created), str(template_stat.st_mtime_ns)]
+
+def read_index_file(path):
+    """Reads one of the index files
+
+    Returns:
+        tuple: the template folder mtime the file was written at and its
+            lines, or None and an empty list if the file is not valid
+
+    """
+
+    try:
+        with open(path) as file_:
+            lines = file_.read().split('\n')
+    except OSError:
+        return None, []
+
+    header = lines[0].split('\t')
+    if header[0] != INDEX_HEADER or len(header) != 2:
+        return None, []
+    return int(header[1]), lines[1:-1]
+
+def read_index(template_folder, details=False):
+    """Reads the index
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        details (bool): if truthy read the full rows instead of the names
+
+    Returns:
+        tuple: the template folder mtime the index was written at and the
+            names or rows, or None and an empty list if there is no valid
+            index
+
+    """
+
+    index_path = get_index_path(template_folder)
+    index_mtime, names = read_index_file(index_path)
+    if not details or index_mtime is None:
+        return index_mtime, names
+
+    details_mtime, lines = read_index_file(f'{index_path}{DETAILS_SUFFIX}')
+    if details_mtime != index_mtime or len(lines) != len(names):
+        return None, []
+    return index_mtime, [[name] + line.split('\t')
+                         for name, line in zip(names, lines)]
+
+def write_index(template_folder, folder_mtime, rows):
+    """Atomically writes the index files
+
+    The details are written first, so the names file never describes more
+    templates than the details file.
+
+    """
+
+    import uuid
+
+    index_path = get_index_path(template_folder)
+    header = f'{INDEX_HEADER}\t{folder_mtime}\n'
+
+    for path, lines in ((f'{index_path}{DETAILS_SUFFIX}',
+                         ('\t'.join(row[1:]) for row in rows)),
+                        (index_path, (row[0] for row in rows))):
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'w') as file_:
+            file_.write(header)
+            file_.writelines(f'{line}\n' for line in lines)
+        os.replace(temp_path, path)
+
+def reconcile_index(template_folder, rows):
+    """Returns the rows brought in line with the template folder's contents
+
+    Rows of removed templates are dropped and the rows of added templates,
+    or of templates whose entry has a new mtime, are rebuilt.
+
+    """
+
+    import tarfile
+
+    known = {row[0]: row for row in rows}
+    reconciled = []
+
+    with os.scandir(template_folder) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            template_stat = entry.stat(follow_symlinks=False)
+            row = known.get(entry.name)
+            if row is None or row[6] != str(template_stat.st_mtime_ns):
+                try:
+                    row = describe_template(entry.path, template_stat)
+                except (OSError, ValueError, tarfile.TarError):
+                    continue
+            reconciled.append(row)
+
+    reconciled.sort(key=lambda row: row[0])
+    return reconciled
+
+def load_index(template_folder, refresh=False, details=False):
+    """Returns the templates of the template folder, sorted by name
+
+    The index is rebuilt and saved when the template folder has changed
+    since it was written, or when refresh is truthy.
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        refresh (bool): if truthy reconcile the index even if it is current
+        details (bool): if truthy return the full rows instead of the names
+
+    Returns:
+        list: the names, or the rows with their fields in the order of
+            INDEX_FIELDS
+
+    """
+
+    folder_mtime = os.stat(template_folder).st_mtime_ns
+    store_folder = os.path.join(template_folder, STORE_FOLDER)
+    if not os.path.isdir(store_folder):
+        try:
+            os.mkdir(store_folder)
+            folder_mtime = os.stat(template_folder).st_mtime_ns
+        except OSError:
+            pass
+
+    index_mtime, rows = read_index(template_folder, details)
+    if not refresh and index_mtime == folder_mtime:
+        return rows
+
+    if not details:
+        index_mtime, rows = read_index(template_folder, details=True)
+    rows = reconcile_index(template_folder, rows)
+    try:
+        write_index(template_folder, folder_mtime, rows)
+    except OSError:
+        pass
+
+    return rows if details else [row[0] for row in rows]
+
+def update_index(template_folder):
+    """Updates the index after a template was created or deleted
+
+    Returns:
+        dict: indicates whether the update operation threw an error
+
+    """
+
+    try:
+        with phase('update_index'):
+            load_index(template_folder, refresh=True)
+        return {'is_successful': True}
+
+    except OSError:
+        return {'is_successful': False}
+
+def query_index(template_folder, search_term='', prefix='', sort_by='name',
+                reverse=False, details=False):
+    """Returns the templates that match the filters
+
+    Only the names file is read unless details are requested or the
+    templates are sorted by another field than their name.
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        search_term (str): filters the templates if the term is present
+        prefix (str): filters the templates that start with the prefix
+        sort_by (str): one of SORT_FIELDS
+        reverse (bool): if truthy sort in descending order
+        details (bool): if truthy return the full rows instead of the names
+
+    Returns:
+        list: the matching names or rows
+
+    """
+
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f'{sort_by} is not a valid sort field.')
+
+    read_rows = details or sort_by != 'name'
+    rows = load_index(template_folder, details=read_rows)
+    return filter_rows(rows, search_term, prefix, sort_by, reverse, details)
+
+def filter_rows(rows, search_term='', prefix='', sort_by='name',
+                reverse=False, details=False):
+    """Returns the index rows that match the filters, see query_index
+
+    Parameters:
+        rows (list): the names or the full rows of the index, sorted by name
+
+    """
+
+    names = rows if not rows or isinstance(rows[0], str) \
+        else [row[0] for row in rows]
+
+    if prefix:
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + '\U0010ffff', start)
+        rows, names = rows[start:end], names[start:end]
+
+    if search_term:
+        rows = [row for row, name in zip(rows, names) if search_term in name]
+
+    if sort_by != 'name':
+        field = INDEX_FIELDS.index(sort_by)
+        rows = sorted(rows, key=lambda row: float(row[field]),
+                      reverse=reverse)
+    elif reverse:
+        rows = rows[::-1]
+
+    if not details and rows and not isinstance(rows[0], str):
+        rows = [row[0] for row in rows]
+    return rows
+
+def row_to_dict(row):
+    """Returns an index row as a dict with typed values"""
+    details = dict(zip(INDEX_FIELDS, row))
+    details.update(size=int(details['size']), files=int(details['files']),
+                   created=float(details['created']),
+                   mtime=int(details['mtime']))
+    return details
@@ -0,0 +1,200 @@
+"""This module contains the checkpoint journal of clone and create.
+
+While a template is cloned or created, every completed file is appended to
+a small journal saved next to the destination. When the operation is
+interrupted the journal survives, and a resumed operation skips the files
+the journal shows as completed. The journal is removed once the operation
+succeeds.
+
+An operation can also be cancelled from another thread (see cancellable):
+the journal checks for the cancellation every time it records a file and
+raises OperationCancelled, leaving the journal of the completed files
+behind so that the operation can be resumed.
+
+Attributes:
+    JOURNAL_SUFFIX (str): the suffix of a journal's file name
+    JOURNAL_HEADER (str): identifies a file as a journal
+    FLUSH_INTERVAL (int): the number of records buffered between writes,
+        at most that many completed files are copied again after a crash
+
+"""
+
+import contextlib
+import json
+import os
+import threading
+
+
+JOURNAL_SUFFIX = '.scaffold-journal'
+JOURNAL_HEADER = 'ace-scaffold-journal'
+FLUSH_INTERVAL = 256
+
+_cancel_events = {}
+_cancel_lock = threading.Lock()
+
+
+class OperationCancelled(Exception):
+    """Raised in an operation whose destination was cancelled"""
+
+def get_journal_path(dest):
+    """Returns the path of the journal of dest, a hidden sibling of dest"""
+    folder, name = os.path.split(os.path.normpath(dest))
+    return os.path.join(folder, f'.{name}{JOURNAL_SUFFIX}')
+
+class Journal():
+    """The checkpoint journal of a clone or create operation
+
+    Attributes:
+        completed (dict): the data recorded for every completed path
+
+    Arguments:
+        dest (str): the path that is being cloned or created
+        identity (str): identifies the source, a journal written for
+            another source is never resumed
+        resume (bool): if truthy load the completed paths of an existing
+            journal, otherwise start a new one
+
+    """
+
+    def __init__(self, dest, identity, resume=False):
+        self.path = get_journal_path(dest)
+        self.identity = identity
+        self.cancel_event = _cancel_events.get(os.path.abspath(self.path))
+        self.completed = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+
+        if resume:
+            self.completed = self.load()
+
+        self.file = open(self.path, 'w')
+        self.file.write(json.dumps([JOURNAL_HEADER, identity]) + '\n')
+        for path, data in self.completed.items():
+            self.file.write(json.dumps([path, data]) + '\n')
+        self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def load(self):
+        """Returns the completed paths of the existing journal
+
+        Lines that were only partly written when the operation stopped are
+        ignored.
+
+        """
+
+        completed = {}
+        try:
+            with open(self.path) as file_:
+                lines = file_.read().split('\n')
+        except OSError:
+            return completed
+
+        try:
+            if json.loads(lines[0]) != [JOURNAL_HEADER, self.identity]:
+                return completed
+        except ValueError:
+            return completed
+
+        for line in lines[1:]:
+            try:
+                path, data = json.loads(line)
+            except ValueError:
+                continue
+            completed[path] = data
+        return completed
+
+    def record(self, path, data):
+        """Records that path was completed
+
+        Raises:
+            OperationCancelled: when the operation was cancelled
+
+        """
+
+        with self.lock:
+            self.completed[path] = data
+            self.file.write(json.dumps([path, data]) + '\n')
+            self.pending += 1
+            if self.pending >= FLUSH_INTERVAL:
+                self.file.flush()
+                self.pending = 0
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        """Raises OperationCancelled when the operation was cancelled"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise OperationCancelled(self.path)
+
+    def record_file(self, relative_path, path):
+        """Records that the file at path was written with its size and mtime"""
+        path_stat = os.lstat(path)
+        self.record(relative_path, dict(size=path_stat.st_size,
+                                        mtime=path_stat.st_mtime_ns))
+
+    def is_complete(self, relative_path, path):
+        """Returns whether the file at path was completed and is unchanged
+
+        A file is verified when its size and mtime still match the ones
+        recorded after it was written.
+
+        """
+
+        data = self.completed.get(relative_path)
+        if data is None:
+            return False
+        try:
+            path_stat = os.lstat(path)
+        except OSError:
+            return False
+        return (path_stat.st_size, path_stat.st_mtime_ns) == \
+            (data['size'], data['mtime'])
+
+    def close(self):
+        """Writes the buffered records, the journal is kept"""
+        if not self.file.closed:
+            self.file.close()
+
+    def finish(self):
+        """Closes and removes the journal once the operation succeeded"""
+        self.close()
+        os.remove(self.path)
+
+def prepare_path(path, resume):
+    """Removes a partly written file or symlink before it is written again
+
+    Parameters:
+        path (str): the path that is about to be written
+        resume (bool): paths are only removed when an operation is resumed
+
+    """
+
+    if resume and (os.path.islink(path) or os.path.isfile(path)):
+        os.remove(path)
+
+@contextlib.contextmanager
+def cancellable(dest):
+    """Makes the operation writing to dest cancellable
+
+    The journals opened for dest while the context is active stop the
+    operation once the yielded event is set.
+
+    Yields:
+        threading.Event: set it to cancel the operation
+
+    """
+
+    key = os.path.abspath(get_journal_path(dest))
+    event = threading.Event()
+    with _cancel_lock:
+        _cancel_events[key] = event
+    try:
+        yield event
+    finally:
+        with _cancel_lock:
+            if _cancel_events.get(key) is event:
+                del _cancel_events[key]
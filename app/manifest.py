@@ -0,0 +1,165 @@
+"""This module contains the template manifests.
+
+A manifest describes a template's tree: for every entry its path, type and
+mode, plus the size and modification time of files or the target of
+symlinks. The template store adds the hash of every file's blob.
+
+Long-running processes can keep the manifests they read in memory with
+enable_manifest_cache. A cached manifest is used as long as the stat of
+its file is unchanged, manifests are always replaced by a new file so a
+changed template is never read from the cache. Cached manifests are
+shared and must not be modified.
+
+Attributes:
+    MANIFEST_FORMAT (str): identifies a file as a template manifest
+
+"""
+
+import collections
+import json
+import os
+import stat
+import threading
+import uuid
+from app.utils import scan_tree
+
+
+MANIFEST_FORMAT = 'ace-scaffold-manifest'
+
+_manifest_cache = None
+_manifest_cache_size = 0
+_manifest_cache_lock = threading.Lock()
+
+
+def build_entry(relative_path, path, entry_stat):
+    """Returns the manifest entry for a path
+
+    Parameters:
+        relative_path (str): the path of the entry inside the template
+        path (str): the path of the entry on disk
+        entry_stat (os.stat_result): the lstat of the entry
+
+    Returns:
+        dict: the entry's path, type and mode plus the size and modification
+            time for files or the target for symlinks. None is returned for
+            special files, which are not stored.
+
+    """
+
+    entry = dict(path=relative_path, mode=stat.S_IMODE(entry_stat.st_mode))
+
+    if stat.S_ISLNK(entry_stat.st_mode):
+        entry.update(type='symlink', target=os.readlink(path))
+    elif stat.S_ISDIR(entry_stat.st_mode):
+        entry.update(type='directory')
+    elif stat.S_ISREG(entry_stat.st_mode):
+        entry.update(type='file', size=entry_stat.st_size,
+                     mtime=entry_stat.st_mtime_ns)
+    else:
+        return None
+
+    return entry
+
+def list_entries(src, template_type, ignore=None):
+    """Returns the manifest entries of the tree at src
+
+    Parameters:
+        src (str): the file or directory to list
+        template_type (str): `file` or `directory`
+        ignore (app.ignore.IgnoreRules): the rules of the entries left out
+            of a directory, see app.utils.scan_tree
+
+    Returns:
+        list: the entry and its path on disk for every entry
+
+    """
+
+    if template_type == 'file':
+        paths = [(os.path.basename(src), src, os.lstat(src))]
+    else:
+        paths = ((relative_path, entry.path, entry.stat(follow_symlinks=False))
+                 for relative_path, entry in scan_tree(src, ignore))
+
+    entries = []
+    for relative_path, path, entry_stat in paths:
+        entry = build_entry(relative_path, path, entry_stat)
+        if entry is not None:
+            entries.append((entry, path))
+    return entries
+
+def write_manifest(manifest, dest):
+    """Atomically writes a manifest to dest
+
+    The manifest is written to a hidden temporary file first so a partly
+    written manifest is never listed as a template.
+
+    """
+
+    folder, name = os.path.split(dest)
+    temp_path = os.path.join(folder, f'.{name}.{uuid.uuid4().hex}.tmp')
+    with open(temp_path, 'w') as file_:
+        json.dump(manifest, file_)
+    os.replace(temp_path, dest)
+
+def enable_manifest_cache(size=256):
+    """Keeps the last size manifests read by read_manifest in memory
+
+    A size of 0 disables the cache.
+
+    """
+
+    global _manifest_cache, _manifest_cache_size
+    with _manifest_cache_lock:
+        _manifest_cache = collections.OrderedDict() if size else None
+        _manifest_cache_size = size
+
+def read_manifest(template_path):
+    """Returns the manifest saved at template_path"""
+    if _manifest_cache is not None:
+        template_stat = os.stat(template_path)
+        key = (os.path.abspath(template_path), template_stat.st_ino,
+               template_stat.st_mtime_ns, template_stat.st_size)
+        with _manifest_cache_lock:
+            if key in _manifest_cache:
+                _manifest_cache.move_to_end(key)
+                return _manifest_cache[key]
+
+    with open(template_path) as file_:
+        manifest = json.load(file_)
+
+    if manifest.get('format') != MANIFEST_FORMAT:
+        raise ValueError(f'{template_path} is not a template manifest.')
+
+    if _manifest_cache is not None:
+        with _manifest_cache_lock:
+            _manifest_cache[key] = manifest
+            while len(_manifest_cache) > _manifest_cache_size:
+                _manifest_cache.popitem(last=False)
+    return manifest
+
+def compare_manifests(previous, manifest):
+    """Counts the entries added, changed and removed between two manifests
+
+    An entry has changed when its type, mode, contents or symlink target
+    differ, a new modification time alone is not a change. Entries without
+    a hash, like the ones of archive templates, are compared by their size
+    and modification time instead of their contents.
+
+    Returns:
+        dict: the added, changed and removed counts
+
+    """
+
+    def signature(entry):
+        contents = entry.get('hash') or (entry.get('size'),
+                                         entry.get('mtime'))
+        return (entry['type'], entry['mode'], contents, entry.get('target'))
+
+    old = {entry['path']: signature(entry)
+           for entry in (previous or {}).get('entries', [])}
+    new = {entry['path']: signature(entry) for entry in manifest['entries']}
+
+    return dict(added=len(new.keys() - old.keys()),
+                changed=sum(1 for path in new.keys() & old.keys()
+                            if new[path] != old[path]),
+                removed=len(old.keys() - new.keys()))
@@ -44,7 +44,14 @@ class ErrorMessage(Message):
     error_message_types = ['template_exists', 'template_missing',
                            'directory_exists', 'directory_missing',
                            'delete_template', 'clone_template',
-                           'create_template']
+                           'create_template', 'variables_unsupported',
+                           'reclaim_space', 'subpath_missing',
+                           'search_templates', 'version_missing',
+                           'rollback_template', 'fetch_template',
+                           'verify_templates', 'template_corrupted',
+                           'verify_unsupported', 'diff_template',
+                           'search_text_invalid', 'daemon_request',
+                           'bulk_entry_invalid']
 
     def __init__(self, error_type, *args, **kwargs):
 
@@ -72,11 +79,81 @@ class ErrorMessage(Message):
         if error_type == 'clone_template' and kwargs['template_name']:
             self.message = 'An error occured while cloning template ' \
                            f'`{kwargs["template_name"]}`.'
+            if kwargs.get('path'):
+                self.message = 'An error occured while cloning template ' \
+                               f'`{kwargs["template_name"]}` to ' \
+                               f'`{kwargs["path"]}`.'
 
         if error_type == 'create_template' and kwargs['template_name']:
             self.message = 'An error occured while creating template ' \
                            f'`{kwargs["template_name"]}`.'
 
+        if error_type == 'reclaim_space':
+            self.message = 'An error occured while reclaiming space.'
+
+        if error_type == 'version_missing' and kwargs['template_name']:
+            self.message = f'Template `{kwargs["template_name"]}` has no ' \
+                           'earlier version.'
+            if kwargs.get('version') is not None:
+                self.message = f'Template `{kwargs["template_name"]}` has ' \
+                               f'no version v{kwargs["version"]}.'
+
+        if error_type == 'rollback_template' and kwargs['template_name']:
+            self.message = 'An error occured while rolling back template ' \
+                           f'`{kwargs["template_name"]}`.'
+
+        if error_type == 'fetch_template' and kwargs['template_name']:
+            self.message = 'An error occured while fetching template ' \
+                           f'`{kwargs["template_name"]}` from its registry.'
+
+        if error_type == 'verify_templates':
+            self.message = 'An error occured while verifying the templates.'
+
+        if error_type == 'template_corrupted' and kwargs['template_name']:
+            if kwargs.get('path'):
+                self.message = f'Template `{kwargs["template_name"]}` is ' \
+                               f'corrupted: `{kwargs["path"]}` does not ' \
+                               'match its hash.'
+            else:
+                self.message = f'Template `{kwargs["template_name"]}` is ' \
+                               f'corrupted: {kwargs["missing"]} missing ' \
+                               f'and {kwargs["changed"]} changed files.'
+
+        if error_type == 'verify_unsupported' and kwargs['template_name']:
+            self.message = f'Template `{kwargs["template_name"]}` is a ' \
+                           'directory template, which records no hashes ' \
+                           'to verify.'
+
+        if error_type == 'diff_template' and kwargs['template_name']:
+            self.message = 'An error occured while comparing template ' \
+                           f'`{kwargs["template_name"]}`.'
+
+        if error_type == 'search_templates':
+            self.message = 'An error occured while searching the templates.'
+
+        if error_type == 'bulk_entry_invalid':
+            self.message = f'Entry {kwargs["entry"]} needs a name and a ' \
+                           'path.'
+
+        if error_type == 'daemon_request':
+            self.message = 'The daemon failed to run ' \
+                           f'`{kwargs["operation"]}`: {kwargs["reason"]}. ' \
+                           'It may have partly run, check the result ' \
+                           'before running it again.'
+
+        if error_type == 'search_text_invalid':
+            self.message = f'Can\'t search for `{kwargs["text"]}`, the ' \
+                           'text must hold a word of two letters or more.'
+
+        if error_type == 'variables_unsupported' and kwargs['template_name']:
+            self.message = f'Template `{kwargs["template_name"]}` is not a ' \
+                           'stored template, variables can only be ' \
+                           'replaced in stored templates.'
+
+        if error_type == 'subpath_missing' and kwargs['template_name']:
+            self.message = f'Template `{kwargs["template_name"]}` has no ' \
+                           f'directory `{kwargs["subpath"]}`.'
+
         super(ErrorMessage, self).__init__(
             'error', self.message, *args, **kwargs)
 
@@ -92,7 +169,13 @@ class InfoMessage(Message):
 
     """
 
-    info_message_types = ['template_created', 'template_cloned', 'template_deleted']
+    info_message_types = ['template_created', 'template_cloned',
+                          'template_deleted', 'template_updated',
+                          'templates_created', 'daemon_started',
+                          'template_preview', 'space_reclaimed',
+                          'template_rolled_back', 'registry_started',
+                          'template_verified', 'template_unverified',
+                          'template_diff']
 
     def __init__(self, messsage_type, *args, **kwargs):
 
@@ -112,5 +195,52 @@ class InfoMessage(Message):
             self.message = f'Template `{kwargs["template_name"]}` has been ' \
                             'deleted.'
 
+        if messsage_type == 'template_updated' and kwargs['template_name']:
+            self.message = f'Template `{kwargs["template_name"]}` has been ' \
+                           f'updated: {kwargs["added"]} added, ' \
+                           f'{kwargs["changed"]} changed, ' \
+                           f'{kwargs["removed"]} removed.'
+
+        if messsage_type == 'templates_created':
+            self.message = f'{kwargs["created"]} of {kwargs["total"]} ' \
+                           f'templates created, {kwargs["failed"]} failed.'
+
+        if messsage_type == 'template_preview':
+            self.message = f'{kwargs["files"]} files, ' \
+                           f'{kwargs["size"]} would be saved.'
+
+        if messsage_type == 'space_reclaimed':
+            self.message = f'Removed {kwargs["templates"]} deleted ' \
+                           f'templates and {kwargs["blobs"]} unused files.'
+
+        if messsage_type == 'template_rolled_back':
+            self.message = f'Template `{kwargs["template_name"]}` has been ' \
+                           f'rolled back to v{kwargs["version"]}.'
+
+        if messsage_type == 'template_verified':
+            self.message = f'Template `{kwargs["template_name"]}` is ' \
+                           f'intact: {kwargs["files"]} files, ' \
+                           f'{kwargs["hashed"]} hashed.'
+
+        if messsage_type == 'template_unverified':
+            self.message = f'Template `{kwargs["template_name"]}` is a ' \
+                           'directory template, which records no hashes ' \
+                           'to verify.'
+
+        if messsage_type == 'template_diff':
+            self.message = f'`{kwargs["path"]}` has {kwargs["added"]} ' \
+                           f'added, {kwargs["removed"]} removed and ' \
+                           f'{kwargs["modified"]} modified files compared ' \
+                           f'to template `{kwargs["template_name"]}`.'
+
+        if messsage_type == 'daemon_started':
+            self.message = f'Serving `{kwargs["template_folder"]}` on ' \
+                           f'`{kwargs["socket_path"]}`.'
+
+        if messsage_type == 'registry_started':
+            self.message = f'Serving the templates of ' \
+                           f'`{kwargs["template_folder"]}` as a registry ' \
+                           f'on `{kwargs["url"]}`.'
+
         super(InfoMessage, self).__init__(
             'notification', self.message, *args, **kwargs)
@@ -0,0 +1,126 @@
+"""This module contains the progress indicator of large file copies.
+
+Copying a multi-gigabyte file takes long enough that a command should
+show how far it got. The large file copies of app.fileops report the
+bytes they copy here. Nothing is reported unless the copies run inside
+reporting(), which is what the `--progress` option of the command group
+uses:
+
+    with reporting(sys.stderr):
+        clone_template(...)
+
+Like the timings (see app.timings) reporting is process wide, so copies
+running on the engines' thread pools add up to a single indicator.
+
+- reporting: Shows the progress of the copies made inside it
+- start_copy: Adds the size of a large file about to be copied
+- add_progress: Adds the bytes a large file copy copied
+
+Attributes:
+    REFRESH_INTERVAL (float): the minimum seconds between two updates of
+        the indicator
+
+"""
+
+import contextlib
+import threading
+import time
+
+
+REFRESH_INTERVAL = 0.1
+
+_reporter = None
+
+
+class Progress():
+    """The progress of the large file copies made inside reporting()
+
+    The indicator is a single line rewritten in place, e.g.
+    `Copying large files: 1.2 GB of 4.0 GB (30%)`.
+
+    Attributes:
+        total (int): the size of the large files started so far
+        copied (int): the bytes copied so far
+
+    Arguments:
+        stream (file): the stream the indicator is written to
+        interval (float): the minimum seconds between two updates
+
+    """
+
+    def __init__(self, stream, interval=REFRESH_INTERVAL):
+        self.stream = stream
+        self.interval = interval
+        self.total = 0
+        self.copied = 0
+        self.rendered = 0.0
+        self.lock = threading.Lock()
+
+    def start_copy(self, size):
+        """Adds the size of a large file about to be copied"""
+        with self.lock:
+            self.total += size
+            self.render()
+
+    def add_progress(self, count):
+        """Adds the bytes a copy copied"""
+        with self.lock:
+            self.copied += count
+            if time.monotonic() - self.rendered >= self.interval:
+                self.render()
+
+    def render(self):
+        """Rewrites the indicator"""
+        from app.utils import format_size
+
+        percent = self.copied * 100 // self.total if self.total else 100
+        self.stream.write(f'\rCopying large files: '
+                          f'{format_size(self.copied)} of '
+                          f'{format_size(self.total)} ({percent}%)')
+        self.stream.flush()
+        self.rendered = time.monotonic()
+
+    def close(self):
+        """Writes the final state of the indicator, if it was shown"""
+        with self.lock:
+            if self.total:
+                self.render()
+                self.stream.write('\n')
+                self.stream.flush()
+
+
+@contextlib.contextmanager
+def reporting(stream):
+    """Shows the progress of the large file copies made inside the context
+
+    A nested reporting replaces the outer one until it ends.
+
+    Parameters:
+        stream (file): the stream the indicator is written to, usually
+            stderr so the output of the command is left untouched
+
+    Yields:
+        Progress: the progress being reported
+
+    """
+
+    global _reporter
+    progress = Progress(stream)
+    previous, _reporter = _reporter, progress
+    try:
+        yield progress
+    finally:
+        _reporter = previous
+        progress.close()
+
+def start_copy(size):
+    """Adds the size of a large file about to be copied while reporting"""
+    progress = _reporter
+    if progress is not None:
+        progress.start_copy(size)
+
+def add_progress(count):
+    """Adds the bytes a large file copy copied while reporting"""
+    progress = _reporter
+    if progress is not None:
+        progress.add_progress(count)
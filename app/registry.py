@@ -0,0 +1,137 @@
+"""This module contains a stand-in template registry.
+
+The registry serves the stored templates of a template folder, and their
+versions as `name@v<N>`, with the protocol of app.remote, so that remote
+templates can be tried and tested offline:
+
+    scaffold registry --port 8765
+    scaffold clone -t remote:flask-project
+
+Manifests are sent with an ETag, the sha256 digest of their contents, and
+requests whose If-None-Match holds the current ETag are answered with 304
+Not Modified. Blobs never change, so they are sent straight from the
+store's file with sendfile. Connections are kept alive between requests
+and every connection is handled on its own thread.
+
+- RegistryServer: The registry of a template folder
+- RegistryHandler: Answers the requests of a connection
+
+Attributes:
+    DEFAULT_PORT (int): the port the registry listens on by default
+
+"""
+
+import hashlib
+import http.server
+import os
+import re
+import urllib.parse
+from app.remote import DIGEST
+from app.store import get_blob_path
+from app.utils import get_template_format
+from app.versions import resolve_template
+
+
+DEFAULT_PORT = 8765
+
+
+class RegistryHandler(http.server.BaseHTTPRequestHandler):
+    """Answers the GET requests of a connection to the registry"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        match = re.fullmatch(r'/(templates|blobs)/([^/]+)', path)
+        if match is None:
+            self.send_empty(404)
+        elif match.group(1) == 'templates':
+            self.send_template(match.group(2))
+        else:
+            self.send_blob(match.group(2))
+
+    def send_empty(self, status, etag=None):
+        """Sends an answer without a body"""
+        self.send_response(status)
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_template(self, name):
+        """Sends the manifest of a stored template, unless it's unchanged"""
+        template_folder = self.server.template_folder
+        template_path = resolve_template(template_folder, name)
+        try:
+            if name.startswith('.') or \
+                    get_template_format(template_path) != 'store':
+                raise FileNotFoundError(template_path)
+            with open(template_path, 'rb') as file_:
+                contents = file_.read()
+        except OSError:
+            self.send_empty(404)
+            return
+
+        etag = f'"{hashlib.sha256(contents).hexdigest()}"'
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_empty(304, etag)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contents)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def send_blob(self, digest):
+        """Sends the contents of a blob"""
+        if not DIGEST.fullmatch(digest):
+            self.send_empty(404)
+            return
+        try:
+            file_ = open(get_blob_path(self.server.template_folder, digest),
+                         'rb')
+        except OSError:
+            self.send_empty(404)
+            return
+
+        with file_:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length',
+                             str(os.fstat(file_.fileno()).st_size))
+            self.send_header('ETag', f'"{digest}"')
+            self.send_header('Cache-Control', 'immutable')
+            self.end_headers()
+            self.connection.sendfile(file_)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class RegistryServer(http.server.ThreadingHTTPServer):
+    """The registry of a template folder
+
+    Attributes:
+        url (str): the URL of the registry
+
+    Arguments:
+        template_folder (str): the path of the templates directory
+        host (str): the address to listen on
+        port (int): the port to listen on, any free port if 0
+        verbose (bool): logs every request to stderr
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, template_folder, host='127.0.0.1',
+                 port=DEFAULT_PORT, verbose=False):
+        self.template_folder = template_folder
+        self.verbose = verbose
+        super().__init__((host, port), RegistryHandler)
+        host, port = self.server_address[:2]
+        self.url = f'http://{host}:{port}'
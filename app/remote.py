@@ -0,0 +1,496 @@
+"""This module contains the client of remote template registries.
+
+A template of a registry is cloned with the name `<remote>:<name>`, where
+remote names one of the registry URLs of Config.REMOTES. A registry
+serves the template store over HTTP:
+
+- GET /templates/<name>: the manifest of a stored template, with an ETag
+- GET /blobs/<digest>: the contents of the blob with a sha256 digest
+
+Fetching a template sends the ETag of the manifest it cached last with
+If-None-Match, so an unchanged template costs a single request that is
+answered with 304 Not Modified. Blobs are content addressed, so only the
+blobs missing from the local store are downloaded, on a thread pool, and
+checked against their digest before they are added to it. The manifest
+is cached in `.store/remote/<remote>/<name>` of the template folder and
+cloned like any other stored template. When the registry can't be
+reached the cached manifest is cloned as is.
+
+The connections are kept alive in a pool per host that lives as long as
+the process, so the clones made by the daemon reuse them too.
+
+The cached templates are evicted, least recently fetched first, once the
+blobs they reference take more than the cache size, and the blobs no
+template references any more are removed from the store.
+
+app.registry serves a template folder with the same protocol, to try
+remote templates without a registry.
+
+- ConnectionPool: Keeps HTTP connections alive for later requests
+- split_remote_name: Returns the remote and name of a remote template
+- fetch_template: Brings the cached copy of a remote template up to date
+- fetch_remote_template: Fetches a `<remote>:<name>` template for a clone
+- evict_cache: Evicts the cached templates above the cache size
+
+Attributes:
+    REMOTE_FOLDER (str): the name of the folder of the cached remote
+        templates inside the template store
+    REMOTE_SEPARATOR (str): separates the remote from the template's name
+    DEFAULT_CACHE_SIZE (int): the bytes of blobs the cached remote
+        templates may reference before they are evicted
+    TIMEOUT (float): the seconds a request may wait for the registry
+    CHUNK_SIZE (int): the number of bytes downloaded at a time
+    DIGEST (re.Pattern): matches a blob digest
+
+"""
+
+import contextlib
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import urllib.parse
+import uuid
+from app.index import STORE_FOLDER
+from app.manifest import MANIFEST_FORMAT, read_manifest, write_manifest
+from app.store import get_blob_path, collect_garbage, lock_store
+from app.timings import phase, timed, add_file
+from app.utils import run_parallel
+
+
+REMOTE_FOLDER = 'remote'
+REMOTE_SEPARATOR = ':'
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+TIMEOUT = 30.0
+CHUNK_SIZE = 1024 * 1024
+DIGEST = re.compile(r'[0-9a-f]{64}')
+
+
+class ConnectionPool():
+    """Keeps the HTTP connections of finished requests alive for later ones
+
+    A connection is taken from the pool of its host for one request and
+    given back once its response was read, so concurrent requests use
+    their own connections and sequential ones share a single connection.
+    A request sent on a kept connection that the server closed in the
+    meantime is sent again on a new connection.
+
+    Arguments:
+        size (int): the number of idle connections kept per host
+        timeout (float): the seconds a request may wait for the server
+
+    """
+
+    def __init__(self, size=8, timeout=TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, scheme, netloc):
+        """Returns an idle connection to a host, or a new one
+
+        Returns:
+            tuple: the connection and whether it was used before
+
+        """
+
+        with self.lock:
+            connections = self.idle.get((scheme, netloc))
+            if connections:
+                return connections.pop(), True
+        if scheme == 'https':
+            return http.client.HTTPSConnection(
+                netloc, timeout=self.timeout), False
+        if scheme == 'http':
+            return http.client.HTTPConnection(
+                netloc, timeout=self.timeout), False
+        raise ValueError(f'{scheme} is not a supported registry scheme.')
+
+    def release(self, scheme, netloc, connection):
+        """Keeps a connection whose response was read for a later request"""
+        with self.lock:
+            connections = self.idle.setdefault((scheme, netloc), [])
+            if len(connections) < self.size:
+                connections.append(connection)
+                return
+        connection.close()
+
+    @contextlib.contextmanager
+    def request(self, url, headers=None):
+        """Sends a GET request and yields its response
+
+        The connection goes back to the pool when the response was read
+        without error, the rest of its body is read first.
+
+        Raises:
+            OSError: when the server can't be reached
+            http.client.HTTPException: when the server's answer is invalid
+
+        """
+
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path or '/'
+        if parts.query:
+            target += f'?{parts.query}'
+
+        while True:
+            connection, is_reused = self.acquire(parts.scheme, parts.netloc)
+            try:
+                connection.request('GET', target, headers=headers or {})
+                response = connection.getresponse()
+                break
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                if not is_reused or not isinstance(error, (
+                        ConnectionError, http.client.RemoteDisconnected)):
+                    raise
+
+        try:
+            yield response
+            response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self.release(parts.scheme, parts.netloc, connection)
+
+    def close(self):
+        """Closes the idle connections"""
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+_pool = ConnectionPool()
+
+
+def get_pool():
+    """Returns the connection pool shared by the fetches of the process"""
+    return _pool
+
+def split_remote_name(name, remotes):
+    """Returns the remote and name of a remote template's name
+
+    Parameters:
+        name (str): a template name, `<remote>:<name>` for a remote template
+        remotes (dict): the URL of every registry by remote name
+
+    Returns:
+        tuple: the remote and the name of the template on the registry, or
+            None when name doesn't start with one of the remotes
+
+    """
+
+    remote, separator, template_name = name.partition(REMOTE_SEPARATOR)
+    if not separator or remote not in (remotes or {}) or not template_name:
+        return None
+    return remote, template_name
+
+def get_cached_path(template_folder, remote, name):
+    """Returns the path of the cached manifest of a remote template"""
+    return os.path.join(template_folder, STORE_FOLDER, REMOTE_FOLDER,
+                        remote, name)
+
+def get_etag_path(cached_path):
+    """Returns the path of the ETag of a cached manifest"""
+    folder, name = os.path.split(cached_path)
+    return os.path.join(folder, f'.{name}.etag')
+
+def check_name(name):
+    """Raises a ValueError when name can't be a file of the cache"""
+    if not name or name.startswith('.') or os.path.basename(name) != name:
+        raise ValueError(f'{name} is not a valid template name.')
+
+def check_manifest(manifest):
+    """Raises a ValueError when a downloaded manifest is not safe to clone
+
+    Every path must stay inside the clone, appear once and not go through
+    one of the template's symlinks, and every blob must be named by a
+    digest. The modes of the entries are masked to their permission bits,
+    so a registry can't set the setuid, setgid or sticky bits.
+
+    """
+
+    try:
+        if manifest.get('format') != MANIFEST_FORMAT:
+            raise ValueError('The registry sent an invalid manifest.')
+        paths, symlinks = set(), set()
+        for entry in sorted(manifest['entries'],
+                            key=lambda entry: entry['path']):
+            parts = entry['path'].split(os.sep)
+            if os.path.isabs(entry['path']) or '..' in parts or \
+                    entry['path'] in paths or \
+                    any(os.sep.join(parts[:index]) in symlinks
+                        for index in range(1, len(parts))):
+                raise ValueError(
+                    f'{entry["path"]} is not a valid entry path.')
+            paths.add(entry['path'])
+            if entry['type'] == 'symlink':
+                symlinks.add(entry['path'])
+            else:
+                entry['mode'] = int(entry['mode']) & 0o777
+            if entry['type'] == 'file' and \
+                    not DIGEST.fullmatch(entry['hash']):
+                raise ValueError(f'{entry["hash"]} is not a valid digest.')
+    except (AttributeError, KeyError, TypeError):
+        raise ValueError('The registry sent an invalid manifest.')
+
+def download_blob(pool, url, template_folder, digest):
+    """Adds a blob of a registry to the store, unless it's stored already
+
+    Raises:
+        OSError: when the blob can't be downloaded or saved
+        ValueError: when the downloaded contents don't match the digest
+
+    """
+
+    blob_path = get_blob_path(template_folder, digest)
+    if os.path.exists(blob_path):
+        return
+
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    temp_path = f'{blob_path}.{uuid.uuid4().hex}.tmp'
+    hasher = hashlib.sha256()
+    try:
+        with pool.request(f'{url}/blobs/{digest}') as response:
+            if response.status != http.client.OK:
+                raise OSError(f'The registry answered {response.status} '
+                              f'for blob {digest}.')
+            with open(temp_path, 'wb') as file_:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+                    file_.write(chunk)
+        if hasher.hexdigest() != digest:
+            raise ValueError(f'The contents of blob {digest} don\'t match '
+                             'its digest.')
+        os.chmod(temp_path, 0o444)
+        add_file(temp_path)
+        os.replace(temp_path, blob_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+
+def write_etag(etag_path, etag):
+    """Atomically saves the ETag of a cached manifest"""
+    folder, name = os.path.split(etag_path)
+    temp_path = os.path.join(folder, f'{name}.{uuid.uuid4().hex}.tmp')
+    with open(temp_path, 'w') as file_:
+        file_.write(etag)
+    os.replace(temp_path, etag_path)
+
+@timed
+def fetch_template(template_folder, remote, url, name, jobs=None,
+                   cache_size=DEFAULT_CACHE_SIZE, pool=None):
+    """Brings the cached copy of a remote template up to date
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        remote (str): the name of the registry
+        url (str): the URL of the registry
+        name (str): the name of the template on the registry
+        jobs (int): the number of threads downloading blobs
+        cache_size (int): the bytes of blobs the cached remote templates
+            may reference before they are evicted, None to keep them all
+        pool (ConnectionPool): the connections to use, the pool of the
+            process if None
+
+    Returns:
+        str: the path of the cached manifest, which can be cloned
+
+    Raises:
+        LookupError: when the registry has no such template
+        OSError: when the registry can't be reached and the template was
+            never cached, or when it can't be saved
+        ValueError: when the registry sent an invalid template
+        http.client.HTTPException: when the registry's answer is invalid
+
+    """
+
+    check_name(remote)
+    check_name(name)
+    pool = pool or get_pool()
+    url = url.rstrip('/')
+    cached_path = get_cached_path(template_folder, remote, name)
+    etag_path = get_etag_path(cached_path)
+    is_cached = os.path.isfile(cached_path)
+
+    headers = {}
+    if is_cached:
+        with contextlib.suppress(OSError):
+            with open(etag_path) as file_:
+                headers['If-None-Match'] = file_.read()
+        if not headers.get('If-None-Match'):
+            headers.clear()
+
+    try:
+        with phase('fetch_manifest'):
+            with pool.request(f'{url}/templates/{urllib.parse.quote(name)}',
+                              headers) as response:
+                status = response.status
+                body = response.read()
+                etag = response.getheader('ETag')
+    except (OSError, http.client.HTTPException):
+        if not is_cached:
+            raise
+        status, etag = http.client.NOT_MODIFIED, None
+
+    if status == http.client.NOT_FOUND:
+        raise LookupError(f'{remote} has no template {name}.')
+    if status == http.client.NOT_MODIFIED and is_cached:
+        manifest = read_manifest(cached_path)
+    elif status == http.client.OK:
+        manifest = json.loads(body)
+        check_manifest(manifest)
+    else:
+        raise OSError(f'The registry answered {status} for {name}.')
+
+    digests = {entry['hash'] for entry in manifest['entries']
+               if entry['type'] == 'file'}
+    with lock_store(template_folder):
+        with phase('download_blobs'):
+            run_parallel(download_blob,
+                         ((pool, url, template_folder, digest)
+                          for digest in sorted(digests)), jobs)
+
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        if status == http.client.OK:
+            write_manifest(manifest, cached_path)
+        if etag:
+            write_etag(etag_path, etag)
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(etag_path)
+    if os.path.exists(etag_path):
+        os.utime(etag_path)
+    else:
+        write_etag(etag_path, '')
+
+    if cache_size is not None:
+        evict_cache(template_folder, cache_size, keep=(cached_path,))
+    return cached_path
+
+def fetch_remote_template(template_folder, name, remotes, jobs=None,
+                          cache_size=DEFAULT_CACHE_SIZE):
+    """Fetches a `<remote>:<name>` template to clone it
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        name (str): the name of the template, `<remote>:<name>`
+        remotes (dict): the URL of every registry by remote name
+        jobs (int): the number of threads downloading blobs
+        cache_size (int): the bytes of blobs the cached remote templates
+            may reference before they are evicted
+
+    Returns:
+        dict: indicates whether the fetch threw an error, whether the
+            registry has no such template and the path of the cached
+            template
+
+    """
+
+    remote, template_name = split_remote_name(name, remotes)
+    try:
+        path = fetch_template(template_folder, remote, remotes[remote],
+                              template_name, jobs, cache_size)
+        return {'is_successful': True, 'is_missing': False, 'path': path}
+
+    except LookupError:
+        return {'is_successful': False, 'is_missing': True, 'path': None}
+
+    except (OSError, ValueError, http.client.HTTPException):
+        return {'is_successful': False, 'is_missing': False, 'path': None}
+
+def list_cached(template_folder):
+    """Lists the cached remote templates, least recently fetched first
+
+    Returns:
+        list: the path of the manifest of every cached remote template
+
+    """
+
+    remote_folder = os.path.join(template_folder, STORE_FOLDER,
+                                 REMOTE_FOLDER)
+    cached = []
+    try:
+        remotes = os.listdir(remote_folder)
+    except FileNotFoundError:
+        return cached
+    for remote in remotes:
+        remote_path = os.path.join(remote_folder, remote)
+        for name in os.listdir(remote_path):
+            if name.startswith('.'):
+                continue
+            cached_path = os.path.join(remote_path, name)
+            try:
+                used = os.stat(get_etag_path(cached_path)).st_mtime
+            except OSError:
+                used = 0
+            cached.append((used, cached_path))
+    return [cached_path for _, cached_path in sorted(cached)]
+
+@timed
+def evict_cache(template_folder, cache_size, keep=()):
+    """Evicts cached remote templates until their blobs fit the cache size
+
+    The blobs that are no longer referenced by any template are removed,
+    unless they were added during the reclaim grace period.
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        cache_size (int): the bytes of blobs the cached templates may
+            reference
+        keep (iterable): the paths of cached templates that are never
+            evicted
+
+    Returns:
+        int: the number of cached templates evicted
+
+    Raises:
+        OSError: when a cached template can't be removed
+
+    """
+
+    from collections import Counter
+    from app.trash import RECLAIM_GRACE
+
+    references, sizes, blobs = Counter(), {}, {}
+    cached = list_cached(template_folder)
+    for cached_path in cached:
+        try:
+            entries = read_manifest(cached_path)['entries']
+        except (OSError, ValueError):
+            entries = []
+        blobs[cached_path] = {entry['hash'] for entry in entries
+                              if entry['type'] == 'file'}
+        sizes.update((entry['hash'], entry['size']) for entry in entries
+                     if entry['type'] == 'file')
+        references.update(blobs[cached_path])
+
+    total = sum(sizes[digest] for digest in references)
+    evicted = 0
+    for cached_path in cached:
+        if total <= cache_size:
+            break
+        if cached_path in keep:
+            continue
+        os.remove(cached_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(get_etag_path(cached_path))
+        for digest in blobs[cached_path]:
+            references[digest] -= 1
+            if not references[digest]:
+                del references[digest]
+                total -= sizes[digest]
+        evicted += 1
+
+    if evicted:
+        collect_garbage(template_folder, grace=RECLAIM_GRACE)
+    return evicted
@@ -0,0 +1,365 @@
+"""This module contains the search index of template contents.
+
+The search index maps the files of every template to the words of their
+contents, so that finding the templates with a `pyproject.toml`, or with a
+Dockerfile that holds `python:3.12`, doesn't read the template folder.
+It is a SQLite database in the template store with four tables:
+
+- templates: every indexed template and the mtime of its entry in the
+    template folder
+- files: the template, path and name of every file of every template
+- tokens: the lowercased words of every file's contents
+- suffixes: every suffix of two letters or more of every indexed word
+
+Like the template index (see app.index) the search index records the
+template folder's mtime. When the folder changed, only the templates that
+were added, removed or replaced since they were indexed are read, which
+is what create and delete do right after they change a template. Text
+files of at most MAX_INDEXED_SIZE bytes are tokenized, binary and larger
+files can only be found by their path.
+
+A search looks the words of the text up in the tokens table and then
+reads the candidate files to check that they hold the whole text, so the
+template folder is only read for files that almost certainly match. The
+text may start or end inside a word, so its first word is looked up in
+the suffixes table and its last word is matched as the start of an
+indexed word; every lookup is a range of an index, never a scan of the
+tokens. A text without a word of two letters or more can't be looked up
+and is rejected. An index written with another SCHEMA_VERSION is emptied
+and rebuilt when it is opened.
+
+- update_search_index: Brings the search index in line with the folder
+- search: Returns the files that match a path pattern and a text
+
+Attributes:
+    SEARCH_FILE (str): the name of the search index inside the store folder
+    MAX_INDEXED_SIZE (int): the size in bytes above which the contents of
+        a file are not indexed
+    BINARY_PROBE (int): the number of leading bytes checked for a NUL
+        byte, which marks a binary file
+    TOKEN (re.Pattern): matches an indexed word
+    WORD (re.Pattern): matches a word of a searched text
+    SCHEMA (str): the statements creating the tables of the index
+    SCHEMA_VERSION (str): identifies the layout of the tables
+
+"""
+
+import os
+import re
+import sqlite3
+import tarfile
+from app.index import STORE_FOLDER
+from app.timings import phase
+
+
+SEARCH_FILE = 'search.db'
+MAX_INDEXED_SIZE = 1024 * 1024
+BINARY_PROBE = 8192
+TOKEN = re.compile(r'\w{2,64}')
+WORD = re.compile(r'\w+')
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS templates (name TEXT PRIMARY KEY, mtime TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY, template TEXT, path TEXT, name TEXT);
+CREATE INDEX IF NOT EXISTS files_template ON files (template);
+CREATE INDEX IF NOT EXISTS files_name ON files (name);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT, file INTEGER, PRIMARY KEY (token, file)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tokens_file ON tokens (file);
+CREATE TABLE IF NOT EXISTS suffixes (
+    suffix TEXT, token TEXT, PRIMARY KEY (suffix, token)) WITHOUT ROWID;
+'''
+SCHEMA_VERSION = '2'
+
+
+def get_search_path(template_folder):
+    """Returns the path of the template folder's search index"""
+    return os.path.join(template_folder, STORE_FOLDER, SEARCH_FILE)
+
+def connect(template_folder):
+    """Opens the search index, creating its tables if needed
+
+    Raises:
+        OSError: when the template folder doesn't exist
+        sqlite3.Error: when the index can't be opened
+
+    """
+
+    store_folder = os.path.join(template_folder, STORE_FOLDER)
+    if not os.path.isdir(store_folder):
+        os.mkdir(store_folder)
+    connection = sqlite3.connect(get_search_path(template_folder),
+                                 timeout=30)
+    connection.executescript(SCHEMA)
+    version = connection.execute(
+        "SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    if version is None or version[0] != SCHEMA_VERSION:
+        with connection:
+            for table in ('suffixes', 'tokens', 'files', 'templates', 'meta'):
+                connection.execute(f'DELETE FROM {table}')
+            connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('schema', ?)",
+                (SCHEMA_VERSION,))
+    return connection
+
+def tokenize(contents):
+    """Returns the set of lowercased words of a file's contents"""
+    if b'\0' in contents[:BINARY_PROBE]:
+        return set()
+    return set(TOKEN.findall(contents.decode('utf-8', 'ignore').lower()))
+
+def get_suffixes(token):
+    """Yields the suffixes of two letters or more of an indexed word"""
+    for start in range(len(token) - 1):
+        yield token[start:]
+
+def get_token_patterns(text):
+    """Returns the GLOB patterns of the indexed words a text holds
+
+    The words inside the text are whole indexed words, while its first
+    word may be the end of an indexed word and its last word the start of
+    one, e.g. `ython:3.12-sl` holds the end of `python`, the word `12`
+    and the start of `slim`. Words longer than an indexed word are
+    matched by the indexed word they start with.
+
+    The first word is matched against the suffixes of the indexed words,
+    the others against the words themselves, and a pattern only ends
+    with a wildcard, so that every pattern is looked up in an index.
+
+    Returns:
+        list: the sorted (column, pattern) pairs, where column is `token`
+            or `suffix`
+
+    Raises:
+        ValueError: when the text holds no word of two letters or more
+
+    """
+
+    lowered = text.lower()
+    patterns = set()
+    for match in WORD.finditer(lowered):
+        word = match.group()
+        is_partial_start = match.start() == 0
+        is_partial_end = match.end() == len(lowered)
+        if len(word) < 2 or is_partial_start and len(word) > 64:
+            continue
+        if len(word) > 64:
+            word, is_partial_end = word[:64], True
+        patterns.add(('suffix' if is_partial_start else 'token',
+                      word + ('*' if is_partial_end else '')))
+    if not patterns:
+        raise ValueError(f'{text} holds no word of two letters or more.')
+    return sorted(patterns)
+
+def read_files(template_path, wanted=None):
+    """Yields the files of a template with their contents
+
+    Parameters:
+        template_path (str): the path of the template
+        wanted (set): the paths of the files to read, every file if None
+
+    Yields:
+        tuple: the path of every file inside the template and its
+            contents, or None when the file is larger than
+            MAX_INDEXED_SIZE
+
+    """
+
+    from app.archive import INDEX_NAMES
+    from app.manifest import read_manifest
+    from app.store import get_blob_path
+    from app.utils import get_template_format, scan_tree
+    from app.versions import get_template_folder
+
+    def read(path, size):
+        if size > MAX_INDEXED_SIZE:
+            return None
+        with open(path, 'rb') as file_:
+            return file_.read()
+
+    template_format = get_template_format(template_path)
+    if template_format == 'directory':
+        for relative_path, entry in scan_tree(template_path):
+            if entry.is_file(follow_symlinks=False) and \
+                    (wanted is None or relative_path in wanted):
+                size = entry.stat(follow_symlinks=False).st_size
+                yield relative_path, read(entry.path, size)
+
+    elif template_format == 'store':
+        template_folder = get_template_folder(template_path)
+        for entry in read_manifest(template_path)['entries']:
+            if entry['type'] == 'file' and \
+                    (wanted is None or entry['path'] in wanted):
+                yield entry['path'], read(
+                    get_blob_path(template_folder, entry['hash']),
+                    entry['size'])
+
+    else:
+        with tarfile.open(template_path, 'r|*') as archive:
+            for member in archive:
+                if member.name in INDEX_NAMES or not member.isfile() or \
+                        (wanted is not None and member.name not in wanted):
+                    continue
+                yield member.name, None if member.size > MAX_INDEXED_SIZE \
+                    else archive.extractfile(member).read()
+
+def index_template(connection, name, template_path, mtime):
+    """Replaces the rows of a template in the search index
+
+    Parameters:
+        connection (sqlite3.Connection): the search index
+        name (str): the name of the template
+        template_path (str): the path of the template
+        mtime (str): the mtime of the template's entry
+
+    """
+
+    remove_template(connection, name)
+    words = set()
+    for path, contents in read_files(template_path):
+        cursor = connection.execute(
+            'INSERT INTO files (template, path, name) VALUES (?, ?, ?)',
+            (name, path, os.path.basename(path)))
+        if contents is not None:
+            tokens = tokenize(contents)
+            words.update(tokens)
+            connection.executemany(
+                'INSERT INTO tokens (token, file) VALUES (?, ?)',
+                ((token, cursor.lastrowid) for token in tokens))
+    connection.executemany(
+        'INSERT OR IGNORE INTO suffixes (suffix, token) VALUES (?, ?)',
+        ((suffix, token) for token in words
+         for suffix in get_suffixes(token)))
+    connection.execute('INSERT INTO templates (name, mtime) VALUES (?, ?)',
+                       (name, mtime))
+
+def remove_template(connection, name):
+    """Removes the rows of a template from the search index"""
+    connection.execute('DELETE FROM tokens WHERE file IN '
+                       '(SELECT id FROM files WHERE template = ?)', (name,))
+    connection.execute('DELETE FROM files WHERE template = ?', (name,))
+    connection.execute('DELETE FROM templates WHERE name = ?', (name,))
+
+def reconcile(connection, template_folder, refresh=False):
+    """Re-indexes the templates that changed since they were indexed
+
+    Nothing is read while the template folder's mtime is the one the
+    index recorded, unless refresh is truthy.
+
+    """
+
+    folder_mtime = str(os.stat(template_folder).st_mtime_ns)
+    recorded = connection.execute(
+        "SELECT value FROM meta WHERE key = 'folder_mtime'").fetchone()
+    if not refresh and recorded is not None and recorded[0] == folder_mtime:
+        return
+
+    indexed = dict(connection.execute('SELECT name, mtime FROM templates'))
+    with connection:
+        with os.scandir(template_folder) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                mtime = str(entry.stat(follow_symlinks=False).st_mtime_ns)
+                if indexed.pop(entry.name, None) == mtime:
+                    continue
+                try:
+                    index_template(connection, entry.name, entry.path, mtime)
+                except (OSError, ValueError, tarfile.TarError):
+                    remove_template(connection, entry.name)
+
+        for name in indexed:
+            remove_template(connection, name)
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) "
+            "VALUES ('folder_mtime', ?)", (folder_mtime,))
+
+def update_search_index(template_folder):
+    """Updates the search index after a template was created or deleted
+
+    Returns:
+        dict: indicates whether the update operation threw an error
+
+    """
+
+    try:
+        with phase('update_search_index'):
+            connection = connect(template_folder)
+            try:
+                reconcile(connection, template_folder, refresh=True)
+            finally:
+                connection.close()
+        return {'is_successful': True}
+
+    except (OSError, sqlite3.Error):
+        return {'is_successful': False}
+
+def search(template_folder, text='', path_pattern=None):
+    """Returns the files of the templates that match a path and a text
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        text (str): the text the files must contain, ignoring case, or an
+            empty string
+        path_pattern (str): a glob the file's name must match, or its path
+            inside the template when the pattern holds a slash, or None
+
+    Returns:
+        list: the template name and path of every matching file, sorted
+
+    Raises:
+        OSError: when the template folder can't be read
+        sqlite3.Error: when the search index can't be read
+        ValueError: when the text holds no word of two letters or more
+
+    """
+
+    connection = connect(template_folder)
+    try:
+        with phase('reconcile'):
+            reconcile(connection, template_folder)
+
+        conditions, parameters = [], []
+        if path_pattern:
+            column = 'path' if '/' in path_pattern else 'name'
+            conditions.append(f'files.{column} GLOB ?')
+            parameters.append(path_pattern.replace('/', os.sep))
+        if text:
+            for column, pattern in get_token_patterns(text):
+                conditions.append(
+                    'files.id IN (SELECT file FROM tokens WHERE token GLOB ?)'
+                    if column == 'token' else
+                    'files.id IN (SELECT file FROM tokens WHERE token IN '
+                    '(SELECT token FROM suffixes WHERE suffix GLOB ?))')
+                parameters.append(pattern)
+
+        query = 'SELECT template, path FROM files'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        with phase('query'):
+            candidates = connection.execute(
+                query + ' ORDER BY template, path', parameters).fetchall()
+    finally:
+        connection.close()
+
+    if not text:
+        return candidates
+
+    needle = text.lower()
+    by_template = {}
+    for name, path in candidates:
+        by_template.setdefault(name, set()).add(path)
+
+    matches = []
+    with phase('verify'):
+        for name, paths in by_template.items():
+            try:
+                for path, contents in read_files(
+                        os.path.join(template_folder, name), paths):
+                    if contents is not None and needle in contents.decode(
+                            'utf-8', 'ignore').lower():
+                        matches.append((name, path))
+            except (OSError, ValueError, tarfile.TarError):
+                continue
+    return sorted(matches)
@@ -0,0 +1,221 @@
+"""This module contains the selection of the part of a template to clone.
+
+A clone can be limited to a subtree of the template, whose contents become
+the new directory, and to the paths matched by include patterns. Include
+patterns follow the syntax of ignore patterns (see app.ignore) and are
+relative to the selected subtree, a matched directory is cloned with all
+of its contents and the directories leading to a matched path are created
+too. Unlike ignore patterns, include patterns are always anchored to the
+root of the subtree, `**/` matches any number of directories.
+
+The selection prunes the walk of the template: directories that can't
+hold a selected path are never descended into, or are skipped while a
+manifest or an archive is read, so only the selected part of a large
+template is read and written.
+
+- Selection: Decides which paths of a template are cloned
+- has_directory: Returns whether a template holds a directory
+
+"""
+
+import os
+import re
+from app.ignore import translate
+
+
+class Selection():
+    """Decides which paths of a template are cloned
+
+    Paths are relative to the template's root and the selected paths are
+    returned relative to the subpath.
+
+    Arguments:
+        includes (iterable): gitignore-style patterns of the paths to clone,
+            everything is cloned when there are none
+        subpath (str): the directory of the template to clone, or None
+
+    Raises:
+        ValueError: when the subpath is absolute or leaves the template
+
+    """
+
+    def __init__(self, includes=(), subpath=None):
+        self.subpath = None
+        if subpath:
+            subpath = subpath.replace(os.sep, '/').strip('/')
+            parts = subpath.split('/')
+            if os.path.isabs(subpath) or '..' in parts:
+                raise ValueError(f'{subpath} is not inside the template.')
+            self.subpath = '/'.join(part for part in parts
+                                    if part not in ('', '.')) or None
+
+        self.patterns = []
+        for pattern in includes or ():
+            pattern = pattern.strip()
+            directory_only = pattern.endswith('/')
+            pattern = pattern.strip('/')
+            if not pattern:
+                continue
+            segments = [None if '**' in segment else
+                        re.compile(f'{translate(segment)}\\Z', re.DOTALL)
+                        for segment in pattern.split('/')]
+            self.patterns.append((
+                re.compile(f'{translate(pattern)}\\Z', re.DOTALL),
+                directory_only, segments))
+
+    def __bool__(self):
+        return bool(self.subpath or self.patterns)
+
+    def relative_path(self, path):
+        """Returns a template path relative to the subpath
+
+        Returns:
+            str: the relative path, an empty string for the subpath itself
+                and None for paths outside of the subpath
+
+        """
+
+        if self.subpath is None:
+            return path
+        if path == self.subpath:
+            return ''
+        if path.startswith(self.subpath + '/'):
+            return path[len(self.subpath) + 1:]
+        return None
+
+    def is_included(self, path, is_dir=False):
+        """Returns whether a path relative to the subpath is included
+
+        A path is included when a pattern matches it or its parent
+        directories.
+
+        """
+
+        if not self.patterns:
+            return True
+        parts = path.split('/')
+        for index in range(1, len(parts) + 1):
+            prefix = '/'.join(parts[:index])
+            prefix_is_dir = is_dir or index < len(parts)
+            for regex, directory_only, _ in self.patterns:
+                if (prefix_is_dir or not directory_only) and \
+                        regex.match(prefix):
+                    return True
+        return False
+
+    def may_contain(self, path):
+        """Returns whether a directory relative to the subpath can hold
+        included paths
+
+        Patterns are compared with the directory a component at a time and
+        a `**` component can match any directory.
+
+        """
+
+        parts = path.split('/')
+        for _, _, segments in self.patterns:
+            for part, segment in zip(parts, segments):
+                if segment is None:
+                    return True
+                if not segment.match(part):
+                    break
+            else:
+                if len(parts) < len(segments):
+                    return True
+        return False
+
+    def is_ignored(self, relative_path, is_dir=False):
+        """Returns whether the walk of a template skips a path
+
+        Has the signature of app.ignore.IgnoreRules.is_ignored so that the
+        selection can prune app.utils.scan_tree. The directories leading
+        to the subpath are walked but never selected.
+
+        """
+
+        path = relative_path.replace(os.sep, '/')
+        inner = self.relative_path(path)
+        if inner is None:
+            return not (is_dir and self.subpath.startswith(path + '/'))
+        if not inner:
+            return False
+        return not (self.is_included(inner, is_dir)
+                    or (is_dir and self.may_contain(inner)))
+
+    def select(self, entries):
+        """Yields the selected entries of a template
+
+        A directory that is walked only because it may hold included paths
+        is yielded right before the first of them, so no empty directory
+        is created for it.
+
+        Parameters:
+            entries (iterable): the path, whether it's a directory and an
+                item for every entry of the template, parents first
+
+        Yields:
+            tuple: the path relative to the subpath and the item of every
+                selected entry
+
+        """
+
+        pending = {}
+        for path, is_dir, item in entries:
+            path = path.replace(os.sep, '/').strip('/')
+            if self.is_ignored(path, is_dir):
+                continue
+            inner = self.relative_path(path)
+            if not inner:
+                continue
+            if is_dir and not self.is_included(inner, True):
+                pending[inner] = item
+                continue
+
+            parts = inner.split('/')
+            for index in range(1, len(parts)):
+                parent = '/'.join(parts[:index])
+                if parent in pending:
+                    yield parent.replace('/', os.sep), pending.pop(parent)
+            yield inner.replace('/', os.sep), item
+
+    def select_entries(self, entries):
+        """Yields the selected manifest entries
+
+        The entries are copies whose path is relative to the subpath, the
+        entries passed in are left untouched.
+
+        """
+
+        for path, entry in self.select(
+                (entry['path'], entry['type'] == 'directory', entry)
+                for entry in entries):
+            yield dict(entry, path=path)
+
+def has_directory(template_path, template_format, path):
+    """Returns whether a template holds a directory
+
+    Parameters:
+        template_path (str): the path of the template
+        template_format (str): the format of the template, see
+            app.utils.get_template_format
+        path (str): the path of the directory inside the template, with
+            forward slashes
+
+    Raises:
+        OSError: when the template can't be read
+
+    """
+
+    if template_format == 'directory':
+        directory = os.path.join(template_path, *path.split('/'))
+        return os.path.isdir(directory) and not os.path.islink(directory)
+
+    if template_format == 'archive':
+        from app.archive import read_members
+        manifest = read_members(template_path)
+    else:
+        from app.manifest import read_manifest
+        manifest = read_manifest(template_path)
+    return any(entry['type'] == 'directory' and
+               entry['path'].replace(os.sep, '/') == path
+               for entry in manifest['entries'])
@@ -0,0 +1,225 @@
+"""This module contains the `scaffold serve` daemon.
+
+The daemon serves one template folder over a Unix socket (see app.daemon
+for the client and the protocol). It keeps the template index in memory,
+refreshed by a watcher thread whenever the template folder changes, and
+caches the manifests of the templates it reads (see
+app.manifest.enable_manifest_cache) and the contents of the small
+templates it clones (see app.cache), so that list requests never touch
+the disk and clones of hot templates are written from memory. Every
+connection is handled on its own thread.
+
+- DaemonServer: The daemon of a template folder
+- execute: Runs an operation of a request
+
+Attributes:
+    OPERATIONS (tuple): the operations the daemon runs
+    WATCH_INTERVAL (float): the seconds between two checks of the template
+        folder
+
+"""
+
+import json
+import os
+import socketserver
+import threading
+from app.daemon import get_socket_path, make_socket_folder, send_request
+from app.engines import (create_template, clone_template,
+                         clone_template_to_many, remove_template)
+from app.cache import (enable_content_cache, get_content_cache,
+                       DEFAULT_MAX_BYTES)
+from app.index import load_index, filter_rows, row_to_dict
+from app.manifest import enable_manifest_cache
+from app.store import get_store_function
+from app.trash import reclaim
+from app.utils import get_clone_function
+
+
+OPERATIONS = ('ping', 'stats', 'create', 'clone', 'clone_many', 'delete',
+              'list')
+WATCH_INTERVAL = 1.0
+
+
+class WarmIndex():
+    """The template index of a template folder, kept in memory
+
+    Attributes:
+        template_folder (str): the path of the templates directory
+        rows (list): the full index rows, sorted by name
+        folder_mtime (int): the template folder's mtime the rows are from
+
+    """
+
+    def __init__(self, template_folder):
+        self.template_folder = template_folder
+        self.rows = []
+        self.folder_mtime = None
+        self.lock = threading.Lock()
+
+    def get_rows(self):
+        """Returns the rows, reloaded when the template folder changed"""
+        folder_mtime = os.stat(self.template_folder).st_mtime_ns
+        with self.lock:
+            if folder_mtime != self.folder_mtime:
+                self.rows = load_index(self.template_folder, details=True)
+                self.folder_mtime = folder_mtime
+            return self.rows
+
+_reclaim_lock = threading.Lock()
+
+
+def reclaim_in_background(template_folder):
+    """Reclaims the space of the template folder on a thread"""
+
+    def run():
+        with _reclaim_lock:
+            reclaim(template_folder)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def execute(template_folder, warm_index, operation, arguments):
+    """Runs an operation of a request
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        warm_index (WarmIndex): the index list requests are served from
+        operation (str): one of OPERATIONS
+        arguments (dict): the arguments of the operation, the same as the
+            arguments of the command
+
+    Returns:
+        the JSON serializable result of the engine
+
+    Raises:
+        ValueError: when the operation is not supported
+
+    """
+
+    options = arguments.get('options', {})
+
+    if operation == 'ping':
+        return {'is_successful': True}
+    if operation == 'stats':
+        cache = get_content_cache()
+        return cache.get_stats() if cache is not None else None
+    if operation == 'create':
+        status = create_template(
+            arguments['path'], arguments['name'],
+            get_store_function(arguments['path'],
+                               arguments.get('template_format', 'store')),
+            arguments.get('force', False), template_folder, **options)
+        if arguments.get('force'):
+            reclaim_in_background(template_folder)
+        return status
+    if operation == 'clone':
+        return clone_template(
+            arguments['path'], arguments['template'], arguments['name'],
+            get_clone_function(arguments['path']), template_folder,
+            **options)
+    if operation == 'clone_many':
+        return clone_template_to_many(
+            [tuple(destination) for destination in arguments['destinations']],
+            arguments['template'], template_folder, **options)
+    if operation == 'delete':
+        status = remove_template(arguments['template'], template_folder)
+        reclaim_in_background(template_folder)
+        return status
+    if operation == 'list':
+        rows = filter_rows(
+            warm_index.get_rows(), arguments.get('search_term', ''),
+            arguments.get('prefix', ''), arguments.get('sort_by', 'name'),
+            arguments.get('reverse', False), details=True)
+        if arguments.get('details'):
+            return [row_to_dict(row) for row in rows]
+        return [row[0] for row in rows]
+    raise ValueError(f'{operation} is not a supported operation.')
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Answers the request sent over a connection"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            result = execute(self.server.template_folder,
+                             self.server.warm_index, request['operation'],
+                             request.get('arguments', {}))
+            response = dict(result=result)
+        except Exception as error:
+            response = dict(error=str(error))
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """The daemon of a template folder
+
+    Arguments:
+        template_folder (str): the path of the templates directory
+        socket_path (str): the socket to listen on, the template folder's
+            socket (see app.daemon.get_socket_path) if None
+
+    The socket is created in a folder private to the user (see
+    app.daemon.make_socket_folder) and only the user can connect to it.
+
+    Raises:
+        OSError: when another daemon already listens on the socket, or the
+            socket's folder is not private to the user
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, template_folder, socket_path=None):
+        self.template_folder = template_folder
+        self.socket_path = socket_path or get_socket_path(template_folder)
+        self.warm_index = WarmIndex(template_folder)
+        self.stopped = threading.Event()
+
+        make_socket_folder(self.socket_path)
+        if os.path.exists(self.socket_path):
+            try:
+                send_request(self.socket_path, 'ping', {})
+            except (OSError, ValueError):
+                os.remove(self.socket_path)
+            else:
+                raise OSError(f'A daemon already serves {template_folder}.')
+
+        umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def watch(self, interval):
+        """Reloads the index whenever the template folder changes"""
+        while not self.stopped.wait(interval):
+            try:
+                self.warm_index.get_rows()
+            except OSError:
+                pass
+
+    def serve(self, watch_interval=WATCH_INTERVAL,
+              cache_size=DEFAULT_MAX_BYTES):
+        """Serves requests until shutdown is called
+
+        Parameters:
+            watch_interval (float): the seconds between two checks of the
+                template folder
+            cache_size (int): the byte budget of the content cache, 0
+                disables it
+
+        """
+
+        enable_manifest_cache()
+        enable_content_cache(cache_size)
+        self.warm_index.get_rows()
+        watcher = threading.Thread(target=self.watch, args=(watch_interval,),
+                                   daemon=True)
+        watcher.start()
+        try:
+            self.serve_forever()
+        finally:
+            self.stopped.set()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
@@ -0,0 +1,562 @@
+"""This module contains the content-addressed template store.
+
+File contents are kept once as blobs named by their sha256 hash, and every
+template is a small manifest listing the paths, modes and blob hashes of its
+entries. The manifest is saved in place of the template in the template
+folder, so templates stay addressable by name.
+
+- store_directory: Saves a directory as a template
+- store_file: Saves a single file as a template
+- store_template: Saves or incrementally syncs a template
+- restore_template: Rebuilds a template's tree from its blobs
+- collect_garbage: Removes blobs no template references
+- lock_store: Holds the lock shared by creates and collect_garbage
+
+Blobs are added to the store before the manifest that references them is
+saved, and a create reuses the blobs that are already stored. Creates
+hold the store's lock shared from their first blob to their manifest and
+collect_garbage holds it exclusively, so it never removes a blob that a
+running create is about to reference.
+
+Attributes:
+    HASH_CHUNK_SIZE (int): the number of bytes read at a time when hashing
+    LOCK_NAME (str): the name of the lock file inside the store folder
+    STORE_MODES (tuple): the app.fileops modes that can add blobs, symlinks
+        are excluded because a blob must outlive its source
+
+"""
+
+import contextlib
+import hashlib
+import os
+import time
+import uuid
+from app.archive import archive_directory, archive_file
+from app.fileops import (ChecksumError, materialize_file, copy_verified,
+                         LINK_MODES)
+from app.ignore import load_ignore_rules
+from app.index import STORE_FOLDER
+from app.journal import Journal, prepare_path
+from app.manifest import (MANIFEST_FORMAT, list_entries, read_manifest,
+                          write_manifest, compare_manifests)
+from app.messages import ErrorMessage
+from app.timings import phase, timed, add_file
+from app.utils import run_parallel, get_template_format
+from app.variables import (PlaceholderScanner, Variables,
+                           find_path_placeholders)
+from app.versions import (VERSIONS_FOLDER, get_template_folder,
+                          list_versions)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+LOCK_NAME = 'lock'
+STORE_MODES = ('copy', 'hardlink', 'reflink', 'auto')
+
+
+def hash_file(path, scanner=None):
+    """Returns the sha256 hex digest of a file's contents
+
+    Parameters:
+        path (str): the file to hash
+        scanner (app.variables.PlaceholderScanner): also scans every chunk
+            read for placeholders, if supplied
+
+    """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file_:
+        for chunk in iter(lambda: file_.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            if scanner is not None:
+                scanner.update(chunk)
+    return digest.hexdigest()
+
+@contextlib.contextmanager
+def lock_store(template_folder, exclusive=False):
+    """Holds the lock of the store of a template folder
+
+    The lock is a flock on the `.store/lock` file, so it is shared between
+    processes and released when its holder exits. Platforms without fcntl
+    aren't locked.
+
+    Parameters:
+        template_folder (str): the folder that templates currently live
+        exclusive (bool): if truthy wait for every other holder, otherwise
+            wait only for an exclusive holder
+
+    Raises:
+        OSError: when the lock file can't be opened
+
+    """
+
+    lock_path = os.path.join(template_folder, STORE_FOLDER, LOCK_NAME)
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'a') as file_:
+        if fcntl is not None:
+            fcntl.flock(file_.fileno(),
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+def get_blob_path(template_folder, digest):
+    """Returns the path of the blob with the supplied digest"""
+    return os.path.join(template_folder, STORE_FOLDER, 'objects',
+                        digest[:2], digest[2:])
+
+def put_blob(src, template_folder, mode='copy', scanner=None):
+    """Adds a file's contents to the store
+
+    The contents are hashed first, so a file whose contents are already
+    stored is never copied. Blobs are made read-only unless they are
+    hardlinked to src.
+
+    Parameters:
+        src (str): the file to add
+        template_folder (str): the folder that templates currently live
+        mode (str): how the blob is materialized, one of STORE_MODES
+        scanner (app.variables.PlaceholderScanner): scans the contents for
+            placeholders while they are hashed, if supplied
+
+    Returns:
+        str: the digest the contents are stored under
+
+    """
+
+    if mode not in STORE_MODES:
+        raise ValueError(f'{mode} is not a valid store mode.')
+
+    digest = hash_file(src, scanner)
+    blob_path = get_blob_path(template_folder, digest)
+
+    if not os.path.exists(blob_path):
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        temp_path = f'{blob_path}.{uuid.uuid4().hex}.tmp'
+        if materialize_file(src, temp_path, mode) not in LINK_MODES:
+            os.chmod(temp_path, 0o444)
+        os.replace(temp_path, blob_path)
+
+    return digest
+
+def build_manifest(src, template_type, template_folder, jobs=None,
+                   mode='copy', previous=None, journal=None, ignore=None):
+    """Adds every file under src to the store and returns its manifest
+
+    The tree is walked first and the files are then hashed and added to the
+    store on a thread pool. Files whose size and modification time match
+    their entry in the previous manifest, or in the journal of an
+    interrupted create, reuse its hash without being read, unless the
+    previous manifest was saved before placeholders were listed.
+
+    The placeholders of every file (see app.variables) are found while it
+    is hashed and listed in its entry, the manifest lists the placeholders
+    of every file and path.
+
+    Parameters:
+        src (str): the file or directory to build the manifest from
+        template_type (str): `file` or `directory`
+        template_folder (str): the folder that templates currently live
+        jobs (int): the number of threads adding files to the store
+        mode (str): how blobs are materialized, one of STORE_MODES
+        previous (dict): the manifest of the template being replaced
+        journal (app.journal.Journal): records the entry of every file
+            added to the store
+        ignore (app.ignore.IgnoreRules): the rules of the entries left out
+            of the template
+
+    Returns:
+        dict: the template manifest
+
+    """
+
+    if previous is not None and 'placeholders' not in previous:
+        previous = None
+    previous_entries = {entry['path']: entry
+                        for entry in (previous or {}).get('entries', [])}
+    if journal is not None:
+        previous_entries.update(journal.completed)
+
+    def add_entry(entry, path):
+        known = previous_entries.get(entry['path'], {})
+        if (known.get('type') == 'file'
+                and (known['size'], known['mtime']) ==
+                (entry['size'], entry['mtime'])
+                and os.path.exists(
+                    get_blob_path(template_folder, known['hash']))):
+            entry['hash'] = known['hash']
+            if known.get('placeholders'):
+                entry['placeholders'] = known['placeholders']
+        else:
+            scanner = PlaceholderScanner()
+            with phase('put_blob'):
+                entry['hash'] = put_blob(path, template_folder, mode,
+                                         scanner)
+            if scanner.names:
+                entry['placeholders'] = sorted(scanner.names)
+            add_file(path)
+        if journal is not None:
+            journal.record(entry['path'], entry)
+
+    with phase('scan'):
+        entries = list_entries(src, template_type, ignore)
+    with phase('store'):
+        run_parallel(add_entry, ((entry, path) for entry, path in entries
+                                 if entry['type'] == 'file'), jobs)
+
+    placeholders = set()
+    for entry, _ in entries:
+        placeholders.update(entry.get('placeholders', ()))
+        placeholders.update(find_path_placeholders(entry['path']))
+        placeholders.update(find_path_placeholders(entry.get('target', '')))
+
+    return dict(format=MANIFEST_FORMAT, type=template_type,
+                created=time.time(), placeholders=sorted(placeholders),
+                entries=[entry for entry, _ in entries])
+
+def store_template(src, dest, template_type, jobs=None, mode='copy',
+                   resume=False, excludes=()):
+    """Saves a file or directory to the store as the template at dest
+
+    When dest already holds a manifest the template is synced with src:
+    only new or changed files are added to the store and the new manifest
+    replaces the old one atomically. Blobs that are no longer referenced
+    are left for collect_garbage.
+
+    The store is locked until the manifest is saved (see lock_store), so
+    collect_garbage waits for the create.
+
+    The files added to the store are recorded in a journal next to dest
+    (see app.journal), with resume the files an interrupted create already
+    added are not hashed again.
+
+    The entries of a directory matched by its `.scaffoldignore` file or by
+    excludes are left out (see app.ignore).
+
+    Parameters:
+        src (str): the path to create the template from
+        dest (str): the path of the template's manifest
+        template_type (str): `file` or `directory`
+        jobs (int): the number of threads adding files to the store
+        mode (str): how blobs are materialized, one of STORE_MODES
+        resume (bool): if truthy continue an interrupted create
+        excludes (iterable): gitignore-style patterns of the entries to
+            leave out of a directory
+
+    Returns:
+        dict: indicates whether the store operation threw an error, with
+            the counts of added, changed and removed entries
+
+    """
+
+    try:
+        previous = read_manifest(dest) if os.path.isfile(dest) else None
+        ignore = load_ignore_rules(src, excludes) \
+            if template_type == 'directory' else None
+        with lock_store(os.path.dirname(dest)):
+            with Journal(dest, os.path.abspath(src), resume) as journal:
+                manifest = build_manifest(src, template_type,
+                                          os.path.dirname(dest), jobs, mode,
+                                          previous, journal, ignore)
+            with phase('write_manifest'):
+                write_manifest(manifest, dest)
+        journal.finish()
+        return dict(is_successful=True,
+                    **compare_manifests(previous, manifest))
+
+    except (OSError, ValueError):
+        return {'is_successful': False}
+
+def store_directory(src, dest, jobs=None, mode='copy', resume=False,
+                    excludes=()):
+    """Saves a directory to the store as the template at dest
+
+    See store_template for how an existing template is synced.
+
+    Parameters:
+        jobs (int): the number of threads adding files to the store
+        mode (str): how blobs are materialized, one of STORE_MODES
+        resume (bool): if truthy continue an interrupted create
+        excludes (iterable): gitignore-style patterns of the entries to
+            leave out
+
+    Returns:
+        dict: indicates whether the store operation threw an error
+
+    """
+
+    return store_template(src, dest, 'directory', jobs, mode, resume,
+                          excludes)
+
+def store_file(src, dest, jobs=None, mode='copy', resume=False,
+               excludes=()):
+    """Saves a file to the store as the template at dest
+
+    See store_template for how an existing template is synced.
+
+    Parameters:
+        jobs (int): the number of threads adding files to the store
+        mode (str): how blobs are materialized, one of STORE_MODES
+        resume (bool): if truthy continue an interrupted create
+        excludes (iterable): accepted for compatibility with
+            store_directory
+
+    Returns:
+        dict: indicates whether the store operation threw an error
+
+    """
+
+    return store_template(src, dest, 'file', jobs, mode, resume)
+
+def get_store_function(path, template_format='store'):
+    """Returns the store function and type of a path
+
+    Attributes:
+        path (str): the path to retrieve the store function for
+        template_format (str): `store` to save the template in the template
+            store or `archive` to save it as a compressed archive
+
+    Returns:
+        (dict): if successful, contains the operation status, the path type,
+            the template format and a reference to the appropriate store
+            function. If unsuccessful, returns the operation status and a
+            message
+
+    """
+
+    if template_format == 'archive':
+        functions = {'file': archive_file, 'directory': archive_directory}
+    else:
+        functions = {'file': store_file, 'directory': store_directory}
+
+    if os.path.isfile(path):
+        return {'is_successful': True, 'type': 'file',
+                'format': template_format, 'execute': functions['file']}
+
+    if os.path.isdir(path):
+        return {'is_successful': True, 'type': 'directory',
+                'format': template_format,
+                'execute': functions['directory']}
+
+    message = ErrorMessage('directory_missing', path=path)
+    return {'is_successful': False, 'msg': message.get_message()}
+
+def restore_file(blob_path, path, entry, mode='copy', verify=False):
+    """Materializes a blob at path and restores the entry's mode and mtime
+
+    Links share the blob's inode, so their metadata is left untouched and
+    they stay read-only. With verify copies are hashed while they are
+    written and links hash their blob.
+
+    Raises:
+        app.fileops.ChecksumError: when verify finds that the blob doesn't
+            match the entry's hash
+
+    """
+
+    with phase('copy_data'):
+        if verify and mode not in LINK_MODES:
+            copy_verified(blob_path, path, entry['hash'], entry['path'])
+            materialized_mode = 'copy'
+        else:
+            materialized_mode = materialize_file(blob_path, path, mode)
+            if verify and hash_file(blob_path) != entry['hash']:
+                raise ChecksumError(entry['path'])
+    if materialized_mode not in LINK_MODES:
+        with phase('copy_metadata'):
+            os.chmod(path, entry['mode'])
+            os.utime(path, ns=(entry['mtime'], entry['mtime']))
+    add_file(path)
+
+def restore_template(src, dest, jobs=None, mode='copy', resume=False,
+                     variables=None, selection=None, verify=False):
+    """Rebuilds the template at src in dest from the store's blobs
+
+    Like shutil.copytree, dest must not exist yet. The directory skeleton
+    and the symlinks are created first, then the files are copied from
+    their blobs on a thread pool. File modes and modification times are
+    restored and symlinks are recreated as symlinks.
+
+    Files can also be hardlinked, reflinked or symlinked to their blobs
+    with mode (see app.fileops). Hardlinked and symlinked files are
+    read-only since every template and clone shares their blob.
+
+    Completed files are recorded in a journal next to dest (see
+    app.journal). With resume an existing dest is accepted and the files
+    the journal verifies are not copied again.
+
+    With variables the placeholders in paths and symlink targets are
+    replaced, and the files whose entry lists placeholders of the
+    variables are rendered (see app.variables) instead of materialized.
+
+    With a selection only the selected part of the template is restored
+    (see app.selection), the entries of other directories are skipped.
+
+    With verify every file is checked against the hash of its entry while
+    it is copied (see restore_file).
+
+    Parameters:
+        jobs (int): the number of threads copying files
+        mode (str): how each file is materialized
+        resume (bool): if truthy continue an interrupted restore
+        variables (dict): the value of every variable by name
+        selection (app.selection.Selection): the part of the template to
+            restore, all of it if None
+        verify (bool): if truthy check the hash of every file restored
+
+    Returns:
+        dict: indicates whether the restore operation threw an error, and
+            the path of the first file that doesn't match its hash
+
+    """
+
+    template_folder = get_template_folder(src)
+    variables = Variables(variables) if variables else None
+
+    try:
+        with phase('read_manifest'):
+            manifest = read_manifest(src)
+        os.makedirs(dest, exist_ok=resume)
+        identity = f'{os.path.abspath(src)}:{manifest["created"]}'
+        if variables is not None:
+            identity += f':{sorted(variables.values.items())}'
+        scanned = 'placeholders' in manifest
+
+        with Journal(dest, identity, resume) as journal:
+
+            def restore(blob_path, path, entry):
+                prepare_path(path, resume)
+                if variables is not None and \
+                        variables.applies_to(entry, scanned):
+                    if verify and hash_file(blob_path) != entry['hash']:
+                        raise ChecksumError(entry['path'])
+                    variables.render_file(blob_path, path)
+                    os.chmod(path, entry['mode'])
+                    os.utime(path, ns=(entry['mtime'], entry['mtime']))
+                    add_file(path)
+                else:
+                    restore_file(blob_path, path, entry, mode, verify)
+                journal.record_file(entry['path'], path)
+
+            directories = []
+            files = []
+            entries = manifest['entries'] if not selection else \
+                selection.select_entries(manifest['entries'])
+            with phase('scan'):
+                for entry in entries:
+                    relative_path = entry['path'] if variables is None \
+                        else variables.render_path(entry['path'])
+                    path = os.path.join(dest, relative_path)
+
+                    if entry['type'] == 'directory':
+                        with phase('mkdir'):
+                            os.makedirs(path, exist_ok=resume)
+                        directories.append((path, entry['mode']))
+                    elif entry['type'] == 'symlink':
+                        prepare_path(path, resume)
+                        os.symlink(entry['target'] if variables is None
+                                   else variables.render_text(
+                                       entry['target']), path)
+                    elif not journal.is_complete(entry['path'], path):
+                        blob_path = get_blob_path(template_folder,
+                                                  entry['hash'])
+                        files.append((blob_path, path, entry))
+
+            with phase('copy'):
+                run_parallel(restore, files, jobs)
+
+            with phase('directory_metadata'):
+                for path, directory_mode in reversed(directories):
+                    os.chmod(path, directory_mode)
+
+        journal.finish()
+        return {'is_successful': True}
+
+    except ChecksumError as error:
+        return {'is_successful': False, 'corrupted': error.path}
+
+    except (OSError, ValueError):
+        return {'is_successful': False}
+
+def get_referenced_blobs(template_folder):
+    """Returns the digests referenced by every stored template and version
+
+    The cached remote templates (see app.remote) keep their blobs too,
+    until they are evicted from the cache.
+
+    """
+
+    from app.remote import list_cached
+
+    paths = [os.path.join(template_folder, name)
+             for name in os.listdir(template_folder)
+             if not name.startswith('.')]
+    versions_folder = os.path.join(template_folder, STORE_FOLDER,
+                                   VERSIONS_FOLDER)
+    if os.path.isdir(versions_folder):
+        for name in os.listdir(versions_folder):
+            paths.extend(version['path'] for version
+                         in list_versions(template_folder, name))
+    paths.extend(list_cached(template_folder))
+
+    digests = set()
+    for template_path in paths:
+        try:
+            if get_template_format(template_path) != 'store':
+                continue
+            manifest = read_manifest(template_path)
+        except (OSError, ValueError):
+            continue
+        digests.update(entry['hash'] for entry in manifest['entries']
+                       if entry['type'] == 'file')
+    return digests
+
+@timed
+def collect_garbage(template_folder, grace=0):
+    """Removes the blobs that no template references
+
+    The store is locked exclusively (see lock_store), so the running creates
+    finish first and the manifests are read once they are saved. Blobs
+    whose inode changed less than grace seconds ago are kept too.
+
+    Parameters:
+        template_folder (str): the folder that templates currently live
+        grace (float): the age in seconds under which unreferenced blobs
+            are kept
+
+    Returns:
+        dict: indicates whether the operation threw an error and the number
+            of blobs removed
+
+    """
+
+    objects_folder = os.path.join(template_folder, STORE_FOLDER, 'objects')
+    removed = 0
+
+    try:
+        if not os.path.isdir(objects_folder):
+            return {'is_successful': True, 'removed': removed}
+
+        with lock_store(template_folder, exclusive=True):
+            referenced = get_referenced_blobs(template_folder)
+            cutoff = time.time() - grace
+            for prefix in os.listdir(objects_folder):
+                prefix_folder = os.path.join(objects_folder, prefix)
+                for suffix in os.listdir(prefix_folder):
+                    if prefix + suffix in referenced:
+                        continue
+                    blob_path = os.path.join(prefix_folder, suffix)
+                    try:
+                        if grace and os.stat(blob_path).st_ctime > cutoff:
+                            continue
+                        os.remove(blob_path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+
+        return {'is_successful': True, 'removed': removed}
+
+    except OSError:
+        return {'is_successful': False, 'removed': removed}
@@ -0,0 +1,178 @@
+"""This module contains the timings instrumentation of the engines.
+
+The engines time their phases (walking the tree, creating directories,
+copying data, copying metadata, ...) and count the files and bytes they
+write. Nothing is recorded unless the engines are called inside
+recording(), which is what the `--profile` option of the command group
+uses. Library callers can use it the same way:
+
+    with recording() as timings:
+        clone_template(...)
+    log(timings.to_dict())
+
+Phases can nest, e.g. `mkdir` is part of `scan`. Phases that run on a
+thread pool, such as `copy_data`, are summed over the threads, so they
+can add up to more than the wall time of the operation.
+
+- recording: Records the timings of the engines called inside it
+- phase: Times a phase while recording
+- timed: Decorates an engine to time it as a phase
+- add_file: Counts a written file while recording
+
+"""
+
+import contextlib
+import functools
+import os
+import threading
+import time
+
+
+_recorder = None
+
+
+class Timings():
+    """The timings recorded by recording()
+
+    Attributes:
+        phases (dict): the call count and total seconds of every phase
+        files (int): the number of files written
+        size (int): the number of bytes written
+        elapsed (float): the seconds between the start and the end of the
+            recording, None while recording
+
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.files = 0
+        self.size = 0
+        self.elapsed = None
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def add_phase(self, name, seconds):
+        """Adds a call of a phase that took seconds"""
+        with self.lock:
+            calls, total = self.phases.get(name, (0, 0.0))
+            self.phases[name] = (calls + 1, total + seconds)
+
+    def add_file(self, size):
+        """Counts a written file of size bytes"""
+        with self.lock:
+            self.files += 1
+            self.size += size
+
+    def stop(self):
+        """Ends the recording"""
+        self.elapsed = time.perf_counter() - self.started
+
+    def to_dict(self):
+        """Returns the timings as a JSON serializable dict
+
+        Returns:
+            dict: the elapsed seconds, the calls and seconds of every
+                phase, the file and byte counts and the throughput in files
+                and MB per second
+
+        """
+
+        elapsed = self.elapsed if self.elapsed is not None else \
+            time.perf_counter() - self.started
+        return dict(
+            elapsed=elapsed,
+            phases={name: dict(calls=calls, seconds=seconds)
+                    for name, (calls, seconds) in self.phases.items()},
+            files=self.files, bytes=self.size,
+            files_per_sec=self.files / elapsed if elapsed else 0.0,
+            mb_per_sec=self.size / elapsed / 1e6 if elapsed else 0.0)
+
+    def format_summary(self):
+        """Returns the lines of a readable summary of the timings"""
+        timings = self.to_dict()
+        phases = sorted(timings['phases'].items(),
+                        key=lambda item: -item[1]['seconds'])
+        width = max([len('total')] + [len(name) for name, _ in phases])
+        lines = [f'{name:<{width}} {phase["calls"]:>8} calls '
+                 f'{phase["seconds"] * 1000:>10.2f}ms'
+                 for name, phase in phases]
+        lines.append(f'{"total":<{width}} '
+                     f'{timings["elapsed"] * 1000:>25.2f}ms')
+        lines.append(f'{timings["files"]} files, {timings["bytes"]} bytes, '
+                     f'{timings["files_per_sec"]:.0f} files/s, '
+                     f'{timings["mb_per_sec"]:.1f} MB/s')
+        return lines
+
+class Phase():
+    """Times a phase and adds it to the timings when it ends"""
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.timings.add_phase(self.name, time.perf_counter() - self.started)
+
+class NoPhase():
+    """Stands in for Phase when nothing is recorded"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+NO_PHASE = NoPhase()
+
+
+@contextlib.contextmanager
+def recording(callback=None):
+    """Records the timings of the engines called inside the context
+
+    Recording is process wide, so that phases running on the engines'
+    thread pools are recorded too. A nested recording replaces the outer
+    one until it ends.
+
+    Parameters:
+        callback (func): called with the Timings when the recording ends
+
+    Yields:
+        Timings: the timings being recorded
+
+    """
+
+    global _recorder
+    timings = Timings()
+    previous, _recorder = _recorder, timings
+    try:
+        yield timings
+    finally:
+        _recorder = previous
+        timings.stop()
+        if callback is not None:
+            callback(timings)
+
+def phase(name):
+    """Returns a context manager timing the phase name while recording"""
+    timings = _recorder
+    return NO_PHASE if timings is None else Phase(timings, name)
+
+def timed(function):
+    """Decorates a function to time every call as a phase named after it"""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with phase(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+def add_file(path):
+    """Counts the file written at path while recording"""
+    timings = _recorder
+    if timings is not None:
+        timings.add_file(os.lstat(path).st_size)
@@ -0,0 +1,146 @@
+"""This module contains the trash of the template folder.
+
+Deleting a template, or replacing one that isn't stored with `create
+--force`, renames it into the trash inside the template store, which is
+instant however many files the template holds. The trash is hidden, so
+trashed templates are never listed, and its space is reclaimed later:
+by a background process the commands start, by the daemon or by
+`scaffold gc`. Reclaiming also removes the blobs that no template
+references anymore, once the running creates saved their manifests (see
+app.store.lock_store).
+
+- move_to_trash: Renames a template into the trash
+- empty_trash: Removes every trashed template
+- reclaim: Empties the trash and collects the store's garbage
+- start_reclaim: Reclaims the space in a background process
+
+Running this module reclaims the space of the template folder passed as
+its argument, which is what start_reclaim does:
+
+    python -m app.trash TEMPLATE_FOLDER
+
+Attributes:
+    TRASH_FOLDER (str): the name of the trash inside the template store
+    VERSIONS_SUFFIX (str): ends the names of trashed template versions,
+        which are not counted as deleted templates
+    RECLAIM_GRACE (float): the age in seconds under which unreferenced
+        blobs are kept
+
+"""
+
+import os
+import shutil
+import sys
+import uuid
+from app.index import STORE_FOLDER
+
+
+TRASH_FOLDER = 'trash'
+VERSIONS_SUFFIX = '.versions'
+RECLAIM_GRACE = 60.0
+
+
+def get_trash_path(template_folder):
+    """Returns the path of the trash of a template folder"""
+    return os.path.join(template_folder, STORE_FOLDER, TRASH_FOLDER)
+
+def move_to_trash(template_path, template_folder=None, suffix=''):
+    """Renames a template into the trash of its template folder
+
+    Parameters:
+        template_path (str): the template, or another path of the template
+            folder such as the versions of a template
+        template_folder (str): the template folder, the folder holding
+            template_path if None
+        suffix (str): added to the name in the trash, VERSIONS_SUFFIX for
+            the versions of a template
+
+    Returns:
+        str: the path of the template in the trash
+
+    Raises:
+        OSError: when the template can't be renamed
+
+    """
+
+    folder, name = os.path.split(os.path.normpath(template_path))
+    trash_path = get_trash_path(template_folder or folder)
+    os.makedirs(trash_path, exist_ok=True)
+
+    trashed_path = os.path.join(trash_path,
+                                f'{name}.{uuid.uuid4().hex}{suffix}')
+    os.rename(template_path, trashed_path)
+    return trashed_path
+
+def empty_trash(template_folder):
+    """Removes every template in the trash of a template folder
+
+    Returns:
+        dict: indicates whether the operation threw an error and the number
+            of trashed templates removed, not counting their versions
+
+    """
+
+    trash_path = get_trash_path(template_folder)
+    removed = 0
+
+    try:
+        names = os.listdir(trash_path) if os.path.isdir(trash_path) else []
+        for name in names:
+            path = os.path.join(trash_path, name)
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            if not name.endswith(VERSIONS_SUFFIX):
+                removed += 1
+        return {'is_successful': True, 'removed': removed}
+
+    except FileNotFoundError:
+        return {'is_successful': True, 'removed': removed}
+    except OSError:
+        return {'is_successful': False, 'removed': removed}
+
+def reclaim(template_folder, grace=RECLAIM_GRACE):
+    """Empties the trash and removes the blobs no template references
+
+    Parameters:
+        template_folder (str): the folder that templates currently live
+        grace (float): the age in seconds under which unreferenced blobs
+            are kept
+
+    Returns:
+        dict: indicates whether the operation threw an error, the number
+            of trashed templates removed and the number of blobs removed
+
+    """
+
+    from app.store import collect_garbage
+
+    trash_status = empty_trash(template_folder)
+    garbage_status = collect_garbage(template_folder, grace)
+    return dict(is_successful=trash_status['is_successful']
+                and garbage_status['is_successful'],
+                templates=trash_status['removed'],
+                blobs=garbage_status['removed'])
+
+def start_reclaim(template_folder):
+    """Reclaims the space of a template folder in a background process
+
+    The process is detached, so the command that started it can exit
+    right away.
+
+    """
+
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, '-m', 'app.trash',
+         os.path.abspath(template_folder)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+if __name__ == '__main__':
+    reclaim(sys.argv[1])
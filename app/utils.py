@@ -1,50 +1,224 @@
-"""This module contains the utilities used throughout the application"""
+"""This module contains the utilities used throughout the application
+
+Attributes:
+    DEFAULT_JOBS (int): the number of threads used to copy files when no
+        job count is supplied
+    GZIP_MAGIC (bytes): the first bytes of a gzip compressed archive
+    LZMA_MAGIC (bytes): the first bytes of an lzma (xz) compressed archive
+
+"""
 
-import shutil
 import os
 from app.messages import ErrorMessage
+from app.timings import phase, timed, add_file
+
+
+DEFAULT_JOBS = min(32, (os.cpu_count() or 1) + 4)
+GZIP_MAGIC = b'\x1f\x8b'
+LZMA_MAGIC = b'\xfd7zXZ\x00'
+
+
+def run_parallel(function, arguments, jobs=None):
+    """Calls a function with every tuple of arguments on a thread pool
+
+    The pool holds at most `jobs` threads. When a call raises, the calls
+    that have not started yet are cancelled and the error is re-raised.
+
+    Parameters:
+        function (func): the function to call
+        arguments (iterable): a tuple of positional arguments per call
+        jobs (int): the number of threads, DEFAULT_JOBS if None
+
+    """
+
+    jobs = jobs or DEFAULT_JOBS
+    if jobs == 1:
+        for args in arguments:
+            function(*args)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(function, *args) for args in arguments]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+def copy_file(src, dest, mode='copy'):
+    """Copies a file with the supplied mode (see app.fileops)
+
+    Like shutil.copy2 the file's metadata is copied too, unless dest is a
+    link that shares the source's inode.
+
+    """
+
+    import shutil
+    from app.fileops import materialize_file, LINK_MODES
+
+    with phase('copy_data'):
+        materialized_mode = materialize_file(src, dest, mode)
+    if materialized_mode not in LINK_MODES:
+        with phase('copy_metadata'):
+            shutil.copystat(src, dest)
+    add_file(dest)
+
+def copy_tree(src, dest, jobs=None, mode='copy', resume=False,
+              selection=None):
+    """Copies a directory tree like shutil.copytree(src, dest, symlinks=True)
+
+    The tree is walked once with os.scandir. The directory skeleton and the
+    symlinks are created first, then the files are copied with copy_file
+    on a thread pool, and finally the directories' metadata is copied
+    deepest first so that read-only directories can still be filled.
+
+    Completed files are recorded in a journal next to dest (see
+    app.journal). With resume an existing dest is accepted and the files
+    the journal verifies are not copied again.
+
+    With a selection only the selected part of the tree is copied (see
+    app.selection) and the directories that can't hold a selected path are
+    never walked.
+
+    Parameters:
+        src (str): the directory to copy
+        dest (str): the directory to create, which must not exist unless
+            resume is truthy
+        jobs (int): the number of threads copying files
+        mode (str): how each file is materialized, see app.fileops
+        resume (bool): if truthy continue an interrupted copy
+        selection (app.selection.Selection): the part of the tree to copy,
+            all of it if None
+
+    """
+
+    import shutil
+    from app.journal import Journal, prepare_path
+
+    os.makedirs(dest, exist_ok=resume)
+
+    with Journal(dest, os.path.abspath(src), resume) as journal:
+
+        def copy(path, target, relative_path):
+            prepare_path(target, resume)
+            copy_file(path, target, mode)
+            journal.record_file(relative_path, target)
+
+        directories = [(src, dest)]
+        files = []
+
+        entries = scan_tree(src)
+        if selection:
+            entries = selection.select(
+                (relative_path, entry.is_dir(follow_symlinks=False), entry)
+                for relative_path, entry in scan_tree(src, selection))
 
+        with phase('scan'):
+            for relative_path, entry in entries:
+                target = os.path.join(dest, relative_path)
 
-def clone_directory(src, dest):
+                if entry.is_symlink():
+                    prepare_path(target, resume)
+                    os.symlink(os.readlink(entry.path), target)
+                    shutil.copystat(entry.path, target, follow_symlinks=False)
+                elif entry.is_dir():
+                    with phase('mkdir'):
+                        os.makedirs(target, exist_ok=resume)
+                    directories.append((entry.path, target))
+                elif not journal.is_complete(relative_path, target):
+                    files.append((entry.path, target, relative_path))
+
+        with phase('copy'):
+            run_parallel(copy, files, jobs)
+
+        with phase('directory_metadata'):
+            for directory, target in reversed(directories):
+                shutil.copystat(directory, target)
+
+    journal.finish()
+
+def clone_directory(src, dest, jobs=None, mode='copy', resume=False,
+                    selection=None):
     """Clones a directory from the source to the destination
 
+    Parameters:
+        jobs (int): the number of threads copying files
+        mode (str): how each file is materialized, see app.fileops
+        resume (bool): if truthy continue an interrupted clone
+        selection (app.selection.Selection): the part of the directory to
+            clone, all of it if None
+
     Returns:
         dict: indicates whether the clone operation threw an error
 
     """
 
     try:
-        shutil.copytree(src, dest, symlinks=True)
+        copy_tree(src, dest, jobs, mode, resume, selection)
         return {'is_successful': True}
 
     except OSError:
         return {'is_successful': False}
 
-def clone_file(src, dest):
+def clone_file(src, dest, jobs=None, mode='copy', resume=False,
+               selection=None):
     """Clones a file from the source to the destination
 
+    Parameters:
+        jobs (int): accepted for compatibility with clone_directory
+        mode (str): how the file is materialized, see app.fileops
+        resume (bool): accepted for compatibility with clone_directory, a
+            single file is always copied again
+        selection (app.selection.Selection): accepted for compatibility
+            with clone_directory
+
     Returns:
         dict: indicates whether the clone operation threw an error
 
     """
 
+    import shutil
+    from app.fileops import materialize_file, is_large_file, LINK_MODES
+
     try:
-        shutil.copy(src, dest)
+        if mode == 'copy' and not is_large_file(src):
+            shutil.copy(src, dest)
+        else:
+            if os.path.isdir(dest):
+                dest = os.path.join(dest, os.path.basename(src))
+            if materialize_file(src, dest, mode) not in LINK_MODES:
+                shutil.copymode(src, dest)
         return {'is_successful': True}
 
     except OSError:
         return {'is_successful': False}
 
+@timed
 def delete_template(name, path):
     """Deletes a template
 
+    The template is renamed into the template folder's trash, whose space
+    is reclaimed later (see app.trash), so deleting takes the same time
+    however many files the template holds. The template's versions (see
+    app.versions) are moved to the trash with it.
+
     Returns:
         dict: indicates whether the delete operation threw an error
 
     """
-    directory = os.path.join(path, name)
+
+    from app.trash import move_to_trash, VERSIONS_SUFFIX
+    from app.versions import get_versions_path
+
     try:
-        shutil.rmtree(directory)
+        move_to_trash(os.path.join(path, name))
+        versions_path = get_versions_path(path, name)
+        if os.path.isdir(versions_path):
+            move_to_trash(versions_path, path, VERSIONS_SUFFIX)
         return {'is_successful': True}
 
     except OSError:
@@ -92,3 +266,73 @@ def get_clone_function(path):
 
     message = ErrorMessage('directory_missing', path=path)
     return {'is_successful': False, 'msg': message.get_message()}
+
+def get_template_format(template_path):
+    """Returns the storage format of a template
+
+    Templates saved before the template store existed are plain directory
+    trees, stored templates are a manifest file that references the
+    store's blobs and archive templates are a compressed tarfile.
+
+    Parameters:
+        template_path (str): the path of the template
+
+    Returns:
+        str: `store` for a manifest, `archive` for a compressed tarfile,
+            otherwise `directory`
+
+    """
+
+    if not os.path.isfile(template_path):
+        return 'directory'
+
+    with open(template_path, 'rb') as file_:
+        magic = file_.read(len(LZMA_MAGIC))
+    if magic.startswith(GZIP_MAGIC) or magic == LZMA_MAGIC:
+        return 'archive'
+    return 'store'
+
+def scan_tree(root, ignore=None):
+    """Walks a directory tree with os.scandir
+
+    Directories are yielded before their contents and the entries of every
+    directory are sorted by name so the walk is repeatable. Symlinks are
+    yielded but never followed. Ignored entries are skipped and ignored
+    directories are never descended into.
+
+    Parameters:
+        root (str): the directory to walk
+        ignore (app.ignore.IgnoreRules): the rules of the ignored entries,
+            nothing is ignored if None
+
+    Yields:
+        tuple: the path relative to root and the os.DirEntry of each entry
+
+    """
+
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        with os.scandir(os.path.join(root, relative_dir)) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+
+        subdirectories = []
+        for entry in entries:
+            relative_path = os.path.join(relative_dir, entry.name)
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if ignore is not None and ignore.is_ignored(relative_path,
+                                                        is_dir):
+                continue
+            yield relative_path, entry
+            if is_dir:
+                subdirectories.append(relative_path)
+
+        stack.extend(reversed(subdirectories))
+
+def format_size(size):
+    """Returns a byte count as a human readable size, e.g. 1.5 MB"""
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024 or unit == 'TB':
+            break
+        size /= 1024
+    return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
@@ -0,0 +1,195 @@
+"""This module contains the variable substitution of cloned templates.
+
+Templates can hold placeholders such as `{{project}}` or `{{ package }}`
+in their file contents and path names. Cloning with variables replaces
+every placeholder whose name is a variable by its value while the files
+are written, placeholders of other names are left untouched.
+
+The template store finds the placeholders of every file while hashing it
+at create time and lists their names in the file's manifest entry, so
+that a clone only renders the files that hold placeholders of its
+variables and copies every other file with the fast copy path. Files are
+rendered a chunk at a time and never loaded whole.
+
+- PlaceholderScanner: Finds the placeholder names in chunks of a file
+- Variables: Renders placeholders in paths, contents and files
+- read_variables: Parses the variables supplied to the clone command
+
+Attributes:
+    PLACEHOLDER (re.Pattern): matches a placeholder in file contents
+    PATH_PLACEHOLDER (re.Pattern): matches a placeholder in a path
+    MAX_PLACEHOLDER (int): the length of the longest placeholder
+    RENDER_CHUNK_SIZE (int): the number of bytes read at a time when
+        rendering a file
+
+"""
+
+import json
+import os
+import re
+from app.timings import phase
+
+
+PLACEHOLDER = re.compile(rb'\{\{ ?([A-Za-z_][A-Za-z0-9_]{0,63}) ?\}\}')
+PATH_PLACEHOLDER = re.compile(PLACEHOLDER.pattern.decode())
+MAX_PLACEHOLDER = 70
+RENDER_CHUNK_SIZE = 1024 * 1024
+
+
+class PlaceholderScanner():
+    """Finds the placeholder names in the chunks of a file
+
+    Chunks are passed to update in order, a placeholder split between two
+    chunks is found too.
+
+    Attributes:
+        names (set): the placeholder names found so far
+
+    """
+
+    def __init__(self):
+        self.names = set()
+        self.tail = b''
+
+    def update(self, chunk):
+        """Scans the next chunk of the file"""
+        data = self.tail + chunk
+        if b'{{' in data:
+            self.names.update(name.decode()
+                              for name in PLACEHOLDER.findall(data))
+        self.tail = data[-MAX_PLACEHOLDER:]
+
+def find_path_placeholders(path):
+    """Returns the placeholder names in a path"""
+    return set(PATH_PLACEHOLDER.findall(path))
+
+class Variables():
+    """Renders the placeholders of variables
+
+    Arguments:
+        values (dict): the value of every variable by name
+
+    Raises:
+        ValueError: when a name is not a valid placeholder name
+
+    """
+
+    def __init__(self, values):
+        for name in values:
+            if not PATH_PLACEHOLDER.fullmatch(f'{{{{{name}}}}}'):
+                raise ValueError(f'{name} is not a valid variable name.')
+        self.values = {name: str(value) for name, value in values.items()}
+        self.encoded = {name.encode(): value.encode()
+                        for name, value in self.values.items()}
+
+    def applies_to(self, entry, scanned=True):
+        """Returns whether the contents of a file entry must be rendered
+
+        Parameters:
+            entry (dict): a file's manifest entry
+            scanned (bool): if falsy the manifest was saved before
+                placeholders were listed and every file is rendered
+
+        """
+
+        return not scanned or any(name in self.values
+                                  for name in entry.get('placeholders', ()))
+
+    def render_bytes(self, data):
+        """Returns data with the placeholders of the variables replaced"""
+        return PLACEHOLDER.sub(
+            lambda match: self.encoded.get(match.group(1), match.group(0)),
+            data)
+
+    def render_text(self, text):
+        """Returns text, e.g. a symlink target, with placeholders replaced"""
+        return PATH_PLACEHOLDER.sub(
+            lambda match: self.values.get(match.group(1), match.group(0)),
+            text)
+
+    def render_path(self, path):
+        """Returns a relative path with its placeholders replaced
+
+        Raises:
+            ValueError: when a rendered component is empty, `.`, `..` or
+                holds a path separator
+
+        """
+
+        if '{{' not in path:
+            return path
+
+        components = []
+        for component in path.split(os.sep):
+            rendered = self.render_text(component)
+            if rendered in ('', '.', '..') or os.sep in rendered or \
+                    (os.altsep and os.altsep in rendered):
+                raise ValueError(f'{path} renders to an invalid path.')
+            components.append(rendered)
+        return os.path.join(*components)
+
+    def render_file(self, src, dest):
+        """Writes the file at src to dest with its placeholders replaced
+
+        The file is read a chunk at a time. The end of every chunk that
+        could hold the start of a placeholder is kept for the next one.
+
+        """
+
+        with phase('render'):
+            with open(src, 'rb') as source_file, open(dest, 'wb') as file_:
+                pending = b''
+                for chunk in iter(
+                        lambda: source_file.read(RENDER_CHUNK_SIZE), b''):
+                    data = pending + chunk
+                    cut = max(0, len(data) - MAX_PLACEHOLDER)
+                    for match in PLACEHOLDER.finditer(
+                            data, max(0, cut - MAX_PLACEHOLDER)):
+                        if match.start() < cut < match.end():
+                            cut = match.end()
+                            break
+                    file_.write(self.render_bytes(data[:cut]))
+                    pending = data[cut:]
+                file_.write(self.render_bytes(pending))
+
+def read_variables(pairs=(), vars_file=None):
+    """Parses the variables supplied to the clone command
+
+    The vars file is either a JSON object or has a `name=value` line per
+    variable, blank lines and lines starting with # are ignored. Variables
+    supplied as pairs override the ones of the file.
+
+    Parameters:
+        pairs (iterable): `name=value` strings
+        vars_file (str): the path of the vars file, or None
+
+    Returns:
+        dict: the value of every variable by name
+
+    Raises:
+        OSError: when the vars file can't be read
+        ValueError: when a variable or the vars file is not valid
+
+    """
+
+    values = {}
+    if vars_file is not None:
+        with open(vars_file) as file_:
+            contents = file_.read()
+        if vars_file.endswith('.json'):
+            values = json.loads(contents)
+            if not isinstance(values, dict):
+                raise ValueError(f'{vars_file} must hold a JSON object.')
+        else:
+            pairs = [line.strip() for line in contents.splitlines()
+                     if line.strip() and not line.strip().startswith('#')] \
+                + list(pairs)
+
+    for pair in pairs:
+        name, separator, value = pair.partition('=')
+        if not separator:
+            raise ValueError(f'{pair} is not a name=value pair.')
+        values[name.strip()] = value
+
+    Variables(values)
+    return {name: str(value) for name, value in values.items()}
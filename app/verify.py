@@ -0,0 +1,323 @@
+"""This module contains the integrity verification of templates.
+
+Every template records the hash of its files when it is created: the
+manifest of a stored template lists the sha256 hash of the blob of every
+file, and the last member of an archive template lists the hashes of its
+members (see app.archive). Verifying a template hashes its files again
+and reports the files whose contents changed and the files that are
+missing, before a clone produces a broken project.
+
+The files are hashed on a pool of processes, the blobs in batches and
+every archive, which can only be read from its start, on its own. The
+size, mtime and inode of every blob and archive found intact are recorded
+in `.store/verified.json`, and a later verify doesn't hash them again
+while they match, unless it is deep. Blobs are shared between templates,
+so every blob is hashed at most once however many templates use it.
+
+Directory templates, which predate the template store, record no hashes
+and can't be verified.
+
+- hash_blobs: Hashes a batch of blobs, in a worker process
+- hash_archive: Hashes the members of an archive, in a worker process
+- verify: Verifies templates and returns what changed in each
+
+Attributes:
+    RECORD_NAME (str): the name of the record of the verified files
+        inside the store folder
+    BATCH_SIZE (int): the number of bytes of blobs hashed by a task
+    BATCH_FILES (int): the maximum number of blobs hashed by a task
+
+"""
+
+import json
+import os
+import tarfile
+import uuid
+from app.index import STORE_FOLDER
+from app.timings import phase
+
+
+RECORD_NAME = 'verified.json'
+BATCH_SIZE = 16 * 1024 * 1024
+BATCH_FILES = 256
+
+
+def get_record_path(template_folder):
+    """Returns the path of the record of the verified files"""
+    return os.path.join(template_folder, STORE_FOLDER, RECORD_NAME)
+
+def load_record(template_folder):
+    """Returns the stat of every blob and archive found intact so far
+
+    Returns:
+        dict: the blobs by digest and the archives by template name, each
+            with the [size, mtime, inode] they had when they were verified
+
+    """
+
+    try:
+        with open(get_record_path(template_folder)) as file_:
+            record = json.load(file_)
+        return dict(blobs=dict(record['blobs']),
+                    archives=dict(record['archives']))
+    except (OSError, ValueError, KeyError, TypeError):
+        return dict(blobs={}, archives={})
+
+def save_record(template_folder, record):
+    """Atomically saves the record of the verified files"""
+    record_path = get_record_path(template_folder)
+    os.makedirs(os.path.dirname(record_path), exist_ok=True)
+    temp_path = f'{record_path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'w') as file_:
+        json.dump(record, file_)
+    os.replace(temp_path, record_path)
+
+def get_stat_key(file_stat):
+    """Returns the [size, mtime, inode] a file is recorded with"""
+    return [file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino]
+
+def hash_blobs(paths):
+    """Returns the sha256 hash of every file, or None for unreadable files
+
+    Runs in a worker process.
+
+    """
+
+    from app.store import hash_file
+
+    digests = []
+    for path in paths:
+        try:
+            digests.append(hash_file(path))
+        except OSError:
+            digests.append(None)
+    return digests
+
+def hash_archive(template_path):
+    """Hashes the members of an archive template
+
+    Runs in a worker process. The compression's checksums are checked
+    while the archive is read.
+
+    Returns:
+        dict: the hash of every file read by path, the hashes recorded in
+            the archive, the paths of the files its index lists and
+            whether the archive could be read to its end
+
+    """
+
+    import hashlib
+    from app.archive import HASHES_NAME, MEMBERS_NAME
+    from app.fileops import BUFFER_SIZE
+
+    result = dict(digests={}, recorded={}, files=[], is_readable=False)
+    try:
+        with tarfile.open(template_path, 'r|*') as archive:
+            for member in archive:
+                if member.name == MEMBERS_NAME:
+                    result['files'] = [
+                        entry['path'] for entry in
+                        json.load(archive.extractfile(member))['entries']
+                        if entry['type'] == 'file']
+                elif member.name == HASHES_NAME:
+                    result['recorded'] = json.load(
+                        archive.extractfile(member))
+                elif member.isfile():
+                    digest = hashlib.sha256()
+                    file_ = archive.extractfile(member)
+                    for chunk in iter(lambda: file_.read(BUFFER_SIZE), b''):
+                        digest.update(chunk)
+                    result['digests'][member.name] = digest.hexdigest()
+        result['is_readable'] = True
+    except (OSError, ValueError, KeyError, EOFError, tarfile.TarError):
+        pass
+    return result
+
+def batch_blobs(blobs):
+    """Splits (digest, path, size) tuples into batches to hash"""
+    batch, batch_size = [], 0
+    for blob in blobs:
+        batch.append(blob)
+        batch_size += blob[2]
+        if batch_size >= BATCH_SIZE or len(batch) >= BATCH_FILES:
+            yield batch
+            batch, batch_size = [], 0
+    if batch:
+        yield batch
+
+def run_tasks(tasks, jobs=None):
+    """Runs (function, argument) tasks on a process pool
+
+    The tasks run in this process when there is a single task or a single
+    job.
+
+    Returns:
+        list: the result of every task, in the order of tasks
+
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        return [function(argument) for function, argument in tasks]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        futures = [executor.submit(function, argument)
+                   for function, argument in tasks]
+        return [future.result() for future in futures]
+
+def read_template(template_folder, name):
+    """Returns the path, the format and the hashed files of a template
+
+    Returns:
+        tuple: the template's path and format, and for a stored template
+            the (path, hash, size) of each of its files
+
+    Raises:
+        OSError: when the template can't be read
+        ValueError: when its manifest is invalid
+
+    """
+
+    from app.manifest import read_manifest
+    from app.utils import get_template_format
+    from app.versions import resolve_template
+
+    template_path = resolve_template(template_folder, name)
+    template_format = get_template_format(template_path)
+    if template_format != 'store':
+        return template_path, template_format, []
+    return template_path, template_format, [
+        (entry['path'], entry['hash'], entry['size'])
+        for entry in read_manifest(template_path)['entries']
+        if entry['type'] == 'file']
+
+def verify(template_folder, names, deep=False, jobs=None):
+    """Verifies templates against the hashes recorded when they were created
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        names (list): the names of the templates to verify, which must
+            exist, or `name@v<N>` for a version
+        deep (bool): if truthy hash every file, even those recorded intact
+            with the same size, mtime and inode
+        jobs (int): the number of processes hashing files, the number of
+            CPUs if None
+
+    Returns:
+        list: a dict per template with its name, format, number of files
+            and of files hashed, the paths of its missing and changed
+            files, and whether it is intact, None for directory templates
+
+    Raises:
+        OSError: when a template can't be read
+        ValueError: when a manifest is invalid
+
+    """
+
+    from app.archive import MEMBERS_NAME, read_members
+    from app.store import get_blob_path
+
+    record = load_record(template_folder)
+    templates, blobs, archives, tasks, owners = [], {}, {}, [], []
+
+    with phase('scan'):
+        for name in names:
+            template_path, template_format, files = read_template(
+                template_folder, name)
+            templates.append((name, template_format, files))
+
+            for _, digest, size in files:
+                if digest in blobs:
+                    continue
+                blob_path = get_blob_path(template_folder, digest)
+                try:
+                    key = get_stat_key(os.stat(blob_path))
+                except FileNotFoundError:
+                    blobs[digest] = dict(state='missing')
+                    continue
+                if key[0] != size:
+                    blobs[digest] = dict(state='changed')
+                elif not deep and record['blobs'].get(digest) == key:
+                    blobs[digest] = dict(state='intact', key=key)
+                else:
+                    blobs[digest] = dict(state='hashed', key=key,
+                                         path=blob_path, size=size)
+
+            if template_format == 'archive':
+                key = get_stat_key(os.stat(template_path))
+                archives[name] = dict(key=key, result=None)
+                if not deep and record['archives'].get(name) == key:
+                    archives[name]['files'] = [
+                        entry['path'] for entry
+                        in read_members(template_path)['entries']
+                        if entry['type'] == 'file']
+                else:
+                    tasks.append((hash_archive, template_path))
+                    owners.append(name)
+
+    for batch in batch_blobs((digest, blob['path'], blob['size'])
+                             for digest, blob in sorted(blobs.items())
+                             if blob['state'] == 'hashed'):
+        tasks.append((hash_blobs, [path for _, path, _ in batch]))
+        owners.append(batch)
+
+    with phase('hash'):
+        results = run_tasks(tasks, jobs)
+
+    for owner, result in zip(owners, results):
+        if isinstance(owner, str):
+            archives[owner].update(result=result, files=result['files'])
+            continue
+        for (digest, _, _), computed in zip(owner, result):
+            if computed != digest:
+                blobs[digest]['state'] = 'changed'
+
+    reports = []
+    for name, template_format, files in templates:
+        report = dict(template=name, format=template_format, files=0,
+                      hashed=0, missing=[], changed=[], is_intact=None)
+        if template_format == 'store':
+            report['files'] = len(files)
+            for path, digest, _ in files:
+                state = blobs[digest]['state']
+                if state in ('missing', 'changed'):
+                    report[state].append(path)
+                if 'path' in blobs[digest]:
+                    report['hashed'] += 1
+
+        elif template_format == 'archive':
+            archive = archives[name]
+            result = archive['result']
+            report['files'] = len(archive['files'])
+            if result is not None:
+                report['hashed'] = len(result['digests'])
+                for path in archive['files']:
+                    digest = result['digests'].get(path)
+                    if digest is None:
+                        report['missing' if result['is_readable']
+                               else 'changed'].append(path)
+                    elif result['recorded'] and \
+                            result['recorded'].get(path) != digest:
+                        report['changed'].append(path)
+                if not result['is_readable'] and not report['changed']:
+                    report['changed'].append(MEMBERS_NAME)
+
+        if template_format != 'directory':
+            report['is_intact'] = not report['missing'] and \
+                not report['changed']
+        if template_format == 'archive':
+            if report['is_intact']:
+                record['archives'][name] = archives[name]['key']
+            else:
+                record['archives'].pop(name, None)
+        reports.append(report)
+
+    for digest, blob in blobs.items():
+        if blob['state'] in ('intact', 'hashed'):
+            record['blobs'][digest] = blob['key']
+        else:
+            record['blobs'].pop(digest, None)
+    save_record(template_folder, record)
+    return reports
@@ -0,0 +1,184 @@
+"""This module contains the versions of templates.
+
+Every create of a stored or archive template records a version: the
+template's file is hardlinked into `.store/versions/<name>/v<N>`. Stored
+templates are small manifests that reference the store's blobs, so a
+version only costs its manifest plus the blobs of the files it added,
+and every version can still be cloned as `<name>@v<N>`. Template files
+are always replaced and never written in place, so a version is never
+changed by a later create.
+
+The current version of a template is the one that shares the inode of
+the template's file. Rolling back hardlinks an older version in place of
+the template's file, which takes the same time whatever the size of the
+template. Deleting a template moves its versions to the trash with it.
+
+Directory templates, which predate the template store, have no versions.
+
+- get_template_folder: Returns the template folder of a template or version
+- resolve_template: Returns the path of a template or of one of its versions
+- list_versions: Lists the versions of a template
+- record_version: Records the current template file as a version
+- rollback: Makes a version the current template
+
+Attributes:
+    VERSIONS_FOLDER (str): the name of the folder of the versions inside
+        the template store
+    VERSION_NAME (re.Pattern): matches a `name@v<N>` template name
+
+"""
+
+import os
+import re
+from app.index import STORE_FOLDER
+
+
+VERSIONS_FOLDER = 'versions'
+VERSION_NAME = re.compile(r'(.+)@v?([0-9]+)')
+
+
+def get_versions_path(template_folder, name):
+    """Returns the folder holding the versions of a template"""
+    return os.path.join(template_folder, STORE_FOLDER, VERSIONS_FOLDER, name)
+
+def get_version_path(template_folder, name, version):
+    """Returns the path of a version of a template"""
+    return os.path.join(get_versions_path(template_folder, name),
+                        f'v{version}')
+
+def get_template_folder(template_path):
+    """Returns the template folder of a template or of a template version
+
+    Versions and cached remote templates (see app.remote) are kept two
+    folders deep inside the template store.
+
+    """
+
+    folder = os.path.dirname(template_path)
+    store_folder = os.path.dirname(os.path.dirname(folder))
+    if os.path.basename(store_folder) == STORE_FOLDER:
+        return os.path.dirname(store_folder)
+    return folder
+
+def resolve_template(template_folder, name):
+    """Returns the path of a template, or of a version for `name@v<N>`
+
+    A template whose name contains `@` is used as is when it exists.
+
+    """
+
+    template_path = os.path.join(template_folder, name)
+    match = VERSION_NAME.fullmatch(name)
+    if match is None or os.path.exists(template_path):
+        return template_path
+    return get_version_path(template_folder, match.group(1),
+                            int(match.group(2)))
+
+def list_versions(template_folder, name):
+    """Lists the versions of a template, oldest first
+
+    Returns:
+        list: a dict per version with its number, its path and whether it
+            is the current version of the template
+
+    """
+
+    versions_path = get_versions_path(template_folder, name)
+    try:
+        template_stat = os.stat(os.path.join(template_folder, name))
+        current = (template_stat.st_dev, template_stat.st_ino)
+    except OSError:
+        current = None
+
+    versions = []
+    try:
+        with os.scandir(versions_path) as entries:
+            for entry in entries:
+                if not re.fullmatch(r'v[0-9]+', entry.name):
+                    continue
+                version_stat = entry.stat(follow_symlinks=False)
+                versions.append(dict(
+                    version=int(entry.name[1:]), path=entry.path,
+                    current=(version_stat.st_dev,
+                             version_stat.st_ino) == current))
+    except FileNotFoundError:
+        pass
+    return sorted(versions, key=lambda version: version['version'])
+
+def record_version(template_folder, name):
+    """Records the current file of a template as its newest version
+
+    Nothing is recorded when the file already is a version.
+
+    Returns:
+        int: the number of the template's current version, or None for a
+            directory template
+
+    Raises:
+        OSError: when the version can't be linked
+
+    """
+
+    template_path = os.path.join(template_folder, name)
+    if not os.path.isfile(template_path):
+        return None
+
+    versions = list_versions(template_folder, name)
+    for version in versions:
+        if version['current']:
+            return version['version']
+
+    os.makedirs(get_versions_path(template_folder, name), exist_ok=True)
+    number = versions[-1]['version'] + 1 if versions else 1
+    while True:
+        try:
+            os.link(template_path,
+                    get_version_path(template_folder, name, number))
+            return number
+        except FileExistsError:
+            number += 1
+
+def rollback(template_folder, name, version=None):
+    """Makes a version the current version of a template
+
+    The version is hardlinked next to the template and renamed over the
+    template's file, so a rollback is atomic and doesn't copy anything.
+
+    Parameters:
+        template_folder (str): the path of the templates directory
+        name (str): the name of the template
+        version (int): the version to roll back to, the version before the
+            current one if None
+
+    Returns:
+        int: the version the template was rolled back to
+
+    Raises:
+        LookupError: when the version doesn't exist
+        OSError: when the template can't be replaced
+
+    """
+
+    import uuid
+
+    versions = list_versions(template_folder, name)
+    if version is None:
+        current = [entry['version'] for entry in versions if entry['current']]
+        candidates = [entry for entry in versions
+                      if current and entry['version'] < current[0]]
+    else:
+        candidates = [entry for entry in versions
+                      if entry['version'] == version]
+    if not candidates:
+        raise LookupError(f'{name} has no version {version}.')
+
+    target = candidates[-1]
+    temp_path = os.path.join(template_folder,
+                             f'.{name}.{uuid.uuid4().hex}.tmp')
+    os.link(target['path'], temp_path)
+    try:
+        os.replace(temp_path, os.path.join(template_folder, name))
+    except OSError:
+        os.remove(temp_path)
+        raise
+    return target['version']
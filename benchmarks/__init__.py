@@ -0,0 +1,5 @@
+"""
+This package contains the benchmark suite of the app's engines
+
+Run it from the repository root with `python -m benchmarks`.
+"""
@@ -0,0 +1,9 @@
+"""
+This module starts the benchmark suite when the package is called
+"""
+
+from benchmarks import harness
+
+
+if __name__ == "__main__":
+    harness.main()
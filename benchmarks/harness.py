@@ -0,0 +1,303 @@
+"""This module times the app's engines on synthetic template trees.
+
+Every scenario generates a source tree (see benchmarks.trees) and then
+times create_template, clone_template, get_templates and remove_template
+on it a number of times. The listing scenario fills a template folder with
+thousands of templates and times get_templates and remove_template on it.
+The results are summarized as p50/p95 latencies, files per second and MB
+per second and can be saved as JSON, so that the report of one commit can
+be compared with the report of another.
+
+- run_benchmarks: Runs the scenarios and returns the report
+- compare_reports: Compares the p50 latencies of two reports
+- main: The command-line interface of the benchmark suite
+
+Attributes:
+    REPORT_FORMAT (str): identifies a file as a benchmark report
+    OPERATIONS (tuple): the engine operations timed by every scenario
+    LISTING_SCENARIO (str): the name of the scenario with many templates
+
+"""
+
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import click
+from app.engines import (create_template, clone_template, get_templates,
+                         remove_template)
+from app.fileops import COPY_MODES
+from app.index import update_index, get_index_path, DETAILS_SUFFIX
+from app.store import get_store_function, store_file, STORE_MODES
+from app.utils import get_clone_function
+from benchmarks.trees import SCENARIOS, scaled, write_file
+
+
+REPORT_FORMAT = 'ace-scaffold-benchmark'
+OPERATIONS = ('create_template', 'clone_template', 'get_templates',
+              'remove_template')
+LISTING_SCENARIO = 'many-templates'
+
+
+def percentile(samples, fraction):
+    """Returns the nearest-rank percentile of the samples"""
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+def summarize(samples, files, size):
+    """Summarizes the timings of an operation
+
+    Parameters:
+        samples (list): the duration of every run in seconds
+        files (int): the number of files every run handled
+        size (int): the number of bytes every run handled
+
+    Returns:
+        dict: the run count, the p50, p95 and total durations in seconds,
+            the files per second and the MB per second
+
+    """
+
+    total = sum(samples)
+    return dict(runs=len(samples), p50=percentile(samples, 0.5),
+                p95=percentile(samples, 0.95), total=total,
+                files_per_sec=files * len(samples) / total if total else 0.0,
+                mb_per_sec=size * len(samples) / total / 1e6 if total else 0.0)
+
+def time_call(function, *args, **kwargs):
+    """Calls a function and returns its duration in seconds
+
+    Raises:
+        RuntimeError: when the function returns an unsuccessful status
+
+    """
+
+    start = time.perf_counter()
+    status = function(*args, **kwargs)
+    duration = time.perf_counter() - start
+
+    if isinstance(status, dict) and not status.get('is_successful', True):
+        raise RuntimeError(status.get('msg', f'{function.__name__} failed.'))
+    return duration
+
+def benchmark_scenario(name, workdir, scale=1.0, repeat=5, **options):
+    """Times the engine operations on the source tree of a scenario
+
+    Parameters:
+        name (str): one of benchmarks.trees.SCENARIOS
+        workdir (str): an empty directory to run the scenario in
+        scale (float): multiplies the size of the source tree
+        repeat (int): the number of times every operation is timed
+        options: keyword arguments forwarded to the engines, such as jobs
+
+    Returns:
+        dict: the summary of every operation, see summarize
+
+    """
+
+    src = os.path.join(workdir, 'src')
+    template_folder = os.path.join(workdir, 'templates')
+    clone_folder = os.path.join(workdir, 'clones')
+    for path in (src, template_folder, clone_folder):
+        os.mkdir(path)
+
+    files, size = SCENARIOS[name](src, scale)
+    store_function = get_store_function(src)
+    clone_function = get_clone_function(clone_folder)
+    clone_options = dict(options, mode='copy') \
+        if options.get('mode') not in COPY_MODES else options
+    store_options = dict(options, mode='copy') \
+        if options.get('mode') not in STORE_MODES else options
+    samples = {operation: [] for operation in OPERATIONS}
+
+    for run in range(repeat):
+        template = f'{name}-{run}'
+        samples['create_template'].append(time_call(
+            create_template, src, template, store_function, False,
+            template_folder, **store_options))
+        samples['clone_template'].append(time_call(
+            clone_template, clone_folder, template, template, clone_function,
+            template_folder, **clone_options))
+        samples['get_templates'].append(time_call(
+            get_templates, template_folder))
+        samples['remove_template'].append(time_call(
+            remove_template, template, template_folder))
+        shutil.rmtree(os.path.join(clone_folder, template))
+
+    return {operation: summarize(
+        operation_samples, 1 if operation == 'get_templates' else files,
+        0 if operation == 'get_templates' else size)
+            for operation, operation_samples in samples.items()}
+
+def benchmark_listing(workdir, scale=1.0, repeat=5, count=5000):
+    """Times listing and removing templates in a crowded template folder
+
+    The templates are single file templates added straight to the store,
+    the index is built once before timing starts. The cold listing is
+    timed after the index was removed.
+
+    Returns:
+        dict: the summary of every operation, see summarize
+
+    """
+
+    count = scaled(count, scale)
+    template_folder = os.path.join(workdir, 'templates')
+    os.mkdir(template_folder)
+    src = os.path.join(workdir, 'README')
+    write_file(src, 128)
+
+    for index in range(count):
+        store_file(src, os.path.join(template_folder, f'template{index}'))
+    update_index(template_folder)
+    index_path = get_index_path(template_folder)
+
+    samples = dict(get_templates=[], get_templates_cold=[], remove_template=[])
+    for run in range(repeat):
+        samples['get_templates'].append(time_call(
+            get_templates, template_folder))
+        samples['remove_template'].append(time_call(
+            remove_template, f'template{run}', template_folder))
+
+        for path in (index_path, f'{index_path}{DETAILS_SUFFIX}'):
+            os.remove(path)
+        samples['get_templates_cold'].append(time_call(
+            get_templates, template_folder))
+
+    return {operation: summarize(operation_samples, count, 0)
+            for operation, operation_samples in samples.items()}
+
+def get_commit():
+    """Returns the commit of the working tree, or None outside of git"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(scenarios=None, workdir=None, scale=1.0, repeat=5,
+                   **options):
+    """Runs the benchmark scenarios
+
+    Parameters:
+        scenarios (list): the names of the scenarios, every scenario of
+            SCENARIOS and the listing scenario if None
+        workdir (str): the directory the scenarios run in, a temporary
+            directory is used and removed if None
+        scale (float): multiplies the size of the source trees
+        repeat (int): the number of times every operation is timed
+        options: keyword arguments forwarded to the engines, such as jobs
+
+    Returns:
+        dict: the report, with the results of every scenario
+
+    """
+
+    scenarios = scenarios or list(SCENARIOS) + [LISTING_SCENARIO]
+    root = tempfile.mkdtemp(prefix='scaffold-bench-', dir=workdir)
+    results = {}
+
+    try:
+        for name in scenarios:
+            scenario_dir = os.path.join(root, name)
+            os.mkdir(scenario_dir)
+            if name == LISTING_SCENARIO:
+                results[name] = benchmark_listing(scenario_dir, scale, repeat)
+            else:
+                results[name] = benchmark_scenario(name, scenario_dir, scale,
+                                                   repeat, **options)
+            shutil.rmtree(scenario_dir)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return dict(format=REPORT_FORMAT, created=time.time(),
+                commit=get_commit(), python=platform.python_version(),
+                platform=platform.platform(), scale=scale, repeat=repeat,
+                options={key: value for key, value in options.items()
+                         if value is not None},
+                results=results)
+
+def compare_reports(previous, current):
+    """Compares the p50 latencies of two reports
+
+    Returns:
+        list: a (scenario, operation, previous p50, current p50, change)
+            tuple for every operation in both reports, change is the
+            relative change of the p50 latency
+
+    """
+
+    comparison = []
+    for scenario, operations in current['results'].items():
+        for operation, summary in operations.items():
+            previous_summary = previous['results'].get(
+                scenario, {}).get(operation)
+            if previous_summary is None:
+                continue
+            change = (summary['p50'] - previous_summary['p50']) / \
+                previous_summary['p50'] if previous_summary['p50'] else 0.0
+            comparison.append((scenario, operation, previous_summary['p50'],
+                               summary['p50'], change))
+    return comparison
+
+def format_report(report):
+    """Returns the lines of a readable summary of the report"""
+    lines = []
+    for scenario, operations in report['results'].items():
+        lines.append(scenario)
+        for operation, summary in operations.items():
+            lines.append(
+                f'  {operation:<20} p50 {summary["p50"] * 1000:9.2f}ms  '
+                f'p95 {summary["p95"] * 1000:9.2f}ms  '
+                f'{summary["files_per_sec"]:11.0f} files/s  '
+                f'{summary["mb_per_sec"]:8.1f} MB/s')
+    return lines
+
+@click.command()
+@click.option('--scenario', '-s', 'scenarios', multiple=True,
+              type=click.Choice(list(SCENARIOS) + [LISTING_SCENARIO]),
+              help='The scenarios to run, all of them by default.')
+@click.option('--scale', default=1.0, type=click.FloatRange(min=0),
+              help='Multiplies the size of the synthetic trees.')
+@click.option('--repeat', '-r', default=5, type=click.IntRange(min=1),
+              help='The number of times every operation is timed.')
+@click.option('--jobs', '-j', required=False, type=click.IntRange(min=1),
+              help='The number of threads copying files.')
+@click.option('--mode', '-m', default='copy', type=click.Choice(COPY_MODES),
+              help='How files are added to the store and cloned.')
+@click.option('--workdir', '-w', required=False,
+              type=click.Path(exists=True, file_okay=False, writable=True),
+              help='The directory to run the benchmarks in.')
+@click.option('--output', '-o', required=False, type=click.Path(),
+              help='Save the report as JSON to this file.')
+@click.option('--compare', '-c', required=False,
+              type=click.Path(exists=True, dir_okay=False),
+              help='A saved report to compare the p50 latencies with.')
+def main(scenarios, scale, repeat, jobs, mode, workdir, output, compare):
+    """Times the template engines on synthetic template trees."""
+
+    report = run_benchmarks(list(scenarios), workdir, scale, repeat,
+                            jobs=jobs, mode=mode)
+    lines = format_report(report)
+
+    if compare:
+        with open(compare) as file_:
+            previous = json.load(file_)
+        lines.append(f'compared with {previous.get("commit") or compare}')
+        lines.extend(
+            f'  {scenario}/{operation}: {old * 1000:.2f}ms -> '
+            f'{new * 1000:.2f}ms ({change:+.1%})'
+            for scenario, operation, old, new, change
+            in compare_reports(previous, report))
+
+    if output:
+        with open(output, 'w') as file_:
+            json.dump(report, file_, indent=2)
+
+    click.echo('\n'.join(lines))
@@ -0,0 +1,91 @@
+"""This module generates the synthetic source trees of the benchmarks.
+
+Every generator fills an empty directory and returns the number of files
+and the number of bytes it wrote, so throughput can be computed from the
+timings. The counts are multiplied by a scale factor so that the same
+scenarios run as a quick check or as a long benchmark.
+
+- make_tiny_files: Many small files spread over a few directories
+- make_huge_files: A few large files
+- make_deep_tree: A deeply nested tree with a file per level
+- make_symlink_tree: A tree where most entries are symlinks
+
+Attributes:
+    CHUNK_SIZE (int): the size of the blocks large files are written in
+    SCENARIOS (dict): the generator of every scenario's source tree
+
+"""
+
+import os
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def scaled(count, scale):
+    """Returns count multiplied by scale, at least 1"""
+    return max(1, int(count * scale))
+
+def write_file(path, size, seed=0):
+    """Writes a file of size bytes whose contents are unique to its seed
+
+    Large files are written one CHUNK_SIZE block at a time, every block
+    starts with its own number so that blocks are not identical.
+
+    """
+
+    block = os.urandom(min(size, CHUNK_SIZE))
+    with open(path, 'wb') as file_:
+        written = 0
+        while written < size:
+            header = f'{seed}:{written}\n'.encode()
+            data = (header + block)[:min(len(block), size - written)]
+            file_.write(data)
+            written += len(data)
+
+def make_tiny_files(root, scale=1.0, count=2000, size=512, per_folder=100):
+    """Creates count files of size bytes, per_folder files per directory"""
+    count = scaled(count, scale)
+    for index in range(count):
+        folder = os.path.join(root, f'folder{index // per_folder}')
+        if index % per_folder == 0:
+            os.makedirs(folder, exist_ok=True)
+        write_file(os.path.join(folder, f'file{index}.txt'), size, index)
+    return count, count * size
+
+def make_huge_files(root, scale=1.0, count=3, size=32 * 1024 * 1024):
+    """Creates count files of size bytes"""
+    size = scaled(size, scale)
+    for index in range(count):
+        write_file(os.path.join(root, f'huge{index}.bin'), size, index)
+    return count, count * size
+
+def make_deep_tree(root, scale=1.0, depth=64, width=4, size=256):
+    """Creates depth nested directories holding width files each"""
+    depth = scaled(depth, scale)
+    folder = root
+    for level in range(depth):
+        folder = os.path.join(folder, f'level{level}')
+        os.mkdir(folder)
+        for index in range(width):
+            write_file(os.path.join(folder, f'file{index}.txt'), size,
+                       level * width + index)
+    return depth * width, depth * width * size
+
+def make_symlink_tree(root, scale=1.0, count=1000, targets=10, size=1024):
+    """Creates a few files and count symlinks pointing at them"""
+    count = scaled(count, scale)
+    os.mkdir(os.path.join(root, 'links'))
+    for index in range(targets):
+        write_file(os.path.join(root, f'target{index}.txt'), size, index)
+    for index in range(count):
+        os.symlink(os.path.join('..', f'target{index % targets}.txt'),
+                   os.path.join(root, 'links', f'link{index}'))
+    return targets, targets * size
+
+SCENARIOS = {
+    'tiny-files': make_tiny_files,
+    'huge-files': make_huge_files,
+    'deep-tree': make_deep_tree,
+    'symlinks': make_symlink_tree,
+}
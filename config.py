@@ -17,6 +17,11 @@ class Config:
     TEMPLATE_FOLDER = os.path.join(BASE_DIR, 'templates/')
     DEFAULT_NAME = 'Untitled'
     ENVIRONMENT = 'PRODUCTIION'
+    USE_DAEMON = True
+    RECLAIM_IN_BACKGROUND = True
+    REMOTES = {'remote': os.environ.get('SCAFFOLD_REGISTRY_URL',
+                                        'http://127.0.0.1:8765')}
+    REMOTE_CACHE_SIZE = 1024 * 1024 * 1024
 
 
 class TestConfig(Config):
@@ -30,6 +35,9 @@ class TestConfig(Config):
     TEMPLATE_FOLDER = None
     DEFAULT_NAME = 'Untitled'
     ENVIRONMENT = 'TESTING'
+    USE_DAEMON = False
+    RECLAIM_IN_BACKGROUND = False
+    REMOTES = {}
 
     def __init__(self, template_folder):
         super(TestConfig, self).__init__()
@@ -0,0 +1,98 @@
+"""This unit test suite tests the asyncio versions of the engines."""
+
+import asyncio
+import os
+import time
+import pytest
+import app.store
+from app.aio import (async_create_template, async_clone_template,
+                     async_get_templates)
+from app.journal import get_journal_path
+from app.store import get_store_function
+from app.utils import get_clone_function
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a source directory with twenty files and a template folder"""
+    src = tmp_path / 'src'
+    src.mkdir()
+    for index in range(20):
+        (src / f'file{index}').write_text(str(index))
+    (tmp_path / 'templates').mkdir()
+    return tmp_path
+
+def slow_restore(mocker):
+    """Makes every restored file take 10 milliseconds"""
+    restore_file = app.store.restore_file
+
+    def restore(*args, **kwargs):
+        time.sleep(0.01)
+        return restore_file(*args, **kwargs)
+
+    mocker.patch.object(app.store, 'restore_file', side_effect=restore)
+
+async def create_and_cancel(template_folder, cleanup):
+    """Creates a template, then cancels a clone of it while it runs"""
+    src = str(template_folder / 'src')
+    templates = str(template_folder / 'templates')
+    await async_create_template(src, 'project', get_store_function(src),
+                                False, templates)
+
+    task = asyncio.ensure_future(async_clone_template(
+        str(template_folder), 'project', 'clone',
+        get_clone_function(str(template_folder)), templates,
+        cleanup=cleanup, jobs=1))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+@pytest.mark.aio
+def test_async_clones_run_at_the_same_time(template_folder):
+    """many clones return the engines' status and the templates are listed"""
+    src = str(template_folder / 'src')
+    templates = str(template_folder / 'templates')
+
+    async def run():
+        status = await async_create_template(
+            src, 'project', get_store_function(src), False, templates)
+        statuses = await asyncio.gather(*(async_clone_template(
+            str(template_folder), 'project', f'clone{index}',
+            get_clone_function(str(template_folder)), templates)
+                                          for index in range(4)))
+        return status, statuses, await async_get_templates(templates)
+
+    status, statuses, templates = asyncio.run(run())
+
+    assert status['is_successful'] is True
+    assert all(clone['is_successful'] for clone in statuses)
+    assert len(os.listdir(template_folder / 'clone3')) == 20
+    assert templates == ['project']
+
+@pytest.mark.aio
+def test_cancelled_clone_is_journaled(mocker, template_folder):
+    """the partial clone and its journal are kept to be resumed"""
+    slow_restore(mocker)
+    asyncio.run(create_and_cancel(template_folder, cleanup=False))
+    dest = str(template_folder / 'clone')
+
+    assert 0 < len(os.listdir(dest)) < 20
+    assert os.path.exists(get_journal_path(dest))
+
+    status = asyncio.run(async_clone_template(
+        str(template_folder), 'project', 'clone',
+        get_clone_function(str(template_folder)),
+        str(template_folder / 'templates'), resume=True))
+    assert status['is_successful'] is True
+    assert len(os.listdir(dest)) == 20
+
+@pytest.mark.aio
+def test_cancelled_clone_with_cleanup_is_removed(mocker, template_folder):
+    """the partial clone and its journal are removed"""
+    slow_restore(mocker)
+    asyncio.run(create_and_cancel(template_folder, cleanup=True))
+    dest = str(template_folder / 'clone')
+
+    assert not os.path.exists(dest)
+    assert not os.path.exists(get_journal_path(dest))
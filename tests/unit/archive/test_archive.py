@@ -0,0 +1,145 @@
+"""This unit test suite tests the application's archive templates."""
+
+import io
+import os
+import tarfile
+import pytest
+from app.archive import (archive_directory, extract_archive, read_members,
+                         add_json_member, HASHES_NAME, MEMBERS_NAME)
+from app.utils import get_template_format
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """Creates a source directory with a nested file and a symlink"""
+    src = tmp_path / 'src'
+    (src / 'docs').mkdir(parents=True)
+    (src / 'docs' / 'README').write_text('readme')
+    (src / 'run.sh').write_text('echo run')
+    os.chmod(src / 'run.sh', 0o755)
+    os.symlink('run.sh', src / 'start')
+    return src
+
+@pytest.mark.archive
+@pytest.mark.parametrize('compression', ['gz', 'xz'])
+def test_archive_directory_round_trip(source_tree, tmp_path, compression):
+    """an extracted archive matches the source tree"""
+    template = str(tmp_path / 'project')
+    dest = tmp_path / 'clone'
+
+    assert archive_directory(str(source_tree), template,
+                             compression=compression)['is_successful']
+    assert get_template_format(template) == 'archive'
+    assert extract_archive(template, str(dest))['is_successful'] is True
+    assert (dest / 'docs' / 'README').read_text() == 'readme'
+    assert os.readlink(dest / 'start') == 'run.sh'
+    assert os.stat(dest / 'run.sh').st_mode & 0o777 == 0o755
+    assert not (dest / MEMBERS_NAME).exists()
+
+@pytest.mark.archive
+def test_read_members_lists_the_entries(source_tree, tmp_path):
+    """the member index describes every entry of the template"""
+    template = str(tmp_path / 'project')
+    archive_directory(str(source_tree), template)
+
+    entries = {entry['path']: entry for entry in
+               read_members(template)['entries']}
+    assert entries['run.sh']['size'] == len('echo run')
+    assert entries['start']['target'] == 'run.sh'
+
+@pytest.mark.archive
+def test_archive_directory_reports_changes(source_tree, tmp_path):
+    """replacing an archive reports the added, changed and removed entries"""
+    template = str(tmp_path / 'project')
+    archive_directory(str(source_tree), template)
+    (source_tree / 'run.sh').write_text('echo changed')
+    os.remove(source_tree / 'start')
+
+    status = archive_directory(str(source_tree), template)
+    assert status == {'is_successful': True, 'added': 0, 'changed': 1,
+                      'removed': 1}
+
+@pytest.mark.archive
+def test_extract_archive_rejects_members_outside_the_destination(tmp_path):
+    """returns a failure indicator for members with a parent path"""
+    template = str(tmp_path / 'evil')
+    with tarfile.open(template, 'w:gz') as archive:
+        tarinfo = tarfile.TarInfo('../escaped')
+        tarinfo.size = 1
+        archive.addfile(tarinfo, io.BytesIO(b'x'))
+
+    status = extract_archive(template, str(tmp_path / 'clone'))
+    assert status['is_successful'] is False
+    assert not (tmp_path / 'escaped').exists()
+
+@pytest.mark.archive
+def test_extract_archive_rejects_members_through_symlinks(tmp_path):
+    """a member below a symlink member is never written where the link
+    points"""
+    template = str(tmp_path / 'evil')
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    with tarfile.open(template, 'w:gz') as archive:
+        tarinfo = tarfile.TarInfo('link')
+        tarinfo.type = tarfile.SYMTYPE
+        tarinfo.linkname = str(outside)
+        archive.addfile(tarinfo)
+        tarinfo = tarfile.TarInfo('link/escaped')
+        tarinfo.size = 1
+        archive.addfile(tarinfo, io.BytesIO(b'x'))
+
+    status = extract_archive(template, str(tmp_path / 'clone'))
+    assert status['is_successful'] is False
+    assert os.listdir(outside) == []
+
+@pytest.mark.archive
+def test_extract_archive_rejects_members_at_symlinks(tmp_path):
+    """a file member can't be written through a symlink of its path"""
+    template = str(tmp_path / 'evil')
+    outside = tmp_path / 'outside'
+    outside.write_text('kept')
+    with tarfile.open(template, 'w:gz') as archive:
+        tarinfo = tarfile.TarInfo('link')
+        tarinfo.type = tarfile.SYMTYPE
+        tarinfo.linkname = str(outside)
+        archive.addfile(tarinfo)
+        tarinfo = tarfile.TarInfo('link')
+        tarinfo.size = 1
+        archive.addfile(tarinfo, io.BytesIO(b'x'))
+
+    status = extract_archive(template, str(tmp_path / 'clone'))
+    assert status['is_successful'] is False
+    assert outside.read_text() == 'kept'
+
+@pytest.mark.archive
+def test_extract_archive_verify_removes_a_mismatching_clone(tmp_path):
+    """the first file that doesn't match its hash is reported and the
+    clone is removed"""
+    template = str(tmp_path / 'damaged')
+    with tarfile.open(template, 'w:gz') as archive:
+        for name in ('first', 'second'):
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = 1
+            archive.addfile(tarinfo, io.BytesIO(b'x'))
+        add_json_member(archive, HASHES_NAME, {'first': '0' * 64,
+                                               'second': '0' * 64})
+    dest = tmp_path / 'clone'
+
+    status = extract_archive(template, str(dest), verify=True)
+    assert status == {'is_successful': False, 'corrupted': 'first'}
+    assert os.listdir(tmp_path) == ['damaged']
+
+@pytest.mark.archive
+def test_extract_archive_verify_reads_the_archive_once(mocker, tmp_path):
+    """the recorded hashes are checked in the pass that writes the files"""
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'file').write_text('contents')
+    template = str(tmp_path / 'template')
+    archive_directory(str(src), template)
+    spy = mocker.spy(tarfile, 'open')
+
+    status = extract_archive(template, str(tmp_path / 'clone'), verify=True)
+    assert status == {'is_successful': True}
+    assert spy.call_count == 1
+    assert (tmp_path / 'clone' / 'file').read_text() == 'contents'
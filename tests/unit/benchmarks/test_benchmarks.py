@@ -0,0 +1,49 @@
+"""This unit test suite tests the benchmark suite of the engines."""
+
+import os
+import pytest
+from benchmarks.harness import (percentile, summarize, run_benchmarks,
+                                compare_reports, OPERATIONS, REPORT_FORMAT)
+from benchmarks.trees import make_tiny_files, make_symlink_tree
+
+
+@pytest.mark.benchmark
+def test_percentile_uses_the_nearest_rank():
+    """returns a sample instead of interpolating between samples"""
+    samples = [5, 1, 4, 2, 3]
+    assert percentile(samples, 0.5) == 3
+    assert percentile(samples, 0.95) == 5
+    assert percentile([7], 0.95) == 7
+
+@pytest.mark.benchmark
+def test_summarize_computes_the_throughput():
+    """files and bytes per run are divided by the total duration"""
+    summary = summarize([1.0, 3.0], files=10, size=2_000_000)
+    assert summary['files_per_sec'] == 5.0
+    assert summary['mb_per_sec'] == 1.0
+
+@pytest.mark.benchmark
+def test_tree_generators_report_what_they_wrote(tmp_path):
+    """the returned counts match the generated files"""
+    (tmp_path / 'tiny').mkdir()
+    (tmp_path / 'links').mkdir()
+
+    assert make_tiny_files(str(tmp_path / 'tiny'), count=5, size=10,
+                           per_folder=2) == (5, 50)
+    assert make_symlink_tree(str(tmp_path / 'links'), count=4, targets=2,
+                             size=8) == (2, 16)
+    assert len(os.listdir(tmp_path / 'links' / 'links')) == 4
+
+@pytest.mark.benchmark
+def test_run_benchmarks_times_every_operation(tmp_path):
+    """a small run reports every operation and compares with itself"""
+    report = run_benchmarks(['deep-tree', 'many-templates'], str(tmp_path),
+                            scale=0.05, repeat=2, jobs=2)
+
+    assert report['format'] == REPORT_FORMAT
+    assert set(report['results']['deep-tree']) == set(OPERATIONS)
+    assert report['results']['deep-tree']['clone_template']['runs'] == 2
+    assert 'get_templates_cold' in report['results']['many-templates']
+    assert all(change == 0.0 for *_, change
+               in compare_reports(report, report))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,125 @@
+"""This unit test suite tests the bulk import of templates."""
+
+import json
+import os
+import pytest
+from app.bulk import read_bulk_manifest
+from app.commands.create import create
+from app.engines import create_templates, get_templates
+from app.store import get_store_function
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """Creates three source directories and a template folder"""
+    for name in ('flask', 'react', 'django'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'README').write_text(name)
+    (tmp_path / 'templates').mkdir()
+    return tmp_path
+
+@pytest.mark.bulk
+def test_read_bulk_manifest_reads_csv(sources):
+    """paths are resolved from the file's directory and force is parsed"""
+    bulk_file = sources / 'templates.csv'
+    bulk_file.write_text('name,path,force\nflask,flask,yes\nreact,react,\n')
+
+    assert read_bulk_manifest(str(bulk_file)) == [
+        dict(name='flask', path=str(sources / 'flask'), force=True),
+        dict(name='react', path=str(sources / 'react'), force=False)]
+
+@pytest.mark.bulk
+def test_read_bulk_manifest_reads_a_json_mapping(sources):
+    """the templates list of a mapping is read"""
+    bulk_file = sources / 'templates.json'
+    bulk_file.write_text(json.dumps(
+        {'templates': [{'name': 'flask', 'path': '/srv/flask'}]}))
+
+    assert read_bulk_manifest(str(bulk_file)) == [
+        dict(name='flask', path='/srv/flask', force=False)]
+
+@pytest.mark.bulk
+def test_read_bulk_manifest_keeps_invalid_entries_apart(sources):
+    """an entry without a name or a path gets an error of its own"""
+    bulk_file = sources / 'templates.json'
+    bulk_file.write_text(json.dumps(
+        [{'name': 'flask'}, 'react', {'name': 'django', 'path': 'django'}]))
+
+    assert read_bulk_manifest(str(bulk_file)) == [
+        dict(name='flask', path=None, force=False,
+             error='Entry 1 needs a name and a path.'),
+        dict(name='', path=None, force=False,
+             error='Entry 2 needs a name and a path.'),
+        dict(name='django', path=str(sources / 'django'), force=False)]
+
+@pytest.mark.bulk
+@pytest.mark.parametrize('file_name, contents', [
+    ('templates.json', '{"name": "flask"}'),
+    ('templates.txt', 'flask'),
+])
+def test_read_bulk_manifest_with_invalid_files(sources, file_name, contents):
+    """raises a ValueError for files without templates and unsupported
+    formats"""
+    bulk_file = sources / file_name
+    bulk_file.write_text(contents)
+
+    with pytest.raises(ValueError):
+        read_bulk_manifest(str(bulk_file))
+
+@pytest.mark.bulk
+def test_create_templates_continues_after_a_failure(sources):
+    """every entry gets a result and the failed one doesn't stop the rest"""
+    template_folder = str(sources / 'templates')
+    entries = [(str(sources / name), name,
+                get_store_function(str(sources / name)), False)
+               for name in ('flask', 'missing', 'react', 'django')]
+    entries.append(entries[0])
+
+    statuses = create_templates(entries, template_folder, workers=2)
+
+    assert [status['is_successful'] for status in statuses] == \
+        [True, False, True, True, False]
+    assert get_templates(template_folder) == ['django', 'flask', 'react']
+
+@pytest.mark.command
+@pytest.mark.bulk
+def test_create_from_manifest_displays_a_summary(click_runner, mocker,
+                                                 sources):
+    """every result and the summary are displayed"""
+    bulk_file = sources / 'templates.csv'
+    bulk_file.write_text('name,path\nflask,flask\nreact,react\n')
+    create_templates = mocker.patch(
+        'app.commands.create.create_templates',
+        return_value=[{'is_successful': True, 'msg': 'created'},
+                      {'is_successful': False, 'msg': 'failed'}])
+
+    response = click_runner(create)(['--from-manifest', str(bulk_file),
+                                     '-w', '3'])
+
+    assert response.exit_code == 0
+    assert response.output == \
+        'created\nfailed\n1 of 2 templates created, 1 failed.\n'
+    assert create_templates.call_args.args[2] == 3
+    assert os.path.basename(create_templates.call_args.args[0][1][0]) == \
+        'react'
+
+@pytest.mark.command
+@pytest.mark.bulk
+def test_create_from_manifest_creates_the_valid_entries(sources):
+    """an invalid entry fails on its own"""
+    from click.testing import CliRunner
+    from app import TestConfig
+
+    bulk_file = sources / 'templates.csv'
+    bulk_file.write_text('name,path\nflask,flask\nreact,\n,django\n')
+    config = TestConfig(str(sources / 'templates'))
+
+    response = CliRunner().invoke(create, ['--from-manifest', str(bulk_file)],
+                                  obj=config)
+
+    assert response.exit_code == 0
+    assert 'Entry 2 needs a name and a path.' in response.output
+    assert 'Entry 3 needs a name and a path.' in response.output
+    assert response.output.endswith(
+        '1 of 3 templates created, 2 failed.\n')
+    assert get_templates(config.TEMPLATE_FOLDER) == ['flask']
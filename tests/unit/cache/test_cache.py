@@ -0,0 +1,100 @@
+"""This unit test suite tests the in-memory content cache of templates."""
+
+import os
+import pytest
+import app.cache
+from app.cache import (ContentCache, enable_content_cache,
+                       get_cached_template)
+from app.engines import clone_template, create_template, remove_template
+from app.store import get_store_function
+from app.utils import get_clone_function
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Enables a content cache of 1000 bytes and creates two templates
+
+    Every template holds ten files of 40 bytes, a directory and a symlink.
+
+    """
+
+    (tmp_path / 'templates').mkdir()
+    for name in ('small', 'other'):
+        src = tmp_path / f'{name}-src'
+        (src / 'sub').mkdir(parents=True)
+        for index in range(10):
+            (src / 'sub' / f'file{index}').write_text(name[0] * 40)
+        os.symlink('sub/file0', src / 'link')
+        os.chmod(src / 'sub' / 'file0', 0o600)
+        create_template(str(src), name, get_store_function(str(src)), False,
+                        str(tmp_path / 'templates'))
+
+    yield enable_content_cache(1000, 500)
+    enable_content_cache(0)
+
+def clone(tmp_path, name, clone_name, **options):
+    """Clones a template of the cache fixture into tmp_path"""
+    return clone_template(str(tmp_path), name, clone_name,
+                          get_clone_function(str(tmp_path)),
+                          str(tmp_path / 'templates'), **options)
+
+@pytest.mark.cache
+def test_clones_are_written_from_memory(mocker, cache, tmp_path):
+    """the blobs are read by the first clone only"""
+    clone(tmp_path, 'small', 'first')
+    restore_template = mocker.patch('app.store.restore_template')
+    status = clone(tmp_path, 'small', 'second')
+
+    restore_template.assert_not_called()
+    assert status['is_successful'] is True
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['misses'] == 1
+    assert (tmp_path / 'second' / 'sub' / 'file3').read_text() == 's' * 40
+    assert os.readlink(tmp_path / 'second' / 'link') == 'sub/file0'
+    assert os.stat(tmp_path / 'second' / 'sub' / 'file0').st_mode & 0o777 \
+        == 0o600
+
+@pytest.mark.cache
+def test_least_recently_used_template_is_evicted(cache, tmp_path):
+    """the budget holds two templates of 400 bytes"""
+    cache.max_bytes = 600
+    clone(tmp_path, 'small', 'a')
+    clone(tmp_path, 'other', 'b')
+
+    assert cache.get_stats()['evictions'] == 1
+    assert cache.get_stats()['size'] == 400
+    assert list(cache.templates) == [str(tmp_path / 'templates' / 'other')]
+
+@pytest.mark.cache
+def test_large_templates_and_links_are_not_cached(cache, tmp_path):
+    """templates above the template limit and link clones use the store"""
+    template = str(tmp_path / 'templates' / 'small')
+    assert get_cached_template(template, mode='hardlink') is None
+    assert get_cached_template(template, resume=True) is None
+
+    cache.max_template_bytes = 100
+    assert get_cached_template(template) is None
+    assert cache.get_stats()['templates'] == 0
+
+@pytest.mark.cache
+def test_cache_is_invalidated(cache, tmp_path):
+    """create --force and delete drop the template from the cache"""
+    clone(tmp_path, 'small', 'a')
+    src = str(tmp_path / 'other-src')
+    create_template(src, 'small', get_store_function(src), True,
+                    str(tmp_path / 'templates'))
+    assert cache.get_stats()['templates'] == 0
+
+    clone(tmp_path, 'small', 'b')
+    assert (tmp_path / 'b' / 'sub' / 'file0').read_text() == 'o' * 40
+
+    remove_template('small', str(tmp_path / 'templates'))
+    assert cache.get_stats() == dict(hits=0, misses=2, evictions=0, size=0,
+                                     templates=0, max_bytes=1000)
+
+@pytest.mark.cache
+def test_disabled_cache():
+    """no cache is used unless it is enabled"""
+    assert enable_content_cache(0) is None
+    assert app.cache.get_content_cache() is None
+    assert ContentCache(10, 100).max_template_bytes == 10
@@ -0,0 +1,84 @@
+"""This unit test suite tests the application's command group."""
+
+import json
+import os
+import subprocess
+import sys
+import pytest
+from click.testing import CliRunner
+import config
+from app.cli import interface, COMMANDS
+from app.index import update_index
+
+
+STARTUP_BUDGET = 0.05
+STARTUP_SCRIPT = '''
+import json, sys, time
+import click, config
+config.Config.TEMPLATE_FOLDER = sys.argv[1]
+start = time.perf_counter()
+from app.cli import interface
+interface(sys.argv[2:], standalone_mode=False)
+sys.stderr.write(json.dumps([time.perf_counter() - start, list(sys.modules)]))
+'''
+
+
+def run_cold(template_folder, *args):
+    """Runs the interface in a new interpreter
+
+    click is imported before the clock starts, only the app's own startup
+    is timed.
+
+    Returns:
+        tuple: the seconds the command took and the imported modules
+
+    """
+
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT, template_folder, *args],
+        capture_output=True, check=True, text=True,
+        cwd=config.BASE_DIR)
+    return json.loads(result.stderr)
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a template folder with a few templates and its index"""
+    for name in ('flask', 'react', 'django'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'README').write_text(name)
+    update_index(str(tmp_path))
+    return str(tmp_path)
+
+@pytest.mark.cli
+def test_list_does_not_import_the_storage_engines(template_folder):
+    """with a current index the store, archive, search and copy modules
+    and the other commands are not imported"""
+    _, modules = run_cold(template_folder, 'list')
+
+    assert 'app.commands.list' in modules
+    for module in ('app.commands.create', 'app.store', 'app.archive',
+                   'app.search', 'app.remote', 'app.fileops', 'app.journal',
+                   'tarfile', 'sqlite3', 'concurrent.futures', 'shutil',
+                   'hashlib'):
+        assert module not in modules
+
+@pytest.mark.perf
+@pytest.mark.skipif(not os.environ.get('SCAFFOLD_PERF'),
+                    reason='timed only when SCAFFOLD_PERF is set')
+def test_list_starts_within_the_budget(template_folder):
+    """a cold list stays under the startup budget"""
+    run_cold(template_folder, 'list')
+    elapsed = min(run_cold(template_folder, 'list')[0] for _ in range(3))
+    assert elapsed < STARTUP_BUDGET
+
+@pytest.mark.cli
+def test_help_lists_the_commands_without_importing_them(mocker):
+    """the short help of every command is displayed"""
+    import_module = mocker.patch('importlib.import_module')
+    response = CliRunner().invoke(interface, ['--help'])
+
+    assert response.exit_code == 0
+    for name, (_, _, short_help) in COMMANDS.items():
+        assert name in response.output
+        assert short_help in response.output
+    import_module.assert_not_called()
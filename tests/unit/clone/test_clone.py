@@ -1,7 +1,7 @@
 """This unit test suite tests the application's "clone" command."""
 
 import pytest
-from app.cli import clone
+from app.commands.clone import clone
 
 
 @pytest.fixture
@@ -22,7 +22,36 @@ def test_clone_without_template(clone_template):
 def test_clone_displays_message(clone_template, mocker):
     """The message sent to the client from clone_template is displayed"""
     message = 'clone display message'
-    mocker.patch('app.cli.clone_template', return_value={'msg': message})
+    mocker.patch('app.commands.clone.clone_template',
+                 return_value={'msg': message})
     response = clone_template(["-t", "flask-app"])
 
     assert message == response.output.strip()
+
+@pytest.mark.command
+@pytest.mark.clone
+def test_clone_to_many_paths_displays_a_message_per_path(
+        clone_template, mocker, tmp_path):
+    """Names are paired with paths and the destinations file is appended"""
+    destinations_file = tmp_path / 'destinations'
+    destinations_file.write_text('# workspaces\n/srv/c/three\n')
+    clone_template_to_many = mocker.patch(
+        'app.commands.clone.clone_template_to_many',
+        return_value=[{'msg': 'one'}, {'msg': 'two'}, {'msg': 'three'}])
+
+    response = clone_template(['-t', 'flask-app', '-p', '/srv/a', '-n', 'one',
+                               '-p', '/srv/b', '-n', 'two',
+                               '-d', str(destinations_file)])
+
+    assert response.output == 'one\ntwo\nthree\n'
+    assert clone_template_to_many.call_args.args[0] == [
+        ('/srv/a', 'one'), ('/srv/b', 'two'), ('/srv/c', 'three')]
+
+@pytest.mark.command
+@pytest.mark.clone
+def test_clone_with_unpaired_names(clone_template):
+    """An error is thrown when names can't be paired with paths"""
+    response = clone_template(['-t', 'flask-app', '-p', '/a', '-p', '/b',
+                               '-p', '/c', '-n', 'one', '-n', 'two'])
+    assert response.exit_code == 2
+    assert 'Supply one name or a name per path.' in response.output
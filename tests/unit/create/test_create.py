@@ -1,7 +1,7 @@
 """This unit test suite tests the application's "create" command."""
 
 import pytest
-from app.cli import create
+from app.commands.create import create
 
 
 @pytest.fixture
@@ -22,7 +22,8 @@ def test_create_template_without_name(create_template):
 def test_create_displays_success_message(create_template, mocker):
     """The message sent to the client from create_template is displayed"""
     message = 'create display message'
-    mocker.patch('app.cli.create_template', return_value={'msg': message})
+    mocker.patch('app.commands.create.create_template',
+                 return_value={'msg': message})
     template_name = 'flask-app'
     response = create_template(["-n", template_name])
 
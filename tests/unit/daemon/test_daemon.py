@@ -0,0 +1,203 @@
+"""This unit test suite tests the `scaffold serve` daemon and its client."""
+
+import errno
+import os
+import shutil
+import tempfile
+import threading
+import pytest
+from click.testing import CliRunner
+import app.daemon
+import app.manifest
+from app.cache import enable_content_cache
+from app.cli import interface
+from app.commands.list import list_
+from app.daemon import DaemonError, forward_request, get_socket_path
+from app.manifest import enable_manifest_cache, read_manifest
+from app.server import DaemonServer
+from app.store import store_directory
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Returns a config using the daemon, with a template and a source
+
+    Sockets are kept in a short temporary directory since the path of a
+    Unix socket is limited in length.
+
+    """
+
+    from app import TestConfig
+
+    runtime_dir = tempfile.mkdtemp(prefix='scaffold-')
+    monkeypatch.setenv('XDG_RUNTIME_DIR', runtime_dir)
+
+    src = tmp_path / 'src'
+    src.mkdir()
+    for index in range(5):
+        (src / f'file{index}').write_text(str(index))
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    store_directory(str(src), str(templates / 'project'))
+
+    config = TestConfig(str(templates))
+    config.USE_DAEMON = True
+    yield config
+    shutil.rmtree(runtime_dir)
+
+@pytest.fixture
+def daemon(config):
+    """Serves the config's template folder on a thread"""
+    server = DaemonServer(config.TEMPLATE_FOLDER)
+    thread = threading.Thread(target=server.serve, args=(0.05,))
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+    enable_manifest_cache(0)
+    enable_content_cache(0)
+
+@pytest.mark.daemon
+def test_forward_without_daemon(config):
+    """nothing is forwarded when no daemon runs or it is disabled"""
+    assert forward_request(config, 'list') is None
+
+    socket_path = get_socket_path(config.TEMPLATE_FOLDER)
+    os.makedirs(os.path.dirname(socket_path), mode=0o700)
+    open(socket_path, 'w').close()
+    assert forward_request(config, 'list') is None
+
+@pytest.mark.daemon
+def test_untrusted_sockets_are_not_used(mocker, config, daemon):
+    """sockets of other users, or in folders others can write to, are
+    never connected to"""
+    send_request = mocker.spy(app.daemon, 'send_request')
+    socket_folder = os.path.dirname(daemon.socket_path)
+    assert os.stat(socket_folder).st_mode & 0o777 == 0o700
+    assert os.stat(daemon.socket_path).st_mode & 0o777 == 0o600
+
+    mocker.patch('app.daemon.get_uid', return_value=os.getuid() + 1)
+    assert forward_request(config, 'list') is None
+    mocker.stopall()
+
+    os.chmod(socket_folder, 0o777)
+    try:
+        assert forward_request(config, 'list') is None
+    finally:
+        os.chmod(socket_folder, 0o700)
+    send_request.assert_not_called()
+    assert forward_request(config, 'list') == ['project']
+
+@pytest.mark.daemon
+def test_daemon_failures_are_reported(mocker, config, daemon):
+    """a request the daemon accepted is never run again in-process"""
+    with pytest.raises(DaemonError, match='`unknown`'):
+        forward_request(config, 'unknown')
+
+    mocker.patch('app.daemon.send_request',
+                 side_effect=ConnectionResetError(errno.ECONNRESET, 'reset'))
+    mocker.patch('app.cli.Config', return_value=config)
+    remove_template = mocker.patch('app.commands.delete.remove_template')
+    result = CliRunner().invoke(interface, ['delete', '-t', 'project'])
+    assert result.exit_code == 1
+    assert 'The daemon failed to run `delete`' in result.output
+    remove_template.assert_not_called()
+
+    app.daemon.send_request.side_effect = ConnectionRefusedError(
+        errno.ECONNREFUSED, 'refused')
+    assert forward_request(config, 'list') is None
+
+@pytest.mark.daemon
+def test_daemon_runs_the_engines(config, daemon, tmp_path):
+    """creates, clones, lists and deletes templates in the daemon"""
+    status = forward_request(config, 'create', path=str(tmp_path / 'src'),
+                             name='copy', force=False,
+                             template_format='store', options={})
+    assert status['is_successful'] is True
+    assert forward_request(config, 'list') == ['copy', 'project']
+
+    status = forward_request(config, 'clone', path=str(tmp_path),
+                             template='project', name='clone',
+                             options=dict(jobs=1))
+    assert status['is_successful'] is True
+    assert len(os.listdir(tmp_path / 'clone')) == 5
+    assert forward_request(config, 'stats')['misses'] == 1
+
+    statuses = forward_request(
+        config, 'clone_many', template='copy',
+        destinations=[[str(tmp_path), 'a'], [str(tmp_path), 'b']])
+    assert [status['is_successful'] for status in statuses] == [True, True]
+
+    forward_request(config, 'delete', template='copy')
+    details = forward_request(config, 'list', details=True)
+    assert [template['name'] for template in details] == ['project']
+    assert details[0]['files'] == 5
+
+@pytest.mark.daemon
+def test_daemon_reloads_changed_folder(config, daemon, tmp_path):
+    """templates added without the daemon are listed once it noticed"""
+    assert forward_request(config, 'list') == ['project']
+    store_directory(str(tmp_path / 'src'),
+                    os.path.join(config.TEMPLATE_FOLDER, 'other'))
+    assert forward_request(config, 'list', prefix='o') == ['other']
+
+@pytest.mark.daemon
+def test_warm_index_reloads_a_folder_changed_while_loading(
+        mocker, config, tmp_path):
+    """a template added while the index loads is listed on the next call"""
+    from app.server import WarmIndex
+    from app.index import load_index
+
+    def load_and_add(template_folder, **kwargs):
+        rows = load_index(template_folder, **kwargs)
+        if mocked.call_count == 1:
+            store_directory(str(tmp_path / 'src'),
+                            os.path.join(template_folder, 'other'))
+            os.utime(template_folder, ns=(0, 0))
+        return rows
+
+    mocked = mocker.patch('app.server.load_index', side_effect=load_and_add)
+    index = WarmIndex(config.TEMPLATE_FOLDER)
+
+    assert [row[0] for row in index.get_rows()] == ['project']
+    assert [row[0] for row in index.get_rows()] == ['other', 'project']
+
+@pytest.mark.daemon
+def test_list_command_uses_daemon(mocker, config, daemon):
+    """the list command is answered by the daemon"""
+    get_templates = mocker.patch('app.commands.list.get_templates')
+    result = CliRunner().invoke(list_, [], obj=config)
+
+    assert result.output == '1 project\n'
+    get_templates.assert_not_called()
+
+@pytest.mark.daemon
+def test_one_daemon_per_folder(config, daemon):
+    """a second daemon is refused and a stale socket is replaced"""
+    with pytest.raises(OSError):
+        DaemonServer(config.TEMPLATE_FOLDER)
+
+    socket_path = os.path.join(os.environ['XDG_RUNTIME_DIR'], 'stale.sock')
+    open(socket_path, 'w').close()
+    server = DaemonServer(config.TEMPLATE_FOLDER, socket_path)
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
+    server.server_close()
+    assert not os.path.exists(socket_path)
+
+@pytest.mark.daemon
+def test_manifest_cache(mocker, config):
+    """manifests are read once until their file is replaced"""
+    template = os.path.join(config.TEMPLATE_FOLDER, 'project')
+    enable_manifest_cache(1)
+    load = mocker.spy(app.manifest.json, 'load')
+    try:
+        manifest = read_manifest(template)
+        assert read_manifest(template) is manifest
+        assert load.call_count == 1
+
+        os.utime(template, ns=(0, 0))
+        assert read_manifest(template) is not manifest
+        assert load.call_count == 2
+    finally:
+        enable_manifest_cache(0)
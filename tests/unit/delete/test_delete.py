@@ -1,7 +1,7 @@
 """This unit test suite tests the application's "delete" command."""
 
 import pytest
-from app.cli import delete
+from app.commands.delete import delete
 
 
 @pytest.fixture
@@ -22,7 +22,8 @@ def test_clone_without_template(delete_template):
 def test_clone_displays_success_message(delete_template, mocker):
     """The message sent to the client from remove_template is displayed"""
     message = 'delete display message'
-    mocker.patch('app.cli.remove_template', return_value={'msg': message})
+    mocker.patch('app.commands.delete.remove_template',
+                 return_value={'msg': message})
     response = delete_template(["-t", "flask-app"])
 
     assert response.exit_code == 0
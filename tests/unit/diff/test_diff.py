@@ -0,0 +1,128 @@
+"""This unit test suite tests the comparison of templates and directories."""
+
+import os
+import shutil
+import pytest
+from click.testing import CliRunner
+from app import diff as diff_module
+from app.commands.diff import diff as diff_command
+from app.engines import clone_template, create_template, diff_template
+from app.store import get_store_function
+from app.utils import get_clone_function
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a stored, an archive and a directory template"""
+    src = tmp_path / 'src'
+    (src / 'ci').mkdir(parents=True)
+    (src / 'README.md').write_text('# project\nfirst\n')
+    (src / 'ci' / 'build.yml').write_text('steps: []\n')
+    (src / 'logo.bin').write_bytes(b'\0' * 64)
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+
+    create_template(str(src), 'stored', get_store_function(str(src)), True,
+                    str(templates))
+    create_template(str(src), 'archived',
+                    get_store_function(str(src), 'archive'), True,
+                    str(templates))
+    shutil.copytree(str(src), str(templates / 'legacy'))
+    return templates
+
+def make_clone(template_folder, tmp_path, name):
+    """Clones a template and returns the path of the clone"""
+    clone_template(str(tmp_path), name, f'{name}-clone',
+                   get_clone_function(str(tmp_path)), str(template_folder))
+    return tmp_path / f'{name}-clone'
+
+def drift(clone):
+    """Adds, removes and modifies files of a clone"""
+    (clone / 'README.md').write_text('# project\nsecond\n')
+    (clone / 'ci' / 'build.yml').unlink()
+    (clone / 'ci' / 'test.yml').write_text('steps: [test]\n')
+    (clone / 'logo.bin').write_bytes(b'\1' * 64)
+
+@pytest.mark.diff
+@pytest.mark.parametrize('name', ['stored', 'archived', 'legacy'])
+def test_fresh_clones_are_unchanged_without_hashing(
+        mocker, template_folder, tmp_path, name):
+    """files with the template's size and mtime are never hashed"""
+    clone = make_clone(template_folder, tmp_path, name)
+    hash_file = mocker.spy(diff_module, 'hash_file')
+
+    status = diff_template(name, str(clone), str(template_folder))
+
+    assert status['is_successful']
+    assert (status['added'], status['removed'], status['modified']) == \
+        ([], [], [])
+    if name != 'legacy':
+        hash_file.assert_not_called()
+
+@pytest.mark.diff
+@pytest.mark.parametrize('name', ['stored', 'archived', 'legacy'])
+def test_drifted_clones_list_their_changes(template_folder, tmp_path, name):
+    """added, removed and modified files are listed"""
+    clone = make_clone(template_folder, tmp_path, name)
+    drift(clone)
+
+    status = diff_template(name, str(clone), str(template_folder))
+
+    assert status['added'] == [os.path.join('ci', 'test.yml')]
+    assert status['removed'] == [os.path.join('ci', 'build.yml')]
+    assert status['modified'] == ['README.md', 'logo.bin']
+    assert status['msg'].splitlines()[0] == \
+        f'`{clone}` has 1 added, 1 removed and 2 modified files compared ' \
+        f'to template `{name}`.'
+
+@pytest.mark.diff
+def test_same_size_files_are_hashed(template_folder, tmp_path):
+    """a touched file with the same contents is unchanged"""
+    clone = make_clone(template_folder, tmp_path, 'stored')
+    os.utime(clone / 'README.md', (0, 0))
+    (clone / 'logo.bin').write_bytes(b'\1' * 64)
+
+    status = diff_template('stored', str(clone), str(template_folder),
+                           jobs=2)
+
+    assert status['modified'] == ['logo.bin']
+
+@pytest.mark.diff
+def test_diff_patch(template_folder, tmp_path):
+    """text files get unified diffs and binary files are only reported"""
+    clone = make_clone(template_folder, tmp_path, 'archived')
+    drift(clone)
+
+    status = diff_template('archived', str(clone), str(template_folder),
+                           patch=True)
+
+    lines = status['msg'].splitlines()
+    patch = lines[lines.index('    modified: logo.bin') + 1:]
+    build, test = os.path.join('ci', 'build.yml'), os.path.join('ci',
+                                                                'test.yml')
+    assert patch == [
+        '--- a/README.md', '+++ b/README.md', '@@ -1,2 +1,2 @@',
+        ' # project', '-first', '+second',
+        f'--- a/{build}', f'+++ b/{build}', '@@ -1 +0,0 @@', '-steps: []',
+        f'--- a/{test}', f'+++ b/{test}', '@@ -0,0 +1 @@',
+        '+steps: [test]',
+        'Binary files a/logo.bin and b/logo.bin differ']
+
+@pytest.mark.diff
+def test_diff_command(template_folder, tmp_path):
+    """the summary is printed and missing paths are reported"""
+    from app import TestConfig
+
+    clone = make_clone(template_folder, tmp_path, 'stored')
+    (clone / 'NOTES.md').write_text('notes\n')
+    config = TestConfig(str(template_folder))
+    runner = CliRunner()
+
+    response = runner.invoke(diff_command, ['-t', 'stored', '-p', str(clone),
+                                            '-u'], obj=config)
+    assert response.output.splitlines()[1:] == [
+        '    added: NOTES.md', '--- a/NOTES.md', '+++ b/NOTES.md',
+        '@@ -0,0 +1 @@', '+notes']
+
+    response = runner.invoke(diff_command, ['-t', 'missing'], obj=config)
+    assert response.output == 'Template `missing` does not exist.\n'
@@ -79,23 +79,22 @@ def test_create_if_delete_template_throws_error(mocker, default_args):
         'delete_template', template_name=template_name).get_message()
 
 @pytest.mark.engine
-def test_create_template_file_creates_a_directory(mocker, default_args):
-    """A new directory is created with the template_path and file name"""
+def test_create_template_executes_with_the_template_path(mocker, default_args):
+    """The clone function is called with the src and the template's path"""
     template_name, template_folder, success_status = itemgetter(
         'template_folder', 'template_folder', 'success_status')(default_args)
     joined_path = '~/templates/flask-shell'
+    execute = mocker.Mock(return_value=success_status)
 
-    mocker.patch('os.mkdir', return_value=True)
     mocker.patch('app.engines.get_template', return_value=True)
     mocker.patch('app.engines.delete_template', return_value=success_status)
     mocker.patch('os.path.join', return_value=joined_path)
 
     app.engines.create_template(
-        'src', template_name,
-        {'type': 'file', 'execute':lambda src, dest: success_status},
+        'src', template_name, {'type': 'file', 'execute': execute},
         True, template_folder)
 
-    os.mkdir.assert_called_once_with(joined_path)
+    execute.assert_called_once_with('src', joined_path)
 
 @pytest.mark.engine
 def test_create_template_directory_wont_create_a_directory(
@@ -263,3 +262,24 @@ def test_delete_when_template_not_found(mocker, default_args):
     assert create_result['is_successful'] is False
     assert create_result['msg'] == ErrorMessage(
         'template_missing', template_name=template_name).get_message()
+
+@pytest.mark.engine
+def test_create_existing_stored_template_with_force_flag(mocker, default_args):
+    """a stored template is synced instead of deleted"""
+    template_name, template_folder = itemgetter(
+        'template_name', 'template_folder')(default_args)
+    sync_status = dict(is_successful=True, added=1, changed=2, removed=3)
+
+    mocker.patch('app.engines.get_template', return_value=True)
+    mocker.patch('app.engines.get_template_format', return_value='store')
+    mocker.patch('app.engines.delete_template')
+    create_result = app.engines.create_template(
+        'src', template_name,
+        {'type': 'directory', 'format': 'store',
+         'execute': lambda src, dest: sync_status},
+        True, template_folder)
+
+    app.engines.delete_template.assert_not_called()
+    assert create_result['msg'] == InfoMessage(
+        'template_updated', template_name=template_name, added=1, changed=2,
+        removed=3).get_message()
@@ -0,0 +1,96 @@
+"""This unit test suite tests the fan-out clone to many destinations."""
+
+import builtins
+import io
+import os
+import pytest
+import tarfile
+from app.archive import archive_directory
+from app.engines import clone_template_to_many
+from app.fanout import fan_out_template
+from app.store import store_directory
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a stored, an archive and a directory template"""
+    src = tmp_path / 'src'
+    (src / 'docs').mkdir(parents=True)
+    (src / 'docs' / 'README').write_text('readme')
+    (src / 'run.sh').write_text('echo run')
+    os.chmod(src / 'run.sh', 0o755)
+    os.symlink('run.sh', src / 'start')
+
+    template_folder = tmp_path / 'templates'
+    template_folder.mkdir()
+    store_directory(str(src), str(template_folder / 'stored'))
+    archive_directory(str(src), str(template_folder / 'archived'))
+    os.rename(src, template_folder / 'directory')
+    return template_folder
+
+@pytest.mark.fanout
+@pytest.mark.parametrize('name', ['stored', 'archived', 'directory'])
+def test_fan_out_template_clones_every_destination(
+        template_folder, tmp_path, name):
+    """every destination holds the template's files, modes and symlinks"""
+    dests = [str(tmp_path / 'clones' / f'clone{index}') for index in range(3)]
+
+    statuses = fan_out_template(str(template_folder / name), dests, jobs=2)
+
+    assert statuses == [{'is_successful': True}] * 3
+    for dest in dests:
+        assert open(os.path.join(dest, 'docs', 'README')).read() == 'readme'
+        assert os.readlink(os.path.join(dest, 'start')) == 'run.sh'
+        assert os.stat(os.path.join(dest, 'run.sh')).st_mode & 0o777 == 0o755
+
+@pytest.mark.fanout
+def test_fan_out_template_reads_every_file_once(
+        mocker, template_folder, tmp_path):
+    """the template's blobs are opened for reading once for all clones"""
+    dests = [str(tmp_path / f'clone{index}') for index in range(4)]
+    spy = mocker.spy(builtins, 'open')
+
+    fan_out_template(str(template_folder / 'stored'), dests, jobs=1)
+    reads = [call.args[0] for call in spy.call_args_list
+             if 'objects' in str(call.args[0])]
+
+    assert len(reads) == 2
+
+@pytest.mark.fanout
+def test_clone_template_to_many_reports_each_destination(
+        template_folder, tmp_path):
+    """an existing destination fails without stopping the others"""
+    (tmp_path / 'taken').mkdir()
+    destinations = [(str(tmp_path), 'taken'), (str(tmp_path), 'free')]
+
+    statuses = clone_template_to_many(destinations, 'stored',
+                                      str(template_folder), mode='hardlink')
+
+    assert [status['is_successful'] for status in statuses] == [False, True]
+    assert str(tmp_path / 'taken') in statuses[0]['msg']
+    assert statuses[1]['msg'] == 'Template `stored` has been cloned to ' \
+        f'`{tmp_path / "free"}`'
+    assert os.listdir(tmp_path / 'taken') == []
+
+@pytest.mark.fanout
+@pytest.mark.parametrize('name', ['link/file', 'link'])
+def test_fan_out_template_rejects_members_at_symlinks(tmp_path, name):
+    """an archive member can't be written through or at one of its
+    symlinks"""
+    template = str(tmp_path / 'evil')
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    with tarfile.open(template, 'w:gz') as archive:
+        tarinfo = tarfile.TarInfo('link')
+        tarinfo.type = tarfile.SYMTYPE
+        tarinfo.linkname = str(outside)
+        archive.addfile(tarinfo)
+        tarinfo = tarfile.TarInfo(name)
+        tarinfo.size = 1
+        archive.addfile(tarinfo, io.BytesIO(b'x'))
+
+    dests = [str(tmp_path / f'clone{index}') for index in range(2)]
+    statuses = fan_out_template(template, dests, jobs=1)
+
+    assert [status['is_successful'] for status in statuses] == [False] * 2
+    assert os.listdir(outside) == []
@@ -0,0 +1,149 @@
+"""This unit test suite tests the application's file materialization."""
+
+import errno
+import io
+import os
+import pytest
+from app import fileops
+from app.fileops import copy_large_file, materialize_file
+from app.progress import reporting
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    """Creates a source file to materialize"""
+    src = tmp_path / 'src.txt'
+    src.write_text('contents')
+    return str(src)
+
+@pytest.mark.fileops
+def test_materialize_file_hardlink_shares_the_inode(source_file, tmp_path):
+    """the destination is a hardlink to the source"""
+    dest = str(tmp_path / 'dest.txt')
+
+    assert materialize_file(source_file, dest, 'hardlink') == 'hardlink'
+    assert os.stat(dest).st_ino == os.stat(source_file).st_ino
+
+@pytest.mark.fileops
+def test_materialize_file_symlink_points_to_the_source(source_file, tmp_path):
+    """the destination is an absolute symlink to the source"""
+    dest = str(tmp_path / 'dest.txt')
+
+    assert materialize_file(source_file, dest, 'symlink') == 'symlink'
+    assert os.readlink(dest) == os.path.abspath(source_file)
+
+@pytest.mark.fileops
+def test_materialize_file_hardlink_falls_back_to_copy(
+        mocker, source_file, tmp_path):
+    """the file is copied when the hardlink fails"""
+    mocker.patch('os.link', side_effect=OSError())
+    dest = tmp_path / 'dest.txt'
+
+    assert materialize_file(source_file, str(dest), 'hardlink') == 'copy'
+    assert dest.read_text() == 'contents'
+    assert os.stat(dest).st_ino != os.stat(source_file).st_ino
+
+@pytest.mark.fileops
+def test_materialize_file_reflink_falls_back_to_copy(
+        mocker, source_file, tmp_path):
+    """the file is copied when neither reflinks nor copy_file_range work"""
+    mocker.patch('app.fileops.reflink_file', side_effect=OSError())
+    mocker.patch('app.fileops.copy_file_range', side_effect=OSError())
+    dest = tmp_path / 'dest.txt'
+
+    assert materialize_file(source_file, str(dest), 'reflink') == 'copy'
+    assert dest.read_text() == 'contents'
+
+@pytest.mark.fileops
+def test_materialize_file_auto_copies_when_reflinks_fail(
+        mocker, source_file, tmp_path):
+    """auto copies the file when the filesystem refuses the reflink"""
+    mocker.patch('app.fileops.reflink_file', side_effect=OSError())
+    dest = tmp_path / 'dest.txt'
+
+    assert materialize_file(source_file, str(dest), 'auto') == 'copy'
+    assert dest.read_text() == 'contents'
+
+@pytest.mark.fileops
+def test_materialize_file_auto_remembers_refusing_device_pairs(
+        mocker, source_file, tmp_path):
+    """a device pair refusing reflinks is skipped, unless it failed with
+    EXDEV"""
+    mocker.patch.object(fileops, '_NO_REFLINK_DEVICES', set())
+    reflink = mocker.patch('app.fileops.reflink_file',
+                           side_effect=OSError(errno.EXDEV, 'cross-device'))
+    materialize_file(source_file, str(tmp_path / 'first'), 'auto')
+    materialize_file(source_file, str(tmp_path / 'second'), 'auto')
+    assert reflink.call_count == 2
+
+    reflink.side_effect = OSError(errno.EOPNOTSUPP, 'not supported')
+    materialize_file(source_file, str(tmp_path / 'third'), 'auto')
+    materialize_file(source_file, str(tmp_path / 'fourth'), 'auto')
+    assert reflink.call_count == 3
+    device = os.stat(tmp_path).st_dev
+    assert fileops._NO_REFLINK_DEVICES == {(device, device)}
+
+@pytest.mark.fileops
+def test_materialize_file_with_unsupported_mode(source_file, tmp_path):
+    """throws a validation error when an unsupported mode is sent"""
+    with pytest.raises(ValueError):
+        materialize_file(source_file, str(tmp_path / 'dest.txt'), 'move')
+
+@pytest.fixture
+def sparse_file(tmp_path):
+    """Creates a sparse file with data at both ends"""
+    src = tmp_path / 'sparse.bin'
+    with open(src, 'wb') as file_:
+        file_.write(b'head' * 1024)
+        file_.seek(32 * 1024 * 1024)
+        file_.write(b'tail' * 1024)
+    return str(src)
+
+@pytest.mark.fileops
+def test_large_files_keep_their_holes(mocker, sparse_file, tmp_path):
+    """files above the threshold are copied without filling their holes"""
+    mocker.patch('app.fileops.LARGE_FILE_THRESHOLD', 1024)
+    copy_large_file_ = mocker.spy(fileops, 'copy_large_file')
+    dest = str(tmp_path / 'dest.bin')
+
+    assert materialize_file(sparse_file, dest) == 'copy'
+    copy_large_file_.assert_called_once_with(sparse_file, dest)
+    with open(sparse_file, 'rb') as src, open(dest, 'rb') as copy:
+        assert src.read() == copy.read()
+    assert os.stat(dest).st_blocks <= os.stat(sparse_file).st_blocks
+
+@pytest.mark.fileops
+def test_large_files_fall_back_to_userspace_copies(
+        mocker, sparse_file, tmp_path):
+    """the data is read and written when no kernel copy is supported"""
+    unsupported = OSError(errno.EXDEV, 'Invalid cross-device link')
+    mocker.patch('os.copy_file_range', side_effect=unsupported, create=True)
+    mocker.patch('os.sendfile', side_effect=unsupported, create=True)
+    dest = str(tmp_path / 'dest.bin')
+
+    copy_large_file(sparse_file, dest, chunk_size=1000)
+    with open(sparse_file, 'rb') as src, open(dest, 'rb') as copy:
+        assert src.read() == copy.read()
+
+@pytest.mark.fileops
+def test_large_file_copies_report_permission_errors(
+        mocker, sparse_file, tmp_path):
+    """only a copy_file_range denied by a seccomp filter falls back"""
+    denied = OSError(errno.EPERM, 'Operation not permitted')
+    mocker.patch('os.copy_file_range', side_effect=denied, create=True)
+    sendfile = mocker.patch('os.sendfile', side_effect=denied, create=True)
+
+    with pytest.raises(PermissionError):
+        copy_large_file(sparse_file, str(tmp_path / 'dest.bin'))
+    sendfile.assert_called_once()
+
+@pytest.mark.fileops
+def test_large_file_copies_report_their_progress(sparse_file, tmp_path):
+    """the bytes copied are shown while reporting"""
+    stream = io.StringIO()
+    with reporting(stream) as progress:
+        copy_large_file(sparse_file, str(tmp_path / 'dest.bin'))
+
+    assert progress.copied == progress.total == os.stat(sparse_file).st_size
+    assert stream.getvalue().endswith(
+        'Copying large files: 32.0 MB of 32.0 MB (100%)\n')
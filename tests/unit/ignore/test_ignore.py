@@ -0,0 +1,99 @@
+"""This unit test suite tests the ignore rules of template sources."""
+
+import os
+import pytest
+from app.commands.create import create
+from app.engines import create_template, preview_template
+from app.ignore import IgnoreRules, load_ignore_rules
+from app.manifest import read_manifest
+from app.store import get_store_function
+from app.utils import scan_tree
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Creates a working directory with a .scaffoldignore file"""
+    src = tmp_path / 'src'
+    for directory in ('.git', 'node_modules/lib', 'app/__pycache__',
+                      'build', 'docs/build'):
+        (src / directory).mkdir(parents=True)
+    for path in ('.git/HEAD', 'node_modules/lib/index.js', 'app/main.py',
+                 'app/__pycache__/main.pyc', 'build/out', 'docs/build/x',
+                 'debug.log', 'keep.log', 'README'):
+        (src / path).write_text('x' * 10)
+    (src / '.scaffoldignore').write_text(
+        '# working directory leftovers\n.git/\nnode_modules\n'
+        '__pycache__/\n/build\n*.log\n!keep.log\n')
+    return src
+
+@pytest.mark.ignore
+@pytest.mark.parametrize('pattern, path, is_dir, ignored', [
+    ('*.pyc', 'a/b/c.pyc', False, True),
+    ('/build', 'build', True, True),
+    ('/build', 'docs/build', True, False),
+    ('docs/*.md', 'docs/a.md', False, True),
+    ('docs/*.md', 'docs/sub/a.md', False, False),
+    ('**/cache', 'a/b/cache', True, True),
+    ('logs/**', 'logs/a/b', False, True),
+    ('dist/', 'dist', False, False),
+    ('file[0-9]', 'file3', False, True),
+    ('file[!0-9]', 'file3', False, False),
+    ('\\!important', '!important', False, True),
+])
+def test_patterns(pattern, path, is_dir, ignored):
+    """the patterns follow the syntax of .gitignore files"""
+    assert IgnoreRules([pattern]).is_ignored(path, is_dir) is ignored
+
+@pytest.mark.ignore
+def test_ignored_directories_are_not_descended(mocker, source):
+    """the walk skips ignored entries without reading ignored directories"""
+    scandir = mocker.spy(os, 'scandir')
+    paths = [path for path, _ in scan_tree(str(source),
+                                           load_ignore_rules(str(source)))]
+
+    assert sorted(paths) == ['.scaffoldignore', 'README', 'app',
+                             os.path.join('app', 'main.py'), 'docs',
+                             os.path.join('docs', 'build'),
+                             os.path.join('docs', 'build', 'x'), 'keep.log']
+    scanned = {os.path.relpath(call.args[0], source)
+               for call in scandir.call_args_list}
+    assert scanned == {'.', 'app', 'docs', os.path.join('docs', 'build')}
+
+@pytest.mark.ignore
+@pytest.mark.parametrize('template_format', ['store', 'archive'])
+def test_create_leaves_ignored_paths_out(source, tmp_path, template_format):
+    """the ignore file and the excludes are applied to every format"""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    status = create_template(
+        str(source), 'project',
+        get_store_function(str(source), template_format), False,
+        str(templates), excludes=['docs/'])
+
+    assert status['is_successful'] is True
+    if template_format == 'store':
+        paths = {entry['path'] for entry
+                 in read_manifest(str(templates / 'project'))['entries']}
+        assert paths == {'.scaffoldignore', 'README', 'app', 'keep.log',
+                         os.path.join('app', 'main.py')}
+
+@pytest.mark.ignore
+def test_preview_template(source):
+    """the files that would be saved are listed with their size"""
+    status = preview_template(str(source), excludes=['README'])
+
+    assert status['files'] == [('.scaffoldignore', 85), ('keep.log', 10),
+                               (os.path.join('app', 'main.py'), 10),
+                               (os.path.join('docs', 'build', 'x'), 10)]
+    assert status['msg'] == '4 files, 115 B would be saved.'
+
+@pytest.mark.ignore
+def test_create_dry_run(mocker, click_runner, source):
+    """nothing is saved with --dry-run"""
+    create_template = mocker.patch('app.commands.create.create_template')
+    response = click_runner(create)(['-p', str(source), '--dry-run',
+                                     '-e', 'app', '-e', 'docs'])
+
+    create_template.assert_not_called()
+    assert response.output == '.scaffoldignore 85 B\nREADME 10 B\n' \
+        'keep.log 10 B\n3 files, 105 B would be saved.\n'
@@ -0,0 +1,61 @@
+"""This unit test suite tests the application's template index."""
+
+import os
+import pytest
+import app.index
+from app.index import load_index, query_index, row_to_dict, update_index
+from app.store import store_directory
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a template folder with two stored templates"""
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'small.txt').write_text('a')
+    folder = tmp_path / 'templates'
+    folder.mkdir()
+    store_directory(str(src), str(folder / 'flask-small'))
+    (src / 'large.txt').write_text('b' * 100)
+    store_directory(str(src), str(folder / 'react-large'))
+    return str(folder)
+
+@pytest.mark.index
+def test_load_index_describes_every_template(template_folder):
+    """every template has a row with its size and file count"""
+    rows = [row_to_dict(row)
+            for row in load_index(template_folder, details=True)]
+
+    assert [row['name'] for row in rows] == ['flask-small', 'react-large']
+    assert (rows[1]['format'], rows[1]['size'], rows[1]['files']) == \
+        ('store', 101, 2)
+
+@pytest.mark.index
+def test_load_index_reads_a_current_index(mocker, template_folder):
+    """the template folder is not scanned while the index is current"""
+    load_index(template_folder)
+    mocker.spy(app.index, 'reconcile_index')
+
+    load_index(template_folder)
+    assert app.index.reconcile_index.call_count == 0
+
+@pytest.mark.index
+def test_load_index_rebuilds_a_stale_index(template_folder):
+    """templates added after the index was written are listed"""
+    load_index(template_folder)
+    os.mkdir(os.path.join(template_folder, 'legacy'))
+
+    assert load_index(template_folder) == \
+        ['flask-small', 'legacy', 'react-large']
+
+@pytest.mark.index
+def test_query_index_filters_and_sorts(template_folder):
+    """templates are filtered by prefix and sorted by size"""
+    assert query_index(template_folder, prefix='fl') == ['flask-small']
+    assert query_index(template_folder, sort_by='size', reverse=True) == \
+        ['react-large', 'flask-small']
+
+@pytest.mark.index
+def test_update_index_with_errors():
+    """returns a failure indicator when the template folder is missing"""
+    assert update_index('~/missing')['is_successful'] is False
@@ -0,0 +1,120 @@
+"""This unit test suite tests the clone and create checkpoint journal."""
+
+import os
+import pytest
+import app.store
+import app.utils
+from app.journal import Journal, get_journal_path
+from app.store import store_directory, restore_template
+from app.utils import clone_directory
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """Creates a source directory with a few files"""
+    src = tmp_path / 'src'
+    (src / 'docs').mkdir(parents=True)
+    for name in ('a', 'b', 'c'):
+        (src / 'docs' / name).write_text(name)
+    template_folder = tmp_path / 'templates'
+    template_folder.mkdir()
+    return str(src), str(template_folder)
+
+def fail_after(mocker, module, name, calls):
+    """Patches module.name to raise an OSError after a number of calls
+
+    Patches from an earlier call are undone first.
+
+    """
+
+    mocker.stopall()
+    function = getattr(module, name)
+    count = []
+
+    def side_effect(*args, **kwargs):
+        count.append(None)
+        if len(count) > calls:
+            raise OSError('interrupted')
+        return function(*args, **kwargs)
+
+    return mocker.patch.object(module, name, side_effect=side_effect)
+
+@pytest.mark.journal
+def test_journal_resumes_the_completed_paths(tmp_path):
+    """records of a journal with the same identity are loaded"""
+    dest = str(tmp_path / 'clone')
+    with Journal(dest, 'src') as journal:
+        journal.record('a', {'size': 1})
+
+    assert Journal(dest, 'src', resume=True).completed == {'a': {'size': 1}}
+    assert Journal(dest, 'other', resume=True).completed == {}
+
+@pytest.mark.journal
+def test_journal_ignores_partly_written_lines(tmp_path):
+    """a torn last line is skipped and the journal is removed on finish"""
+    dest = str(tmp_path / 'clone')
+    with Journal(dest, 'src') as journal:
+        journal.record('a', {'size': 1})
+    with open(get_journal_path(dest), 'a') as file_:
+        file_.write('["b", {"si')
+
+    journal = Journal(dest, 'src', resume=True)
+    assert journal.completed == {'a': {'size': 1}}
+    journal.finish()
+    assert not os.path.exists(get_journal_path(dest))
+
+@pytest.mark.journal
+def test_restore_template_resumes_an_interrupted_clone(
+        mocker, source_tree, tmp_path):
+    """only the files missing from the interrupted clone are restored"""
+    src, template_folder = source_tree
+    template = os.path.join(template_folder, 'project')
+    dest = str(tmp_path / 'clone')
+    store_directory(src, template)
+
+    fail_after(mocker, app.store, 'restore_file', 1)
+    assert restore_template(template, dest, jobs=1)['is_successful'] is False
+    assert os.path.exists(get_journal_path(dest))
+
+    restore_file = fail_after(mocker, app.store, 'restore_file', 3)
+    status = restore_template(template, dest, jobs=1, resume=True)
+
+    assert status['is_successful'] is True
+    assert restore_file.call_count == 2
+    assert sorted(os.listdir(os.path.join(dest, 'docs'))) == ['a', 'b', 'c']
+    assert not os.path.exists(get_journal_path(dest))
+
+@pytest.mark.journal
+def test_clone_directory_resumes_an_interrupted_clone(
+        mocker, source_tree, tmp_path):
+    """files verified by the journal are not copied again"""
+    src, _ = source_tree
+    dest = str(tmp_path / 'clone')
+
+    fail_after(mocker, app.utils, 'copy_file', 2)
+    assert clone_directory(src, dest, jobs=1)['is_successful'] is False
+
+    copy_file = fail_after(mocker, app.utils, 'copy_file', 3)
+    status = clone_directory(src, dest, jobs=1, resume=True)
+
+    assert status['is_successful'] is True
+    assert copy_file.call_count == 1
+    assert open(os.path.join(dest, 'docs', 'c')).read() == 'c'
+
+@pytest.mark.journal
+def test_store_directory_resumes_an_interrupted_create(
+        mocker, source_tree):
+    """files the interrupted create added to the store are not hashed again"""
+    src, template_folder = source_tree
+    template = os.path.join(template_folder, 'project')
+
+    fail_after(mocker, app.store, 'put_blob', 2)
+    assert store_directory(src, template, jobs=1)['is_successful'] is False
+    assert not os.path.exists(template)
+
+    put_blob = fail_after(mocker, app.store, 'put_blob', 3)
+    status = store_directory(src, template, jobs=1, resume=True)
+
+    assert status['is_successful'] is True
+    assert put_blob.call_count == 1
+    assert not os.path.exists(get_journal_path(template))
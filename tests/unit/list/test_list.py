@@ -1,7 +1,7 @@
 """This unit test suite tests the application's "list" command."""
 
 import pytest
-from app.cli import list_
+from app.commands.list import list_
 
 
 @pytest.fixture
@@ -22,7 +22,18 @@ def test_list_returns_an_empty_string(list_templates):
 def test_list_returns_all_templates(list_templates, mocker):
     """An empty string is returned when there are no templates"""
     template_list = ['flask', 'react']
-    mocker.patch('app.cli.get_templates', return_value=template_list)
+    mocker.patch('app.commands.list.get_templates', return_value=template_list)
     response = list_templates([])
     assert response.exit_code == 0
     assert f'1 {template_list[0]}\n2 {template_list[1]}\n' == response.output
+
+@pytest.mark.command
+@pytest.mark.list
+def test_list_long_displays_size_and_file_count(list_templates, mocker):
+    """The size and file count of every template is displayed"""
+    details = [{'name': 'flask', 'size': 2048, 'files': 3}]
+    mocker.patch('app.commands.list.get_template_details',
+                 return_value=details)
+    response = list_templates(['--long'])
+    assert response.exit_code == 0
+    assert response.output == '1 flask 2.0 KB 3 files\n'
@@ -0,0 +1,191 @@
+"""This unit test suite tests the templates of remote registries."""
+
+import http.client
+import os
+import threading
+import pytest
+from app.engines import clone_template, create_template
+from app.manifest import read_manifest
+from app.registry import RegistryHandler, RegistryServer
+from app.remote import (ConnectionPool, check_manifest, fetch_template,
+                        get_cached_path)
+from app.store import get_blob_path, get_store_function, collect_garbage
+from app.utils import get_clone_function
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Serves a template folder with two stored templates"""
+    registry_folder = tmp_path / 'registry'
+    registry_folder.mkdir()
+    for name in ('app', 'docs'):
+        src = tmp_path / name
+        (src / 'ci').mkdir(parents=True)
+        (src / 'README.md').write_text(f'# {name}\n')
+        (src / 'ci' / 'build.yml').write_text(f'{name}: ' + 'x' * 1000)
+        create_template(str(src), name, get_store_function(str(src)), True,
+                        str(registry_folder))
+
+    server = RegistryServer(str(registry_folder), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates an empty template folder"""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    return templates
+
+def clone_remote(registry, template_folder, dest, name='remote:app',
+                 **options):
+    """Clones a template of the registry"""
+    dest.mkdir(exist_ok=True)
+    return clone_template(str(dest), name, 'clone', get_clone_function(
+        str(dest)), str(template_folder), remotes={'remote': registry.url},
+                          **options)
+
+@pytest.mark.remote
+def test_clone_a_remote_template(registry, template_folder, tmp_path):
+    """the template is downloaded into the cache and cloned"""
+    status = clone_remote(registry, template_folder, tmp_path / 'dest')
+
+    assert status['is_successful']
+    clone = tmp_path / 'dest' / 'clone'
+    assert (clone / 'README.md').read_text() == '# app\n'
+    assert (clone / 'ci' / 'build.yml').read_text() == 'app: ' + 'x' * 1000
+    assert os.path.isfile(get_cached_path(str(template_folder), 'remote',
+                                          'app'))
+    assert os.listdir(template_folder) == ['.store']
+
+@pytest.mark.remote
+def test_unchanged_templates_are_not_downloaded_again(
+        mocker, registry, template_folder, tmp_path):
+    """the registry answers 304 and no blob is requested"""
+    clone_remote(registry, template_folder, tmp_path / 'first')
+    send_response = mocker.spy(RegistryHandler, 'send_response')
+    send_blob = mocker.spy(RegistryHandler, 'send_blob')
+
+    status = clone_remote(registry, template_folder, tmp_path / 'second')
+
+    assert status['is_successful']
+    assert [call.args[1] for call in send_response.call_args_list] == [304]
+    send_blob.assert_not_called()
+
+@pytest.mark.remote
+def test_only_missing_blobs_are_downloaded(
+        mocker, registry, template_folder, tmp_path):
+    """a changed template only downloads the blobs of its changed files"""
+    clone_remote(registry, template_folder, tmp_path / 'first')
+    src = tmp_path / 'app'
+    (src / 'README.md').write_text('# app v2\n')
+    create_template(str(src), 'app', get_store_function(str(src)), True,
+                    registry.template_folder)
+    send_blob = mocker.spy(RegistryHandler, 'send_blob')
+
+    clone_remote(registry, template_folder, tmp_path / 'second')
+
+    assert send_blob.call_count == 1
+    assert (tmp_path / 'second' / 'clone' / 'README.md').read_text() == \
+        '# app v2\n'
+
+@pytest.mark.remote
+def test_connections_are_kept_alive(mocker, registry, template_folder):
+    """sequential requests share a single connection"""
+    connect = mocker.spy(http.client.HTTPConnection, 'connect')
+    pool = ConnectionPool()
+
+    for name in ('app', 'docs', 'app'):
+        fetch_template(str(template_folder), 'remote', registry.url, name,
+                       jobs=1, pool=pool)
+
+    assert connect.call_count == 1
+
+@pytest.mark.remote
+def test_cached_templates_are_cloned_offline(registry, template_folder,
+                                             tmp_path):
+    """the cached manifest is used when the registry can't be reached"""
+    clone_remote(registry, template_folder, tmp_path / 'first')
+    registry.shutdown()
+    registry.server_close()
+
+    status = clone_remote(registry, template_folder, tmp_path / 'second')
+
+    assert status['is_successful']
+    assert (tmp_path / 'second' / 'clone' / 'README.md').exists()
+
+@pytest.mark.remote
+def test_remote_errors(registry, template_folder, tmp_path):
+    """missing and unreachable templates are reported"""
+    status = clone_remote(registry, template_folder, tmp_path / 'dest',
+                          'remote:missing')
+    assert status == {'is_successful': False,
+                      'msg': 'Template `remote:missing` does not exist.'}
+
+    registry.shutdown()
+    registry.server_close()
+    status = clone_remote(registry, template_folder, tmp_path / 'dest',
+                          'remote:docs')
+    assert status['msg'] == 'An error occured while fetching template ' \
+                            '`remote:docs` from its registry.'
+
+@pytest.mark.remote
+def test_cache_evicts_the_least_recently_fetched(registry, template_folder):
+    """templates are evicted above the cache size and gc keeps the rest"""
+    folder = str(template_folder)
+    app_path = fetch_template(folder, 'remote', registry.url, 'app')
+    fetch_template(folder, 'remote', registry.url, 'docs')
+    os.utime(os.path.join(os.path.dirname(app_path), '.app.etag'), (0, 0))
+
+    fetch_template(folder, 'remote', registry.url, 'docs', cache_size=1500)
+
+    assert not os.path.exists(app_path)
+    assert os.path.exists(get_cached_path(folder, 'remote', 'docs'))
+    assert collect_garbage(folder)['removed'] == 2
+
+    entries = read_manifest(get_cached_path(folder, 'remote',
+                                            'docs'))['entries']
+    assert all(os.path.exists(get_blob_path(folder, entry['hash']))
+               for entry in entries if entry['type'] == 'file')
+
+@pytest.mark.remote
+@pytest.mark.parametrize('entry', [
+    dict(path='../escape', type='file', hash='0' * 64),
+    dict(path='/etc/passwd', type='file', hash='0' * 64),
+    dict(path='file', type='file', hash='../../objects'),
+])
+def test_unsafe_manifests_are_rejected(entry):
+    """paths leaving the clone and invalid digests are refused"""
+    with pytest.raises(ValueError):
+        check_manifest(dict(format='ace-scaffold-manifest', entries=[entry]))
+
+@pytest.mark.remote
+def test_paths_through_symlinks_are_rejected():
+    """files can't be written through a symlink of the template"""
+    with pytest.raises(ValueError):
+        check_manifest(dict(format='ace-scaffold-manifest', entries=[
+            dict(path='link', type='symlink', target='/tmp'),
+            dict(path=os.path.join('link', 'file'), type='file',
+                 hash='0' * 64)]))
+
+@pytest.mark.remote
+def test_duplicate_paths_are_rejected():
+    """a file can't replace a symlink of the same path"""
+    with pytest.raises(ValueError):
+        check_manifest(dict(format='ace-scaffold-manifest', entries=[
+            dict(path='link', type='symlink', target='/tmp/file'),
+            dict(path='link', type='file', mode=0o644, hash='0' * 64)]))
+
+@pytest.mark.remote
+def test_special_mode_bits_are_masked():
+    """only the permission bits of a downloaded entry are kept"""
+    manifest = dict(format='ace-scaffold-manifest', entries=[
+        dict(path='run', type='file', mode=0o4755, hash='0' * 64),
+        dict(path='bin', type='directory', mode=0o1777)])
+    check_manifest(manifest)
+
+    assert [entry['mode'] for entry in manifest['entries']] == \
+        [0o755, 0o777]
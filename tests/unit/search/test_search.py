@@ -0,0 +1,134 @@
+"""This unit test suite tests the search index of template contents."""
+
+import os
+import pytest
+from click.testing import CliRunner
+from app import search as search_module
+from app.commands.search import search as search_command
+from app.engines import create_template, remove_template, search_templates
+from app.search import search
+from app.store import get_store_function
+
+
+def make_source(root, files):
+    """Creates a source directory holding files"""
+    for path, contents in files.items():
+        os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+        with open(os.path.join(root, path), 'w') as file_:
+            file_.write(contents)
+    return str(root)
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a stored, an archive and a directory template"""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    make_source(templates / 'legacy', {'ci/build.yml': 'image: python:3.12'})
+    api = make_source(tmp_path / 'api', {
+        'Dockerfile': 'FROM python:3.12-slim\n',
+        'pyproject.toml': '[project]\nname = "api"\n'})
+    web = make_source(tmp_path / 'web', {
+        'docker/Dockerfile': 'FROM node:20\nRUN pip install python-3.12\n',
+        'package.json': '{}'})
+    create_template(api, 'api', get_store_function(api), False,
+                    str(templates))
+    create_template(web, 'web', get_store_function(web, 'archive'), False,
+                    str(templates))
+    return templates
+
+@pytest.mark.search
+def test_search_by_text(template_folder):
+    """files holding every word but not the text itself don't match"""
+    assert search(str(template_folder), 'PYTHON:3.12') == [
+        ('api', 'Dockerfile'), ('legacy', os.path.join('ci', 'build.yml'))]
+
+@pytest.mark.search
+def test_search_text_starting_and_ending_inside_words(template_folder):
+    """the first and last words of the text may be parts of words"""
+    for text in ('ython:3.12', '3.12-sl', 'ython:3.12-sl', 'yth'):
+        assert ('api', 'Dockerfile') in search(str(template_folder), text)
+    assert search(str(template_folder), 'ython:3.12-slimmer') == []
+
+@pytest.mark.search
+def test_token_patterns_never_start_with_a_wildcard():
+    """the first word is looked up in the suffixes instead of the tokens"""
+    assert search_module.get_token_patterns('ython:3.12-sl') == [
+        ('suffix', 'ython'), ('token', '12'), ('token', 'sl*')]
+    assert search_module.get_token_patterns('yth') == [('suffix', 'yth*')]
+
+@pytest.mark.search
+def test_index_of_another_schema_is_rebuilt(template_folder):
+    """an index written before the suffixes existed is indexed again"""
+    connection = search_module.connect(str(template_folder))
+    with connection:
+        connection.execute('DELETE FROM suffixes')
+        connection.execute("DELETE FROM meta WHERE key = 'schema'")
+    connection.close()
+
+    assert ('api', 'Dockerfile') in search(str(template_folder), 'yth')
+
+@pytest.mark.search
+def test_search_text_without_words_is_rejected(template_folder):
+    """a text that can't be looked up in the index reads no file"""
+    for text in (':', 'a', 'a.b'):
+        with pytest.raises(ValueError):
+            search(str(template_folder), text)
+    status = search_templates(str(template_folder), ':')
+    assert status['is_successful'] is False
+    assert status['msg'] == 'Can\'t search for `:`, the text must hold a ' \
+        'word of two letters or more.'
+
+@pytest.mark.search
+def test_search_by_path(template_folder):
+    """globs match file names, or paths when they hold a slash"""
+    assert search(str(template_folder), path_pattern='Dockerfile') == [
+        ('api', 'Dockerfile'), ('web', os.path.join('docker', 'Dockerfile'))]
+    assert search(str(template_folder), path_pattern='*.toml') == [
+        ('api', 'pyproject.toml')]
+    assert search(str(template_folder), 'node',
+                  path_pattern='docker/*') == [
+        ('web', os.path.join('docker', 'Dockerfile'))]
+
+@pytest.mark.search
+def test_create_and_delete_update_the_index_incrementally(
+        mocker, template_folder, tmp_path):
+    """only the created template is read, deleted templates are dropped"""
+    index_template = mocker.spy(search_module, 'index_template')
+    src = make_source(tmp_path / 'worker', {'Dockerfile': 'FROM python:3.12'})
+    create_template(src, 'worker', get_store_function(src), False,
+                    str(template_folder))
+    remove_template('api', str(template_folder))
+
+    assert [call.args[1] for call in index_template.call_args_list] == \
+        ['worker']
+    assert search(str(template_folder), path_pattern='Dockerfile') == [
+        ('web', os.path.join('docker', 'Dockerfile')),
+        ('worker', 'Dockerfile')]
+
+@pytest.mark.search
+def test_create_force_reindexes_the_template(template_folder, tmp_path):
+    """the contents of a replaced template are searched"""
+    api = make_source(tmp_path / 'api', {'Dockerfile': 'FROM python:3.13'})
+    create_template(api, 'api', get_store_function(api), True,
+                    str(template_folder))
+
+    assert search_templates(str(template_folder), 'python:3.13') == dict(
+        is_successful=True, matches=[dict(template='api', path='Dockerfile')])
+
+@pytest.mark.search
+def test_search_command(template_folder):
+    """lists the matching templates, or every matching file"""
+    from app import TestConfig
+
+    config = TestConfig(str(template_folder))
+    runner = CliRunner()
+
+    response = runner.invoke(search_command, ['python'], obj=config)
+    assert response.output == '1 api\n2 legacy\n3 web\n'
+
+    response = runner.invoke(search_command, ['-f', '-p', '*.toml'],
+                             obj=config)
+    assert response.output == 'api: pyproject.toml\n'
+
+    response = runner.invoke(search_command, [], obj=config)
+    assert response.exit_code == 2
@@ -0,0 +1,110 @@
+"""This unit test suite tests the partial clones of templates."""
+
+import os
+import pytest
+from app.engines import clone_template, create_template
+from app.selection import Selection
+from app.store import get_store_function
+from app.utils import get_clone_function, scan_tree
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Creates a monorepo-like source directory"""
+    src = tmp_path / 'src'
+    for directory in ('ci', 'docker/app', 'docs/deep', 'node_modules/pkg'):
+        (src / directory).mkdir(parents=True)
+    for path in ('ci/build.yml', 'docker/Dockerfile', 'docker/app/main.py',
+                 'docs/deep/guide.md', 'README.md', 'node_modules/pkg/a'):
+        (src / path).write_text(path)
+    return src
+
+def list_tree(root):
+    """Returns the relative paths of a tree, sorted"""
+    return sorted(relative_path.replace(os.sep, '/')
+                  for relative_path, _ in scan_tree(str(root)))
+
+@pytest.mark.selection
+def test_selection_prunes_the_walk(source):
+    """directories that can't hold an included path are never walked"""
+    selection = Selection(['ci/', 'docker/*'])
+    walked = [path for path, _ in scan_tree(str(source), selection)]
+
+    assert walked == ['ci', 'docker', os.path.join('ci', 'build.yml'),
+                      os.path.join('docker', 'Dockerfile'),
+                      os.path.join('docker', 'app'),
+                      os.path.join('docker', 'app', 'main.py')]
+
+@pytest.mark.selection
+def test_select_creates_only_the_directories_it_needs():
+    """directories walked only for their contents are yielded when needed"""
+    entries = [('docs', True, 1), ('docs/empty', True, 2),
+               ('docs/deep', True, 3), ('docs/deep/guide.md', False, 4),
+               ('README.md', False, 5)]
+
+    assert list(Selection(['**/*.md']).select(entries)) == [
+        ('docs', 1), (os.path.join('docs', 'deep'), 3),
+        (os.path.join('docs', 'deep', 'guide.md'), 4), ('README.md', 5)]
+
+@pytest.mark.selection
+def test_subpath_must_stay_inside_the_template():
+    """a subpath leaving the template raises a ValueError"""
+    with pytest.raises(ValueError):
+        Selection(subpath='../other')
+
+@pytest.mark.selection
+@pytest.mark.parametrize('template_format', ['store', 'archive', 'directory'])
+def test_clone_with_includes(source, tmp_path, template_format):
+    """only the included paths and their directories are cloned"""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    if template_format == 'directory':
+        os.rename(source, templates / 'mono')
+    else:
+        create_template(str(source), 'mono',
+                        get_store_function(str(source), template_format),
+                        False, str(templates))
+
+    status = clone_template(str(tmp_path), 'mono', 'clone',
+                            get_clone_function(str(tmp_path)), str(templates),
+                            includes=['ci/', 'docker/*'])
+
+    assert status['is_successful'] is True
+    assert list_tree(tmp_path / 'clone') == [
+        'ci', 'ci/build.yml', 'docker', 'docker/Dockerfile', 'docker/app',
+        'docker/app/main.py']
+
+@pytest.mark.selection
+@pytest.mark.parametrize('template_format', ['store', 'archive'])
+def test_clone_a_subpath(source, tmp_path, template_format):
+    """the contents of the subpath become the new directory"""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    create_template(str(source), 'mono',
+                    get_store_function(str(source), template_format),
+                    False, str(templates))
+
+    status = clone_template(str(tmp_path), 'mono', 'clone',
+                            get_clone_function(str(tmp_path)), str(templates),
+                            subpath='docker', includes=['app'])
+
+    assert status['is_successful'] is True
+    assert list_tree(tmp_path / 'clone') == ['app', 'app/main.py']
+    assert (tmp_path / 'clone' / 'app' / 'main.py').read_text() == \
+        'docker/app/main.py'
+
+@pytest.mark.selection
+def test_clone_a_missing_subpath(source, tmp_path):
+    """a subpath that isn't a directory of the template is reported"""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    create_template(str(source), 'mono', get_store_function(str(source)),
+                    False, str(templates))
+
+    status = clone_template(str(tmp_path), 'mono', 'clone',
+                            get_clone_function(str(tmp_path)), str(templates),
+                            subpath='README.md')
+
+    assert status == dict(is_successful=False, msg='Template `mono` has no '
+                          'directory `README.md`.')
+    assert not os.path.exists(tmp_path / 'clone')
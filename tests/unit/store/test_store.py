@@ -0,0 +1,169 @@
+"""This unit test suite tests the application's template store."""
+
+import os
+import pytest
+import app.store
+from app.manifest import read_manifest
+from app.store import (store_directory, store_file, restore_template,
+                       get_blob_path, get_store_function, collect_garbage,
+                       hash_file)
+from app.messages import ErrorMessage
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """Creates a source directory with a duplicated file and a symlink"""
+    src = tmp_path / 'src'
+    (src / 'docs').mkdir(parents=True)
+    (src / 'LICENSE').write_text('MIT')
+    (src / 'docs' / 'LICENSE').write_text('MIT')
+    (src / 'run.sh').write_text('echo run')
+    os.chmod(src / 'run.sh', 0o755)
+    os.symlink('LICENSE', src / 'COPYING')
+    template_folder = tmp_path / 'templates'
+    template_folder.mkdir()
+    return str(src), str(template_folder)
+
+@pytest.mark.store
+def test_store_directory_deduplicates_contents(source_tree):
+    """identical files are saved as a single blob"""
+    src, template_folder = source_tree
+    dest = os.path.join(template_folder, 'project')
+
+    assert store_directory(src, dest)['is_successful'] is True
+    manifest = read_manifest(dest)
+    hashes = {entry['path']: entry.get('hash')
+              for entry in manifest['entries']}
+
+    assert hashes['LICENSE'] == hashes[os.path.join('docs', 'LICENSE')]
+    assert os.path.isfile(get_blob_path(template_folder, hashes['LICENSE']))
+    assert hashes['COPYING'] is None
+
+@pytest.mark.store
+def test_restore_template_rebuilds_the_tree(source_tree, tmp_path):
+    """the restored tree matches the source contents, modes and symlinks"""
+    src, template_folder = source_tree
+    template = os.path.join(template_folder, 'project')
+    dest = str(tmp_path / 'clone')
+    store_directory(src, template)
+
+    assert restore_template(template, dest)['is_successful'] is True
+    assert open(os.path.join(dest, 'docs', 'LICENSE')).read() == 'MIT'
+    assert os.readlink(os.path.join(dest, 'COPYING')) == 'LICENSE'
+    assert os.stat(os.path.join(dest, 'run.sh')).st_mode & 0o777 == 0o755
+    assert os.path.getmtime(os.path.join(dest, 'run.sh')) == \
+        os.path.getmtime(os.path.join(src, 'run.sh'))
+
+@pytest.mark.store
+def test_restore_template_with_existing_destination(source_tree, tmp_path):
+    """returns a failure indicator when the destination exists"""
+    src, template_folder = source_tree
+    template = os.path.join(template_folder, 'project')
+    store_directory(src, template)
+
+    assert restore_template(template, str(tmp_path))['is_successful'] is False
+
+@pytest.mark.store
+def test_store_file_saves_a_single_entry(source_tree, tmp_path):
+    """a file template holds the file under its own name"""
+    src, template_folder = source_tree
+    template = os.path.join(template_folder, 'license')
+    dest = str(tmp_path / 'clone')
+
+    store_file(os.path.join(src, 'LICENSE'), template)
+    restore_template(template, dest)
+
+    assert read_manifest(template)['type'] == 'file'
+    assert os.listdir(dest) == ['LICENSE']
+
+@pytest.mark.store
+def test_collect_garbage_removes_unreferenced_blobs(source_tree):
+    """blobs referenced by a remaining template are kept"""
+    src, template_folder = source_tree
+    store_directory(src, os.path.join(template_folder, 'project'))
+    store_file(os.path.join(src, 'LICENSE'),
+               os.path.join(template_folder, 'license'))
+    os.remove(os.path.join(template_folder, 'project'))
+
+    status = collect_garbage(template_folder)
+    license_hash = hash_file(os.path.join(src, 'LICENSE'))
+
+    assert status == {'is_successful': True, 'removed': 1}
+    assert os.path.isfile(get_blob_path(template_folder, license_hash))
+
+@pytest.mark.store
+def test_get_store_function_if_the_path_doesnt_exist(mocker):
+    """returns a error message and error indicator"""
+    path = '~/Home'
+    mocker.patch('os.path.isdir', return_value=False)
+    mocker.patch('os.path.isfile', return_value=False)
+
+    store_attributes = get_store_function(path)
+    assert store_attributes['is_successful'] is False
+    assert store_attributes['msg'] == ErrorMessage(
+        'directory_missing', path=path).get_message()
+
+@pytest.mark.store
+def test_restore_template_hardlinks_blobs(source_tree, tmp_path):
+    """hardlinked files share the blob's inode and stay read-only"""
+    src, template_folder = source_tree
+    template = os.path.join(template_folder, 'project')
+    dest = str(tmp_path / 'clone')
+    store_directory(src, template)
+
+    status = restore_template(template, dest, mode='hardlink')
+    blob_path = get_blob_path(
+        template_folder, hash_file(os.path.join(src, 'LICENSE')))
+
+    assert status['is_successful'] is True
+    assert os.stat(os.path.join(dest, 'LICENSE')).st_ino == \
+        os.stat(blob_path).st_ino
+    assert os.stat(blob_path).st_mode & 0o777 == 0o444
+
+@pytest.mark.store
+def test_store_directory_syncs_an_existing_template(
+        mocker, source_tree):
+    """only new or changed files are hashed and the counts are returned"""
+    src, template_folder = source_tree
+    template = os.path.join(template_folder, 'project')
+    store_directory(src, template)
+
+    with open(os.path.join(src, 'run.sh'), 'w') as file_:
+        file_.write('echo changed')
+    with open(os.path.join(src, 'NEW'), 'w') as file_:
+        file_.write('new')
+    os.remove(os.path.join(src, 'docs', 'LICENSE'))
+    mocker.spy(app.store, 'hash_file')
+
+    status = store_directory(src, template)
+    hashed = {os.path.basename(call.args[0])
+              for call in app.store.hash_file.call_args_list}
+
+    assert status == {'is_successful': True, 'added': 1, 'changed': 1,
+                      'removed': 1}
+    assert hashed == {'run.sh', 'NEW'}
+
+@pytest.mark.store
+def test_collect_garbage_waits_for_running_creates(source_tree):
+    """blobs a create adds before saving its manifest are never removed"""
+    import threading
+    from app.store import lock_store, put_blob
+
+    src, template_folder = source_tree
+    store_directory(src, os.path.join(template_folder, 'project'))
+    os.remove(os.path.join(template_folder, 'project'))
+    statuses = []
+
+    with lock_store(template_folder):
+        digest = put_blob(os.path.join(src, 'LICENSE'), template_folder)
+        collector = threading.Thread(
+            target=lambda: statuses.append(collect_garbage(template_folder)))
+        collector.start()
+        collector.join(0.2)
+        assert collector.is_alive()
+        store_file(os.path.join(src, 'LICENSE'),
+                   os.path.join(template_folder, 'license'))
+    collector.join()
+
+    assert statuses == [{'is_successful': True, 'removed': 1}]
+    assert os.path.isfile(get_blob_path(template_folder, digest))
@@ -0,0 +1,53 @@
+"""This unit test suite tests the timings instrumentation of the engines."""
+
+import json
+import pytest
+from click.testing import CliRunner
+from app import Config
+from app.cli import interface
+from app.timings import recording, phase, NO_PHASE
+from app.utils import clone_directory
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """Creates a source directory with two files"""
+    src = tmp_path / 'src'
+    (src / 'docs').mkdir(parents=True)
+    (src / 'README').write_text('readme')
+    (src / 'docs' / 'index').write_text('index')
+    return src
+
+@pytest.mark.timings
+def test_phase_records_nothing_outside_of_a_recording():
+    """the shared no-op phase is returned"""
+    assert phase('copy') is NO_PHASE
+
+@pytest.mark.timings
+def test_recording_collects_phases_and_counts(source_tree, tmp_path):
+    """the phases, files and bytes of a clone are recorded"""
+    reports = []
+    with recording(reports.append) as timings:
+        clone_directory(str(source_tree), str(tmp_path / 'clone'))
+
+    report = timings.to_dict()
+    assert reports == [timings]
+    assert report['files'] == 2
+    assert report['bytes'] == len('readme') + len('index')
+    assert report['phases']['copy_data']['calls'] == 2
+    assert {'scan', 'mkdir', 'copy', 'directory_metadata'} <= \
+        set(report['phases'])
+    assert phase('copy') is NO_PHASE
+
+@pytest.mark.timings
+def test_profile_option_prints_json_timings(mocker, tmp_path):
+    """the timings are written to stderr and the output is unchanged"""
+    (tmp_path / 'flask').mkdir()
+    mocker.patch.object(Config, 'TEMPLATE_FOLDER', str(tmp_path))
+
+    response = CliRunner(mix_stderr=False).invoke(
+        interface, ['--profile', '--profile-format', 'json', 'list'])
+
+    assert response.exit_code == 0
+    assert response.stdout == '1 flask\n'
+    assert 'get_templates' in json.loads(response.stderr)['phases']
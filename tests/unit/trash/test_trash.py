@@ -0,0 +1,108 @@
+"""This unit test suite tests the trash of the template folder."""
+
+import os
+import time
+import pytest
+from click.testing import CliRunner
+from app.commands.delete import delete
+from app.commands.gc import gc
+from app.engines import (create_template, get_templates, reclaim_space,
+                         remove_template)
+from app.store import get_store_function
+from app.trash import get_trash_path, reclaim, start_reclaim
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a stored and a directory template"""
+    src = tmp_path / 'src'
+    src.mkdir()
+    for index in range(3):
+        (src / f'file{index}').write_text(str(index))
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    create_template(str(src), 'stored', get_store_function(str(src)), False,
+                    str(templates))
+    (templates / 'legacy').mkdir()
+    (templates / 'legacy' / 'README').write_text('legacy')
+    return templates
+
+def count_blobs(template_folder):
+    """Returns the number of blobs in the store"""
+    return sum(len(files) for _, _, files in os.walk(
+        template_folder / '.store' / 'objects'))
+
+@pytest.mark.trash
+def test_delete_moves_the_template_to_the_trash(template_folder):
+    """trashed templates and their versions are not listed and keep their
+    blobs until reclaimed"""
+    for name in ('stored', 'legacy'):
+        assert remove_template(name, str(template_folder))['is_successful']
+
+    trashed = os.listdir(get_trash_path(str(template_folder)))
+    assert get_templates(str(template_folder)) == []
+    assert sorted(name.split('.')[0] for name in trashed) == \
+        ['legacy', 'stored', 'stored']
+    assert count_blobs(template_folder) == 3
+
+    assert reclaim(str(template_folder), grace=0) == dict(
+        is_successful=True, templates=2, blobs=3)
+    assert os.listdir(get_trash_path(str(template_folder))) == []
+    assert count_blobs(template_folder) == 0
+
+@pytest.mark.trash
+def test_recent_blobs_are_kept(template_folder):
+    """blobs younger than the grace period may belong to a running create"""
+    remove_template('stored', str(template_folder))
+    status = reclaim_space(str(template_folder), grace=60)
+
+    assert status['msg'] == 'Removed 1 deleted templates and 0 unused files.'
+    assert count_blobs(template_folder) == 3
+
+@pytest.mark.trash
+def test_create_force_trashes_a_directory_template(template_folder, tmp_path):
+    """a directory template replaced by a stored one is moved to the trash"""
+    src = str(tmp_path / 'src')
+    status = create_template(src, 'legacy', get_store_function(src), True,
+                             str(template_folder))
+
+    assert status['is_successful'] is True
+    assert os.path.isfile(template_folder / 'legacy')
+    assert len(os.listdir(get_trash_path(str(template_folder)))) == 1
+
+@pytest.mark.trash
+def test_reclaim_in_a_background_process(template_folder):
+    """the trash is emptied by a detached process"""
+    remove_template('legacy', str(template_folder))
+    start_reclaim(str(template_folder))
+
+    deadline = time.time() + 10
+    while os.listdir(get_trash_path(str(template_folder))) and \
+            time.time() < deadline:
+        time.sleep(0.05)
+    assert os.listdir(get_trash_path(str(template_folder))) == []
+
+@pytest.mark.trash
+def test_delete_command_starts_reclaiming(mocker, template_folder):
+    """the delete command reclaims the space in the background"""
+    from app import TestConfig
+
+    config = TestConfig(str(template_folder))
+    config.RECLAIM_IN_BACKGROUND = True
+    start_reclaim_ = mocker.patch('app.commands.delete.start_reclaim')
+    response = CliRunner().invoke(delete, ['-t', 'legacy'], obj=config)
+
+    assert response.output == 'Template `legacy` has been deleted.\n'
+    start_reclaim_.assert_called_once_with(str(template_folder))
+
+@pytest.mark.trash
+def test_gc_command(template_folder):
+    """the gc command drains the trash"""
+    from app import TestConfig
+
+    remove_template('stored', str(template_folder))
+    response = CliRunner().invoke(gc, ['--grace', '0'],
+                                  obj=TestConfig(str(template_folder)))
+
+    assert response.output == \
+        'Removed 1 deleted templates and 3 unused files.\n'
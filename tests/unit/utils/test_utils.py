@@ -3,30 +3,43 @@
 import shutil
 import os
 import pytest
+from app.trash import get_trash_path
 from app.utils import (clone_directory, clone_file, delete_template,
-                       get_template, get_clone_function)
+                       get_template, get_clone_function, scan_tree,
+                       run_parallel)
 from app.messages import ErrorMessage
 
 @pytest.mark.utils
-def test_clone_directory_with_no_errors(mocker):
-    """copytree is called with src and dest and returns a success indicator"""
-    mocker.patch('shutil.copytree')
-    src = '~/Home'
-    dest = 'test'
-
-    clone_status = clone_directory(src, dest)
-    shutil.copytree.assert_called_once_with(src, dest, symlinks=True)
+def test_clone_directory_with_no_errors(tmp_path):
+    """the tree is copied with its symlinks and returns a success indicator"""
+    src = tmp_path / 'src'
+    (src / 'nested').mkdir(parents=True)
+    (src / 'nested' / 'file.txt').write_text('contents')
+    os.symlink('nested', src / 'link')
+    dest = tmp_path / 'dest'
+
+    clone_status = clone_directory(str(src), str(dest), jobs=4)
     assert clone_status['is_successful'] is True
+    assert (dest / 'nested' / 'file.txt').read_text() == 'contents'
+    assert os.readlink(dest / 'link') == 'nested'
 
 @pytest.mark.utils
-def test_clone_directory_with_errors(mocker):
-    """returns a failure indicator when copytree throws an OSError"""
-    mocker.patch('shutil.copytree', side_effect=OSError())
-    src = '~/Home'
-    dest = 'test'
+def test_clone_directory_with_errors(mocker, tmp_path):
+    """returns a failure indicator when copying a file throws an OSError"""
+    mocker.patch('shutil.copyfile', side_effect=OSError())
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'file.txt').write_text('contents')
+
+    clone_status = clone_directory(
+        str(tmp_path / 'src'), str(tmp_path / 'dest'))
+    assert clone_status['is_successful'] is False
+
+@pytest.mark.utils
+def test_clone_directory_with_existing_destination(tmp_path):
+    """returns a failure indicator when the destination exists"""
+    (tmp_path / 'src').mkdir()
 
-    clone_status = clone_directory(src, dest)
-    shutil.copytree.assert_called_once_with(src, dest, symlinks=True)
+    clone_status = clone_directory(str(tmp_path / 'src'), str(tmp_path))
     assert clone_status['is_successful'] is False
 
 @pytest.mark.utils
@@ -51,22 +64,23 @@ def test_clone_file_with_errors(mocker):
     assert clone_status['is_successful'] is False
 
 @pytest.mark.utils
-def test_delete_template_removes_the_correct_template(mocker):
-    """rmtree gets called on the correct template"""
-    mocker.patch('shutil.rmtree')
-    path = '~/Home'
-    name = 'test'
+def test_delete_template_moves_the_template_to_the_trash(tmp_path):
+    """the template is renamed into the trash instead of being removed"""
+    (tmp_path / 'test').mkdir()
+    (tmp_path / 'test' / 'README').write_text('readme')
 
-    template_path = os.path.join(path, name)
+    delete_status = delete_template('test', str(tmp_path))
+    trashed = os.listdir(get_trash_path(str(tmp_path)))
 
-    delete_status = delete_template(name, path)
-    shutil.rmtree.assert_called_once_with(template_path)
     assert delete_status['is_successful'] is True
+    assert not os.path.exists(tmp_path / 'test')
+    assert len(trashed) == 1 and trashed[0].startswith('test.')
 
 @pytest.mark.utils
 def test_delete_template_with_errors(mocker):
-    """returns a failure indicator when rmtree throws an OSError"""
-    mocker.patch('shutil.rmtree', side_effect=OSError())
+    """returns a failure indicator when the rename throws an OSError"""
+    mocker.patch('os.makedirs')
+    mocker.patch('os.rename', side_effect=OSError())
     path = '~/Home'
     name = 'test'
 
@@ -125,3 +139,24 @@ def test_get_clone_function_if_the_path_doesnt_exist(mocker):
     assert clone_attributes['is_successful'] is False
     assert clone_attributes['msg'] == ErrorMessage(
         'directory_missing', path=path).get_message()
+
+@pytest.mark.utils
+def test_scan_tree_yields_directories_before_their_contents(tmp_path):
+    """parents come first and symlinked directories are not followed"""
+    (tmp_path / 'b' / 'c').mkdir(parents=True)
+    (tmp_path / 'b' / 'c' / 'file').write_text('')
+    (tmp_path / 'a').write_text('')
+    os.symlink('b', tmp_path / 'link')
+
+    paths = [path for path, _ in scan_tree(str(tmp_path))]
+    assert paths == ['a', 'b', 'link', os.path.join('b', 'c'),
+                     os.path.join('b', 'c', 'file')]
+
+@pytest.mark.utils
+def test_run_parallel_raises_the_first_error():
+    """errors raised on the pool are raised to the caller"""
+    def fail(value):
+        raise OSError(value)
+
+    with pytest.raises(OSError):
+        run_parallel(fail, [(1,), (2,)], jobs=2)
@@ -0,0 +1,139 @@
+"""This unit test suite tests the variable substitution of clones."""
+
+import json
+import os
+import pytest
+import app.store
+import app.variables
+from app.cache import enable_content_cache
+from app.commands.clone import clone
+from app.engines import clone_template, create_template
+from app.manifest import read_manifest
+from app.store import get_store_function
+from app.utils import get_clone_function
+from app.variables import PlaceholderScanner, Variables, read_variables
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a template with placeholders in a path and two files"""
+    src = tmp_path / 'src'
+    (src / '{{package}}').mkdir(parents=True)
+    (src / '{{package}}' / '__init__.py').write_text(
+        'NAME = "{{ project }}"\nOTHER = "{{unknown}}"\n')
+    (src / 'README').write_text('{{project}} is {{project}}\n')
+    (src / 'LICENSE').write_text('no placeholders\n')
+    os.symlink('{{package}}/__init__.py', src / 'link')
+    (tmp_path / 'templates').mkdir()
+    create_template(str(src), 'project', get_store_function(str(src)),
+                    False, str(tmp_path / 'templates'))
+    return tmp_path
+
+def clone_with(tmp_path, **variables):
+    """Clones the template of the fixture with variables"""
+    return clone_template(str(tmp_path), 'project', 'clone',
+                          get_clone_function(str(tmp_path)),
+                          str(tmp_path / 'templates'), variables=variables)
+
+@pytest.mark.variables
+def test_placeholders_are_listed_at_create(template_folder):
+    """the manifest lists the placeholders of every file and path"""
+    manifest = read_manifest(str(template_folder / 'templates' / 'project'))
+    entries = {entry['path']: entry for entry in manifest['entries']}
+
+    assert manifest['placeholders'] == ['package', 'project', 'unknown']
+    assert entries['README']['placeholders'] == ['project']
+    assert 'placeholders' not in entries['LICENSE']
+
+@pytest.mark.variables
+def test_clone_replaces_placeholders(mocker, template_folder):
+    """only the files holding placeholders of the variables are rendered"""
+    restore_file = mocker.spy(app.store, 'restore_file')
+    status = clone_with(template_folder, project='demo', package='demo_pkg')
+    clone_dir = template_folder / 'clone'
+
+    assert status['is_successful'] is True
+    assert (clone_dir / 'README').read_text() == 'demo is demo\n'
+    assert (clone_dir / 'demo_pkg' / '__init__.py').read_text() == \
+        'NAME = "demo"\nOTHER = "{{unknown}}"\n'
+    assert os.readlink(clone_dir / 'link') == 'demo_pkg/__init__.py'
+    assert [call.args[1] for call in restore_file.call_args_list] == \
+        [str(clone_dir / 'LICENSE')]
+
+@pytest.mark.variables
+def test_cached_clone_replaces_placeholders(template_folder):
+    """clones written from the content cache are rendered too"""
+    enable_content_cache()
+    try:
+        clone_with(template_folder, project='demo', package='pkg')
+    finally:
+        enable_content_cache(0)
+
+    assert (template_folder / 'clone' / 'README').read_text() == \
+        'demo is demo\n'
+    assert (template_folder / 'clone' / 'pkg' / '__init__.py').exists()
+
+@pytest.mark.variables
+def test_invalid_rendered_path(template_folder):
+    """a value can't move a file out of its directory"""
+    status = clone_with(template_folder, package='../outside')
+    assert status['is_successful'] is False
+
+@pytest.mark.variables
+def test_variables_need_a_stored_template(tmp_path):
+    """directory templates can't be cloned with variables"""
+    (tmp_path / 'templates' / 'legacy').mkdir(parents=True)
+    status = clone_template(str(tmp_path), 'legacy', 'clone',
+                            get_clone_function(str(tmp_path)),
+                            str(tmp_path / 'templates'),
+                            variables=dict(project='demo'))
+
+    assert status['is_successful'] is False
+    assert 'only be replaced in stored templates' in status['msg']
+
+@pytest.mark.variables
+def test_large_files_are_rendered_in_chunks(monkeypatch, tmp_path):
+    """placeholders split between chunks are found and replaced"""
+    monkeypatch.setattr(app.variables, 'RENDER_CHUNK_SIZE', 7)
+    contents = b'ab{{name}}cd{{ name }}' * 50 + b'{{name}'
+    src = tmp_path / 'src'
+    src.write_bytes(contents)
+
+    variables = Variables(dict(name='value'))
+    variables.render_file(str(src), str(tmp_path / 'dest'))
+    assert (tmp_path / 'dest').read_bytes() == \
+        variables.render_bytes(contents)
+    assert (tmp_path / 'dest').read_bytes().count(b'value') == 100
+
+    scanner = PlaceholderScanner()
+    for start in range(0, len(contents), 7):
+        scanner.update(contents[start:start + 7])
+    assert scanner.names == {'name'}
+
+@pytest.mark.variables
+def test_read_variables(tmp_path):
+    """pairs override the variables of a vars file"""
+    vars_file = tmp_path / 'vars.json'
+    vars_file.write_text(json.dumps(dict(project='file', package='pkg')))
+    env_file = tmp_path / 'vars'
+    env_file.write_text('# comment\nproject=env\n\nurl=a=b\n')
+
+    assert read_variables(['project=cli'], str(vars_file)) == \
+        dict(project='cli', package='pkg')
+    assert read_variables([], str(env_file)) == dict(project='env',
+                                                     url='a=b')
+    with pytest.raises(ValueError):
+        read_variables(['project'])
+    with pytest.raises(ValueError):
+        read_variables(['not-a-name=value'])
+
+@pytest.mark.variables
+def test_clone_command_passes_variables(mocker, click_runner):
+    """the variables of the command are forwarded to clone_template"""
+    clone_template_ = mocker.patch('app.commands.clone.clone_template',
+                                   return_value=dict(msg='cloned'))
+    response = click_runner(clone)(['-t', 'project', '-v', 'project=demo'])
+
+    assert response.exit_code == 0
+    assert clone_template_.call_args.kwargs['variables'] == \
+        dict(project='demo')
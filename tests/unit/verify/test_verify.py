@@ -0,0 +1,153 @@
+"""This unit test suite tests the integrity verification of templates."""
+
+import os
+import tarfile
+import pytest
+from click.testing import CliRunner
+from app import verify as verify_module
+from app.archive import HASHES_NAME
+from app.commands.verify import verify as verify_command
+from app.engines import clone_template, create_template, verify_templates
+from app.manifest import read_manifest
+from app.store import get_blob_path, get_store_function
+from app.utils import get_clone_function
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates a stored, an archive and a directory template"""
+    src = tmp_path / 'src'
+    (src / 'ci').mkdir(parents=True)
+    (src / 'README.md').write_text('# project\n')
+    (src / 'ci' / 'build.yml').write_text('steps: []\n')
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+
+    create_template(str(src), 'stored', get_store_function(str(src)), True,
+                    str(templates))
+    create_template(str(src), 'archived',
+                    get_store_function(str(src), 'archive'), True,
+                    str(templates))
+    (templates / 'legacy').mkdir()
+    (templates / 'legacy' / 'README.md').write_text('# legacy\n')
+    return templates
+
+def get_blob(template_folder, path):
+    """Returns the blob of a file of the stored template"""
+    for entry in read_manifest(str(template_folder / 'stored'))['entries']:
+        if entry['path'] == path:
+            return get_blob_path(str(template_folder), entry['hash'])
+    raise LookupError(path)
+
+def corrupt(path, contents):
+    """Overwrites a read-only file"""
+    os.chmod(path, 0o644)
+    with open(path, 'w') as file_:
+        file_.write(contents)
+
+@pytest.mark.verify
+def test_intact_templates_are_only_hashed_once(template_folder):
+    """files unchanged since they were verified are skipped unless deep"""
+    status = verify_templates(str(template_folder))
+    assert status['is_successful']
+    assert status['msg'].splitlines() == [
+        'Template `archived` is intact: 2 files, 2 hashed.',
+        'Template `legacy` is a directory template, which records no '
+        'hashes to verify.',
+        'Template `stored` is intact: 2 files, 2 hashed.']
+
+    status = verify_templates(str(template_folder), ['stored', 'archived'])
+    assert [report['hashed'] for report in status['templates']] == [0, 0]
+
+    status = verify_templates(str(template_folder), ['stored'], deep=True)
+    assert status['templates'][0]['hashed'] == 2
+
+@pytest.mark.verify
+def test_changed_and_missing_blobs_are_reported(template_folder):
+    """every file whose blob changed or disappeared is listed"""
+    verify_templates(str(template_folder))
+    corrupt(get_blob(template_folder, 'README.md'), '# changed\n')
+    os.remove(get_blob(template_folder, os.path.join('ci', 'build.yml')))
+
+    status = verify_templates(str(template_folder), ['stored'])
+
+    assert not status['is_successful']
+    assert status['msg'].splitlines() == [
+        'Template `stored` is corrupted: 1 missing and 1 changed files.',
+        f'    missing: {os.path.join("ci", "build.yml")}',
+        '    changed: README.md']
+
+@pytest.mark.verify
+def test_blobs_are_hashed_on_a_process_pool(mocker, template_folder):
+    """the blobs are split into batches hashed by worker processes"""
+    mocker.patch('app.verify.BATCH_FILES', 1)
+    run_tasks = mocker.spy(verify_module, 'run_tasks')
+
+    status = verify_templates(str(template_folder), ['stored'], jobs=2)
+
+    assert status['is_successful']
+    assert len(run_tasks.spy_return) == 2
+
+@pytest.mark.verify
+def test_archives_record_and_check_their_hashes(template_folder):
+    """the hashes are the last member and a damaged archive is reported"""
+    archive_path = str(template_folder / 'archived')
+    with tarfile.open(archive_path) as archive:
+        assert archive.getnames()[-1] == HASHES_NAME
+
+    with open(archive_path, 'rb') as file_:
+        contents = file_.read()
+    with open(archive_path, 'wb') as file_:
+        file_.write(contents[:len(contents) // 2])
+
+    status = verify_templates(str(template_folder), ['archived'])
+    assert not status['is_successful']
+    assert status['templates'][0]['changed']
+
+@pytest.mark.verify
+@pytest.mark.parametrize('mode', ['copy', 'hardlink'])
+def test_clone_verify_stops_at_a_corrupted_file(template_folder, tmp_path,
+                                                mode):
+    """the hashes are checked while the files are copied"""
+    corrupt(get_blob(template_folder, 'README.md'), '# changed\n')
+    dest = str(tmp_path / 'dest')
+    os.mkdir(dest)
+
+    status = clone_template(dest, 'stored', 'clone', get_clone_function(dest),
+                            str(template_folder), mode=mode, verify=True)
+    assert status == {'is_successful': False,
+                      'msg': 'Template `stored` is corrupted: `README.md` '
+                             'does not match its hash.'}
+
+    status = clone_template(dest, 'archived', 'archive',
+                            get_clone_function(dest), str(template_folder),
+                            verify=True)
+    assert status['is_successful']
+
+@pytest.mark.verify
+def test_clone_verify_needs_recorded_hashes(template_folder, tmp_path):
+    """directory templates can't be cloned with verify"""
+    status = clone_template(str(tmp_path), 'legacy', 'clone',
+                            get_clone_function(str(tmp_path)),
+                            str(template_folder), verify=True)
+    assert status['msg'] == 'Template `legacy` is a directory template, ' \
+                            'which records no hashes to verify.'
+
+@pytest.mark.verify
+def test_verify_command_exits_with_an_error(template_folder):
+    """the exit status tells whether every template is intact"""
+    from app import TestConfig
+
+    config = TestConfig(str(template_folder))
+    runner = CliRunner()
+    assert runner.invoke(verify_command, ['-t', 'stored'],
+                         obj=config).exit_code == 0
+
+    corrupt(get_blob(template_folder, 'README.md'), '# changed\n')
+    response = runner.invoke(verify_command, ['-t', 'stored', '--deep'],
+                             obj=config)
+    assert response.exit_code == 1
+    assert 'changed: README.md' in response.output
+
+    response = runner.invoke(verify_command, ['-t', 'missing'], obj=config)
+    assert response.output == 'Template `missing` does not exist.\n'
@@ -0,0 +1,95 @@
+"""This unit test suite tests the versions of templates."""
+
+import os
+import pytest
+from click.testing import CliRunner
+from app.commands.list import list_
+from app.engines import (clone_template, create_template,
+                         get_template_versions, remove_template,
+                         rollback_template)
+from app.store import get_store_function, collect_garbage
+from app.trash import empty_trash
+from app.utils import get_clone_function
+from app.versions import get_version_path, list_versions
+
+
+@pytest.fixture
+def template_folder(tmp_path):
+    """Creates three versions of a stored template"""
+    src = tmp_path / 'src'
+    src.mkdir()
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+
+    for version in range(1, 4):
+        (src / 'shared.txt').write_text('shared' * 100)
+        (src / 'version.txt').write_text(f'v{version}')
+        create_template(str(src), 'app', get_store_function(str(src)),
+                        True, str(templates))
+    return templates
+
+def read_version(tmp_path, template_folder, name):
+    """Clones a template and returns the contents of its version.txt"""
+    clone_name = f'clone{len(os.listdir(tmp_path))}'
+    clone_template(str(tmp_path), name, clone_name,
+                   get_clone_function(str(tmp_path)), str(template_folder))
+    return (tmp_path / clone_name / 'version.txt').read_text()
+
+@pytest.mark.versions
+def test_every_create_records_a_version(template_folder):
+    """versions share the blobs of the files they don't change"""
+    versions = get_template_versions('app', str(template_folder))
+
+    assert [(version['version'], version['files'], version['added'],
+             version['current']) for version in versions] == [
+        (1, 2, 602, False), (2, 2, 2, False), (3, 2, 2, True)]
+
+@pytest.mark.versions
+def test_clone_a_version(template_folder, tmp_path):
+    """name@vN clones version N"""
+    assert read_version(tmp_path, template_folder, 'app@v1') == 'v1'
+    assert read_version(tmp_path, template_folder, 'app') == 'v3'
+
+@pytest.mark.versions
+def test_rollback_points_the_template_at_a_version(template_folder, tmp_path):
+    """the template's file becomes a link to the version"""
+    status = rollback_template('app', str(template_folder))
+    assert status['msg'] == 'Template `app` has been rolled back to v2.'
+    assert os.path.samefile(template_folder / 'app',
+                            get_version_path(str(template_folder), 'app', 2))
+    assert read_version(tmp_path, template_folder, 'app') == 'v2'
+
+    status = rollback_template('app', str(template_folder), 3)
+    assert status['msg'] == 'Template `app` has been rolled back to v3.'
+
+    status = rollback_template('app', str(template_folder), 7)
+    assert status == dict(is_successful=False,
+                          msg='Template `app` has no version v7.')
+
+@pytest.mark.versions
+def test_versions_keep_their_blobs(template_folder, tmp_path):
+    """garbage collection keeps the blobs of old versions until the
+    template is deleted"""
+    assert collect_garbage(str(template_folder))['removed'] == 0
+    assert read_version(tmp_path, template_folder, 'app@v1') == 'v1'
+
+    remove_template('app', str(template_folder))
+    assert list_versions(str(template_folder), 'app') == []
+    assert empty_trash(str(template_folder)) == dict(is_successful=True,
+                                                     removed=1)
+    assert collect_garbage(str(template_folder))['removed'] == 4
+
+@pytest.mark.versions
+def test_list_versions_command(template_folder):
+    """every version is listed under its template"""
+    from app import TestConfig
+
+    response = CliRunner().invoke(list_, ['--versions'],
+                                  obj=TestConfig(str(template_folder)))
+    lines = response.output.splitlines()
+
+    assert lines[0] == '1 app'
+    assert [line.split()[:5] for line in lines[1:]] == [
+        ['v1', '602', 'B', '2', 'files'], ['v2', '602', 'B', '2', 'files'],
+        ['v3', '602', 'B', '2', 'files']]
+    assert lines[3].endswith(' current')